@@ -18,6 +18,135 @@ class Config:
     MAX_TOKENS_CLINICAL_EXTRACTION = int(os.getenv("MAX_TOKENS_CLINICAL_EXTRACTION", "16384"))
     MAX_TOKENS_PATIENT_SUMMARY = int(os.getenv("MAX_TOKENS_PATIENT_SUMMARY", "8192"))
     MAX_TOKENS_DEFAULT = int(os.getenv("MAX_TOKENS_DEFAULT", "4000"))
+    MAX_TOKENS_FUSED_CONSULTATION = int(os.getenv("MAX_TOKENS_FUSED_CONSULTATION", "24576"))
+    MAX_TOKENS_QUOTE_REPAIR = int(os.getenv("MAX_TOKENS_QUOTE_REPAIR", "2048"))
+
+    # Default pipeline mode: "two_call" (extraction, then summary) or "fused" (one call for both). Overridable per request.
+    PIPELINE_MODE = os.getenv("PIPELINE_MODE", "two_call")
+    # Clinical extraction output schema: "full" (ClinicalExtractionThoughtProcess) or "lean" (LeanClinicalExtraction:
+    # short keys, optional reasoning, no contextual quotes; expanded back into the full report after the call)
+    EXTRACTION_SCHEMA = os.getenv("EXTRACTION_SCHEMA", "full")
+    # /generate-draft/stream: stream the clinical extraction and emit each guardrail-validated item
+    # ("clinical_item" events) as soon as the model has finished it, before the full draft
+    STREAM_CLINICAL_ITEMS = os.getenv("STREAM_CLINICAL_ITEMS", "false").lower() == "true"
+
+    # Adaptive max_tokens: the MAX_TOKENS_* values above become caps once enough usage is observed
+    ADAPTIVE_MAX_TOKENS_ENABLED = os.getenv("ADAPTIVE_MAX_TOKENS_ENABLED", "true").lower() == "true"
+    ADAPTIVE_MAX_TOKENS_MIN = int(os.getenv("ADAPTIVE_MAX_TOKENS_MIN", "1024"))
+    ADAPTIVE_MAX_TOKENS_HEADROOM = float(os.getenv("ADAPTIVE_MAX_TOKENS_HEADROOM", "1.5"))
+    ADAPTIVE_MAX_TOKENS_WINDOW = int(os.getenv("ADAPTIVE_MAX_TOKENS_WINDOW", "200"))
+    ADAPTIVE_MAX_TOKENS_MIN_SAMPLES = int(os.getenv("ADAPTIVE_MAX_TOKENS_MIN_SAMPLES", "5"))
+
+    # Windowed parallel extraction for long consultations (character counts on the scrubbed transcript)
+    EXTRACTION_WINDOWING_THRESHOLD_CHARS = int(os.getenv("EXTRACTION_WINDOWING_THRESHOLD_CHARS", "12000"))
+    EXTRACTION_WINDOW_CHARS = int(os.getenv("EXTRACTION_WINDOW_CHARS", "6000"))
+    EXTRACTION_WINDOW_OVERLAP_CHARS = int(os.getenv("EXTRACTION_WINDOW_OVERLAP_CHARS", "800"))
+    EXTRACTION_MAX_CONCURRENCY = int(os.getenv("EXTRACTION_MAX_CONCURRENCY", "4"))
+
+    # Quote guardrail: when true, quotes also match across whitespace/case differences (accepted quotes are
+    # rewritten to the verbatim transcript text). Default is the strict verbatim check.
+    GUARDRAIL_NORMALIZE_QUOTES = os.getenv("GUARDRAIL_NORMALIZE_QUOTES", "false").lower() == "true"
+    # Near-miss recovery: a quote that is not found is snapped to the closest transcript span within
+    # max(1, ratio * len(quote)) character edits (quotes shorter than MIN_QUOTE_CHARS are never recovered).
+    # Negations and PII placeholders ([PERSON_1], ...) must match exactly. Opt-in.
+    GUARDRAIL_FUZZY_RECOVERY = os.getenv("GUARDRAIL_FUZZY_RECOVERY", "false").lower() == "true"
+    GUARDRAIL_FUZZY_MAX_EDIT_RATIO = float(os.getenv("GUARDRAIL_FUZZY_MAX_EDIT_RATIO", "0.1"))
+    GUARDRAIL_FUZZY_MIN_QUOTE_CHARS = int(os.getenv("GUARDRAIL_FUZZY_MIN_QUOTE_CHARS", "16"))
+    # Targeted repair: items still stripped are re-sent (at most MAX_ITEMS, with +/- CONTEXT_CHARS of
+    # transcript around where they most likely came from) in one small call asking only for verbatim quotes
+    GUARDRAIL_REPAIR_ENABLED = os.getenv("GUARDRAIL_REPAIR_ENABLED", "true").lower() == "true"
+    GUARDRAIL_REPAIR_MAX_ITEMS = int(os.getenv("GUARDRAIL_REPAIR_MAX_ITEMS", "10"))
+    GUARDRAIL_REPAIR_CONTEXT_CHARS = int(os.getenv("GUARDRAIL_REPAIR_CONTEXT_CHARS", "300"))
+
+    # Incremental re-extraction sessions (per process; an unknown/expired session falls back to a full run)
+    INCREMENTAL_SESSION_MAX_ENTRIES = int(os.getenv("INCREMENTAL_SESSION_MAX_ENTRIES", "256"))
+    INCREMENTAL_SESSION_TTL_SECONDS = float(os.getenv("INCREMENTAL_SESSION_TTL_SECONDS", "7200"))
+    # Text before each append that is scrubbed again with it (entities split across appends are seen whole)
+    # and, for transcripts without speaker labels, re-sent to the LLM as context for the new segment.
+    INCREMENTAL_OVERLAP_CHARS = int(os.getenv("INCREMENTAL_OVERLAP_CHARS", "400"))
+    # Draft requests are cancelled (LLM calls aborted, transcription stopped) when the client disconnects or the
+    # deadline passes: X-Request-Timeout header in seconds, else this default (0 = no deadline)
+    REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "0"))
+    REQUEST_DISCONNECT_POLL_SECONDS = float(os.getenv("REQUEST_DISCONNECT_POLL_SECONDS", "0.5"))
+    # Progressive drafts (defer_summary): background patient summaries, polled by draft id
+    DEFERRED_SUMMARY_MAX_ENTRIES = int(os.getenv("DEFERRED_SUMMARY_MAX_ENTRIES", "256"))
+    DEFERRED_SUMMARY_TTL_SECONDS = float(os.getenv("DEFERRED_SUMMARY_TTL_SECONDS", "900"))
+    DEFERRED_SUMMARY_MAX_WAIT_SECONDS = float(os.getenv("DEFERRED_SUMMARY_MAX_WAIT_SECONDS", "30"))  # long-poll cap
+
+    # Async client connection pool (shared across all in-flight consultations)
+    LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "100"))
+    LLM_HTTP_MAX_KEEPALIVE = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "20"))
+    LLM_HTTP_TIMEOUT_SECONDS = float(os.getenv("LLM_HTTP_TIMEOUT_SECONDS", "120"))
+
+    # LLM backend: "azure" (AsyncLLMClient) or "fake" (offline, deterministic FakeLLMClient for load tests / benchmarks)
+    LLM_BACKEND = os.getenv("LLM_BACKEND", "azure")
+    FAKE_LLM_LATENCY = os.getenv("FAKE_LLM_LATENCY", "lognormal")  # fixed | lognormal | replay
+    FAKE_LLM_LATENCY_SECONDS = float(os.getenv("FAKE_LLM_LATENCY_SECONDS", "2.0"))  # fixed value / lognormal median
+    FAKE_LLM_LATENCY_SIGMA = float(os.getenv("FAKE_LLM_LATENCY_SIGMA", "0.5"))
+    FAKE_LLM_LATENCY_REPLAY_FILE = os.getenv("FAKE_LLM_LATENCY_REPLAY_FILE", "")
+    FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0.0"))
+    FAKE_LLM_SEED = int(os.getenv("FAKE_LLM_SEED", "0"))
+    FAKE_LLM_COMPLETION_TOKENS = int(os.getenv("FAKE_LLM_COMPLETION_TOKENS", "0"))  # 0 = count the generated JSON
+    FAKE_LLM_CACHED_PROMPT_RATIO = float(os.getenv("FAKE_LLM_CACHED_PROMPT_RATIO", "0.0"))
+    FAKE_LLM_STREAM_TTFT_FRACTION = float(os.getenv("FAKE_LLM_STREAM_TTFT_FRACTION", "0.3"))
+    FAKE_LLM_STREAM_CHUNK_CHARS = int(os.getenv("FAKE_LLM_STREAM_CHUNK_CHARS", "16"))
+    FAKE_LLM_SECONDS_PER_COMPLETION_TOKEN = float(os.getenv("FAKE_LLM_SECONDS_PER_COMPLETION_TOKEN", "0.0"))  # decode time on top of latency
+
+    # LLM call resilience: retries with jittered backoff, optional hedging past the p95 latency, circuit breaker
+    LLM_RETRY_MAX_ATTEMPTS = int(os.getenv("LLM_RETRY_MAX_ATTEMPTS", "3"))
+    LLM_RETRY_BASE_DELAY_SECONDS = float(os.getenv("LLM_RETRY_BASE_DELAY_SECONDS", "0.5"))
+    LLM_RETRY_MAX_DELAY_SECONDS = float(os.getenv("LLM_RETRY_MAX_DELAY_SECONDS", "20"))
+    LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+    LLM_HEDGE_LATENCY_PERCENTILE = float(os.getenv("LLM_HEDGE_LATENCY_PERCENTILE", "0.95"))
+    LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+    LLM_HEDGE_MIN_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "1.0"))
+    LLM_LATENCY_WINDOW = int(os.getenv("LLM_LATENCY_WINDOW", "200"))
+    LLM_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", "5"))
+    LLM_CIRCUIT_RESET_SECONDS = float(os.getenv("LLM_CIRCUIT_RESET_SECONDS", "30"))
+
+    # Per-stage deployment routing. JSON object keyed by pipeline stage (clinical_extraction, clinical_extraction_lean,
+    # patient_summary, fused_consultation, incremental_extraction, quote_repair), e.g.
+    # {"patient_summary": {"primary": "gpt-4o-mini", "fallback": "gpt-4o", "latency_budget_seconds": 8}}.
+    # Unlisted stages use AZURE_OPENAI_DEPLOYMENT_NAME. A stage whose primary's median latency over the last
+    # LLM_ROUTE_LATENCY_WINDOW calls exceeds its budget (or whose primary call fails) uses the fallback for
+    # LLM_ROUTE_COOLDOWN_SECONDS before the primary is tried again.
+    LLM_STAGE_ROUTES = os.getenv("LLM_STAGE_ROUTES", "{}")
+    LLM_ROUTE_LATENCY_WINDOW = int(os.getenv("LLM_ROUTE_LATENCY_WINDOW", "20"))
+    LLM_ROUTE_MIN_SAMPLES = int(os.getenv("LLM_ROUTE_MIN_SAMPLES", "5"))
+    LLM_ROUTE_COOLDOWN_SECONDS = float(os.getenv("LLM_ROUTE_COOLDOWN_SECONDS", "60"))
+
+    # Azure OpenAI resources sharing the load (e.g. one per region): JSON list of {"endpoint", "api_key"?,
+    # "api_version"?, "deployments"?: {logical deployment: name on this resource}, "name"?}. Empty = AZURE_OPENAI_ENDPOINT.
+    # Requests go to the endpoint with the lowest EWMA latency x in-flight; 429/5xx eject an endpoint for a while.
+    LLM_ENDPOINT_POOL = os.getenv("LLM_ENDPOINT_POOL", "")
+    LLM_POOL_EWMA_ALPHA = float(os.getenv("LLM_POOL_EWMA_ALPHA", "0.3"))
+    LLM_POOL_EJECT_SECONDS = float(os.getenv("LLM_POOL_EJECT_SECONDS", "5"))
+    LLM_POOL_EJECT_MAX_SECONDS = float(os.getenv("LLM_POOL_EJECT_MAX_SECONDS", "60"))
+
+    # Shared RPM/TPM token buckets (SQLite, coordinated across workers and bulk tools). 0 disables a bucket.
+    LLM_RATE_LIMIT_RPM = int(os.getenv("LLM_RATE_LIMIT_RPM", "0"))
+    LLM_RATE_LIMIT_TPM = int(os.getenv("LLM_RATE_LIMIT_TPM", "0"))
+    LLM_RATE_LIMIT_DB_PATH = os.getenv("LLM_RATE_LIMIT_DB_PATH", os.path.join(BASE_DIR, "llm_rate_limit.db"))
+    LLM_RATE_LIMIT_MAX_WAIT_SECONDS = float(os.getenv("LLM_RATE_LIMIT_MAX_WAIT_SECONDS", "30"))
+
+    # Two-tier LLM result cache (memory LRU + SQLite). Set LLM_CACHE_SQLITE_PATH="" for memory-only.
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_MEMORY_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_MAX_ENTRIES", "512"))
+    LLM_CACHE_MEMORY_TTL_SECONDS = float(os.getenv("LLM_CACHE_MEMORY_TTL_SECONDS", "3600"))
+    LLM_CACHE_SQLITE_PATH = os.getenv("LLM_CACHE_SQLITE_PATH", os.path.join(BASE_DIR, "llm_cache.db"))
+    LLM_CACHE_SQLITE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_SQLITE_MAX_ENTRIES", "10000"))
+    LLM_CACHE_SQLITE_TTL_SECONDS = float(os.getenv("LLM_CACHE_SQLITE_TTL_SECONDS", str(7 * 24 * 3600)))
+    LLM_CACHE_SQLITE_EVICT_EVERY = int(os.getenv("LLM_CACHE_SQLITE_EVICT_EVERY", "100"))  # puts between TTL/size sweeps
+
+    # Per-stage /generate-draft checkpoints, so a retried draft resumes instead of restarting.
+    # They hold raw transcripts and token maps: kept at most the TTL, deleted once the draft completes.
+    # In memory (per process) unless a SQLite file path is set, e.g. on an encrypted volume for multi-worker resume.
+    DRAFT_CHECKPOINTS_ENABLED = os.getenv("DRAFT_CHECKPOINTS_ENABLED", "true").lower() == "true"
+    DRAFT_CHECKPOINT_SQLITE_PATH = os.getenv("DRAFT_CHECKPOINT_SQLITE_PATH", "")
+    DRAFT_CHECKPOINT_TTL_SECONDS = float(os.getenv("DRAFT_CHECKPOINT_TTL_SECONDS", "3600"))
+
+    # Bulk re-processing runner (batch_cli.py)
+    BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
 
 class SchemaConstraints:
     CONDITION_STATUS = Literal["CONFIRMED", "NEGATED", "SUSPECTED", "UNKNOWN"]
@@ -0,0 +1,140 @@
+"""
+Load balancing across several Azure OpenAI resources (LLM_ENDPOINT_POOL), e.g. one per region, so
+throughput is no longer capped by a single deployment's quota.
+
+Each provider request leases the admitted endpoint with the lowest expected wait: EWMA latency of
+its successful calls x (requests in flight + 1). An endpoint that answers 429 / 5xx or fails at the
+transport level is ejected for LLM_POOL_EJECT_SECONDS (at least its Retry-After, doubling on
+consecutive ejections up to LLM_POOL_EJECT_MAX_SECONDS) and re-admitted once that has passed. If
+every endpoint is ejected, the one due back first is used rather than failing outright. Retries and
+hedges in ResilientCaller lease separately, so they land on another endpoint when one is available.
+Waiting for the endpoint's rate-limit quota happens before the lease clock starts, so queueing is
+never mistaken for provider latency.
+"""
+import json
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, Optional
+from urllib.parse import urlparse
+
+from app.core.config import Config
+from app.core.metrics import metrics
+from app.core.resilience import is_retryable, retry_after_seconds
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class PoolEndpoint:
+    endpoint: str
+    api_key: str
+    api_version: str
+    deployments: dict[str, str] = field(default_factory=dict)  # logical deployment -> name on this resource
+    name: str = ""
+    in_flight: int = 0
+    ewma_seconds: Optional[float] = None
+    ejected_until: float = 0.0
+    ejections: int = 0
+
+    def __post_init__(self):
+        self.name = self.name or urlparse(self.endpoint).netloc or self.endpoint
+
+    def deployment(self, model: str) -> str:
+        return self.deployments.get(model, model)
+
+def parse_endpoint_pool(spec: str) -> list[PoolEndpoint]:
+    """
+    Parses the LLM_ENDPOINT_POOL JSON list of {"endpoint", "api_key"?, "api_version"?, "deployments"?, "name"?}.
+    Missing keys/versions fall back to OPENAI_API_KEY / AZURE_OPENAI_API_VERSION; an empty spec is the
+    single AZURE_OPENAI_ENDPOINT resource.
+    """
+    raw = json.loads(spec) if spec and spec.strip() else [{"endpoint": Config.ENDPOINT}]
+    if not isinstance(raw, list) or not raw:
+        raise ValueError("LLM_ENDPOINT_POOL must be a non-empty JSON list of endpoint entries")
+    endpoints = []
+    for entry in raw:
+        api_key = entry.get("api_key") or Config.KEY
+        if not api_key:
+            raise RuntimeError(f"CRITICAL: no api_key for pool endpoint {entry['endpoint']} and OPENAI_API_KEY is unset")
+        endpoints.append(PoolEndpoint(
+            endpoint=entry["endpoint"],
+            api_key=api_key,
+            api_version=entry.get("api_version") or Config.VERSION,
+            deployments=entry.get("deployments") or {},
+            name=entry.get("name", "")
+        ))
+    return endpoints
+
+class EndpointPool:
+    def __init__(self, endpoints: list[PoolEndpoint]):
+        self.endpoints = endpoints
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _score(endpoint: PoolEndpoint) -> tuple[float, int]:
+        # An endpoint without samples scores 0, so every member is measured early; ties go to the least busy.
+        return (endpoint.ewma_seconds or 0.0) * (endpoint.in_flight + 1), endpoint.in_flight
+
+    def acquire(self) -> PoolEndpoint:
+        now = time.monotonic()
+        with self._lock:
+            admitted = [e for e in self.endpoints if e.ejected_until <= now]
+            if admitted:
+                endpoint = min(admitted, key=self._score)
+            else:
+                endpoint = min(self.endpoints, key=lambda e: e.ejected_until)
+            endpoint.in_flight += 1
+        metrics.incr(f"llm.pool.{endpoint.name}.requests")
+        return endpoint
+
+    def abandon(self, endpoint: PoolEndpoint):
+        """Ends a lease that never reached the provider: no latency sample, no ejection."""
+        with self._lock:
+            endpoint.in_flight -= 1
+
+    def release(self, endpoint: PoolEndpoint, seconds: Optional[float] = None, error: Optional[BaseException] = None):
+        """Ends a lease: a success feeds the latency EWMA, a transient failure ejects the endpoint."""
+        with self._lock:
+            endpoint.in_flight -= 1
+            if error is None:
+                if seconds is not None:
+                    alpha = Config.LLM_POOL_EWMA_ALPHA
+                    previous = endpoint.ewma_seconds
+                    endpoint.ewma_seconds = seconds if previous is None else alpha * seconds + (1 - alpha) * previous
+                endpoint.ejections = 0
+                return
+            if not is_retryable(error):
+                return
+            endpoint.ejections += 1
+            duration = min(
+                Config.LLM_POOL_EJECT_MAX_SECONDS,
+                max(Config.LLM_POOL_EJECT_SECONDS * 2 ** (endpoint.ejections - 1), retry_after_seconds(error) or 0.0)
+            )
+            endpoint.ejected_until = time.monotonic() + duration
+        metrics.incr(f"llm.pool.{endpoint.name}.ejected")
+        logger.warning(f"Endpoint {endpoint.name} ejected for {duration:.1f}s after: {error}")
+
+    @asynccontextmanager
+    async def lease(self, admit: Optional[Callable[[PoolEndpoint], Awaitable[None]]] = None) -> AsyncIterator[PoolEndpoint]:
+        """
+        Leases the best endpoint. `admit` (e.g. the endpoint's quota wait) runs once it is chosen and
+        before the latency clock starts; if it fails the lease ends without a sample or an ejection.
+        """
+        endpoint = self.acquire()
+        if admit is not None:
+            try:
+                await admit(endpoint)
+            except BaseException:
+                self.abandon(endpoint)
+                raise
+        started = time.perf_counter()
+        error = None
+        try:
+            yield endpoint
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self.release(endpoint, None if error else time.perf_counter() - started, error)
@@ -0,0 +1,325 @@
+"""
+Deterministic, offline stand-in for AsyncLLMClient (LLM_BACKEND=fake).
+
+Responses are schema-valid objects derived from the transcript in the request with simple
+keyword rules, so every exact_quote / contextual_quote is a real substring and the guardrail,
+hydration and PDF paths run exactly as in production. Latency, injected error rate and token
+accounting are configurable (FAKE_LLM_*) so the orchestrator can be load-tested and benchmarked
+at realistic LLM latencies without network access or credentials.
+
+Latency distributions (FAKE_LLM_LATENCY):
+  fixed      always FAKE_LLM_LATENCY_SECONDS
+  lognormal  median FAKE_LLM_LATENCY_SECONDS, shape FAKE_LLM_LATENCY_SIGMA
+  replay     cycles through FAKE_LLM_LATENCY_REPLAY_FILE (one latency in seconds per line),
+             e.g. exported from production `llm.*.latency_seconds` samples
+FAKE_LLM_SECONDS_PER_COMPLETION_TOKEN adds decode time proportional to the response size, so
+output-size changes (e.g. the lean extraction schema) show up in benchmark latencies.
+"""
+import asyncio
+import json
+import logging
+import random
+import re
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, List, Type, TypeVar
+
+import httpx
+from openai import InternalServerError, LengthFinishReasonError
+from openai.types import CompletionUsage
+from openai.types.chat import ChatCompletion, ChatCompletionMessage
+from openai.types.chat.chat_completion import Choice
+from openai.types.completion_usage import PromptTokensDetails
+from pydantic import BaseModel
+
+from app.core.config import Config
+from app.core.rate_limiter import SQLiteRateLimiter
+from app.core.resilience import ResilientCaller
+from app.core.tokens import UsageRecord, count_message_tokens, count_tokens
+from app.models.llm_schemas import (
+    ActionableItem, ClinicalExtractionThoughtProcess, ClinicalReport, DiagnosticResult, FusedConsultation, LeanAction,
+    LeanClinicalExtraction, LeanFinding, PatientSummary, QuoteRepair, RepairedQuote
+)
+
+T = TypeVar("T", bound=BaseModel)
+logger = logging.getLogger(__name__)
+
+_TURN = re.compile(r"^\s*\[?(?P<speaker>[A-Za-z][\w\- ]{0,30})\]?:\s*", re.MULTILINE)
+_SENTENCE = re.compile(r"[^.!?\n]+[.!?]?")
+_WORD = re.compile(r"\S+")
+
+_SYMPTOM = re.compile(r"\b(pain|ache|aches|itch\w*|cough\w*|fever|nause\w*|dizz\w*|tired|fatigue|swell\w*|rash|headache\w*|migraine\w*|bleed\w*|numb\w*|darker|stiff\w*|sore)\b", re.IGNORECASE)
+_ASSESSMENT = re.compile(r"\b(diagnos\w*|suspect\w*|likely|looks like|consistent with|indicat\w*|irregular|sprain\w*|fracture\w*|infection)\b", re.IGNORECASE)
+_NEGATION = re.compile(r"\b(no|not|never|denies|denied|without|don't|haven't)\b", re.IGNORECASE)
+_FAMILY = re.compile(r"\b(mother|father|mom|dad|sister|brother|grandmother|grandfather|aunt|uncle)\b", re.IGNORECASE)
+_ACTIONS = [
+    ("PHARMACY_PICKUP", re.compile(r"\b(prescrib\w*|mg|ointment|tablets?|cream|apply|take)\b", re.IGNORECASE)),
+    ("FOLLOW_UP_APPT", re.compile(r"\b(follow-up|follow up|schedule|come back|see you)\b", re.IGNORECASE)),
+    ("LAB_TEST", re.compile(r"\b(biopsy|blood test|x-ray|mri|ct scan|ultrasound|lab\w*)\b", re.IGNORECASE)),
+    ("LIFESTYLE_CHANGE", re.compile(r"\b(rest|exercise|diet|avoid|sleep|hydrat\w*)\b", re.IGNORECASE)),
+]
+_MAX_ITEMS_PER_SECTION = 6
+
+def _sentences(transcript: str):
+    """Yields (speaker, sentence_start, sentence_end) over the transcript, in order."""
+    turns = list(_TURN.finditer(transcript))
+    bounds = [(m.group("speaker").strip(), m.end(), turns[i + 1].start() if i + 1 < len(turns) else len(transcript))
+              for i, m in enumerate(turns)] or [("", 0, len(transcript))]
+    for speaker, start, end in bounds:
+        for s in _SENTENCE.finditer(transcript, start, end):
+            if s.group().strip():
+                yield speaker, s.start(), s.end()
+
+def _quotes(transcript: str, start: int, end: int, match: re.Match) -> tuple[str, str]:
+    """exact_quote: the keyword plus up to 3 following words; contextual_quote: +/- 5 words. Both are slices."""
+    words = list(_WORD.finditer(transcript, start, end))
+    idx = next((i for i, w in enumerate(words) if w.end() > match.start()), 0)
+    exact = transcript[max(match.start(), words[idx].start()):words[min(idx + 3, len(words) - 1)].end()]
+    lo, hi = max(0, idx - 5), min(len(words) - 1, idx + 8)
+    contextual = transcript[words[lo].start():words[hi].end()]
+    return exact.rstrip(".,;!?") or exact, contextual
+
+def _is_doctor(speaker: str) -> bool:
+    return speaker.lower().startswith(("doc", "dr", "physician", "guest-1"))
+
+def fake_clinical_extraction(transcript: str) -> ClinicalExtractionThoughtProcess:
+    complaints, assessments, actionables = [], [], []
+    negations, family = [], []
+    for speaker, start, end in _sentences(transcript):
+        sentence = transcript[start:end]
+        if not _is_doctor(speaker):
+            m = _SYMPTOM.search(transcript, start, end)
+            if m and len(complaints) < _MAX_ITEMS_PER_SECTION:
+                exact, contextual = _quotes(transcript, start, end, m)
+                negated = bool(_NEGATION.search(transcript, start, m.start()))
+                subject = "FAMILY_MEMBER" if _FAMILY.search(sentence) else "PATIENT"
+                complaints.append(DiagnosticResult(
+                    finding=m.group().lower(), condition_status="NEGATED" if negated else "CONFIRMED",
+                    subject=subject, exact_quote=exact, contextual_quote=contextual
+                ))
+                if negated:
+                    negations.append(exact)
+                if subject == "FAMILY_MEMBER":
+                    family.append(exact)
+            continue
+
+        m = _ASSESSMENT.search(transcript, start, end)
+        if m and len(assessments) < _MAX_ITEMS_PER_SECTION:
+            exact, contextual = _quotes(transcript, start, end, m)
+            assessments.append(DiagnosticResult(
+                finding=m.group().lower(), condition_status="SUSPECTED", subject="PATIENT",
+                exact_quote=exact, contextual_quote=contextual
+            ))
+        for action_type, pattern in _ACTIONS:
+            m = pattern.search(transcript, start, end)
+            if m and len(actionables) < _MAX_ITEMS_PER_SECTION:
+                exact, contextual = _quotes(transcript, start, end, m)
+                actionables.append(ActionableItem(
+                    action_type=action_type, description=sentence.strip(),
+                    exact_quote=exact, contextual_quote=contextual
+                ))
+                break
+
+    return ClinicalExtractionThoughtProcess(
+        negation_check=("Negated: " + "; ".join(negations)) if negations else "No negations found.",
+        attribution_check=("Family history: " + "; ".join(family)) if family else "All findings refer to the patient.",
+        final_validated_clinical_report=ClinicalReport(
+            chief_complaints=complaints, assessments=assessments, actionables=actionables
+        )
+    )
+
+def fake_patient_summary(clinical: dict) -> PatientSummary:
+    findings = [c["finding"] for c in clinical.get("chief_complaints", []) + clinical.get("assessments", [])]
+    actionables = [ActionableItem(**a) for a in clinical.get("actionables", [])]
+    explanation = "During your visit we talked about " + (", ".join(dict.fromkeys(findings)) or "how you are feeling") + "."
+    if actionables:
+        explanation += " Your next steps are listed below."
+    return PatientSummary(layman_explanation=explanation, actionables=actionables)
+
+def fake_fused_consultation(transcript: str) -> FusedConsultation:
+    extraction = fake_clinical_extraction(transcript)
+    summary = fake_patient_summary(extraction.final_validated_clinical_report.model_dump())
+    return FusedConsultation(**dict(extraction), patient_summary=summary)
+
+def fake_lean_extraction(transcript: str) -> LeanClinicalExtraction:
+    report = fake_clinical_extraction(transcript)
+    clinical = report.final_validated_clinical_report
+    def lean_finding(d: DiagnosticResult) -> LeanFinding:
+        return LeanFinding(f=d.finding, s=d.condition_status, p=d.subject, q=d.exact_quote, r=d.system_reference_id)
+    negated = [c.exact_quote for c in clinical.chief_complaints if c.condition_status == "NEGATED"]
+    return LeanClinicalExtraction(
+        n=("Negated: " + "; ".join(negated)) if negated else None,
+        cc=[lean_finding(c) for c in clinical.chief_complaints],
+        dx=[lean_finding(a) for a in clinical.assessments],
+        a=[LeanAction(t=a.action_type, d=a.description, w=a.timeframe, r=a.system_reference_id, q=a.exact_quote) for a in clinical.actionables]
+    )
+
+def fake_quote_repair(items: list[dict], excerpt: str) -> QuoteRepair:
+    """Re-quotes each item from the first excerpt sentence mentioning a word (4+ letters) of its finding/description."""
+    repairs = []
+    for item in items:
+        words = [w for w in re.findall(r"[A-Za-z]{4,}", item.get("finding") or item.get("description") or "")]
+        pattern = re.compile(r"\b(" + "|".join(map(re.escape, words)) + r")", re.IGNORECASE) if words else None
+        found = None
+        for _, start, end in _sentences(excerpt) if pattern else ():
+            m = pattern.search(excerpt, start, end)
+            if m:
+                found = _quotes(excerpt, start, end, m)
+                break
+        repairs.append(RepairedQuote(
+            item_index=item["item_index"], supported=found is not None,
+            exact_quote=found[0] if found else "", contextual_quote=found[1] if found else ""
+        ))
+    return QuoteRepair(repairs=repairs)
+
+def _transcript_of(messages: List[Dict[str, str]]) -> str:
+    return messages[-1]["content"].rsplit("Transcript:", 1)[-1].lstrip()
+
+def _clinical_of(messages: List[Dict[str, str]]) -> dict:
+    m = re.search(r"Clinical Report:\n(.*?)\n\nTranscript:", messages[-1]["content"], re.DOTALL)
+    return json.loads(m.group(1)) if m else {}
+
+# response_format -> builder(messages). Additional response schemas register a builder here.
+RESPONSE_BUILDERS: Dict[type, Callable[[List[Dict[str, str]]], BaseModel]] = {
+    ClinicalExtractionThoughtProcess: lambda messages: fake_clinical_extraction(_transcript_of(messages)),
+    PatientSummary: lambda messages: fake_patient_summary(_clinical_of(messages)),
+    FusedConsultation: lambda messages: fake_fused_consultation(_transcript_of(messages)),
+    LeanClinicalExtraction: lambda messages: fake_lean_extraction(_transcript_of(messages)),
+    QuoteRepair: lambda messages: fake_quote_repair(
+        json.loads(messages[1]["content"].split("\n", 1)[1]), _transcript_of(messages)
+    ),
+}
+
+class LatencyModel:
+    """Seeded sampler for the configured latency distribution (deterministic for a given call order)."""
+    def __init__(self, kind: str = Config.FAKE_LLM_LATENCY, seconds: float = Config.FAKE_LLM_LATENCY_SECONDS,
+                 sigma: float = Config.FAKE_LLM_LATENCY_SIGMA, replay_file: str = Config.FAKE_LLM_LATENCY_REPLAY_FILE,
+                 seed: int = Config.FAKE_LLM_SEED):
+        self.kind = kind
+        self.seconds = seconds
+        self.sigma = sigma
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._replay: list[float] = []
+        self._replay_pos = 0
+        if kind == "replay":
+            with open(replay_file, encoding="utf-8") as f:
+                self._replay = [float(line) for line in f if line.strip()]
+            if not self._replay:
+                raise ValueError(f"FAKE_LLM_LATENCY_REPLAY_FILE {replay_file!r} has no samples")
+        elif kind not in ("fixed", "lognormal"):
+            raise ValueError(f"Unknown FAKE_LLM_LATENCY distribution: {kind!r}")
+
+    def sample(self) -> float:
+        with self._lock:
+            if self.kind == "fixed":
+                return self.seconds
+            if self.kind == "lognormal":
+                return self._rng.lognormvariate(0, self.sigma) * self.seconds
+            value = self._replay[self._replay_pos % len(self._replay)]
+            self._replay_pos += 1
+            return value
+
+    def roll(self) -> float:
+        with self._lock:
+            return self._rng.random()
+
+class FakeLLMClient:
+    """Drop-in for AsyncLLMClient: same methods, same resilience wrapper, no network."""
+    def __init__(self, latency: LatencyModel | None = None, error_rate: float = Config.FAKE_LLM_ERROR_RATE):
+        self.model = "fake"
+        self.latency = latency or LatencyModel()
+        self.error_rate = error_rate
+        self.resilience = ResilientCaller("llm")
+        self.rate_limiter = SQLiteRateLimiter(key="fake")
+        self._lanes = {self.model: (self.resilience, self.rate_limiter)}
+        logger.info(f"FakeLLMClient initialized. Latency: {self.latency.kind} ({self.latency.seconds}s), error rate: {error_rate}")
+
+    def _respond(self, messages: List[Dict[str, str]], response_format: Type[T], max_tokens: int) -> tuple[T, CompletionUsage, str]:
+        builder = RESPONSE_BUILDERS.get(response_format)
+        if builder is None:
+            raise TypeError(f"FakeLLMClient cannot answer response_format {response_format.__name__}; expected one of {[f.__name__ for f in RESPONSE_BUILDERS]}")
+        parsed = builder(messages)
+        prompt_tokens = count_message_tokens(messages)
+        completion_tokens = Config.FAKE_LLM_COMPLETION_TOKENS or count_tokens(parsed.model_dump_json())
+        usage = CompletionUsage(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=prompt_tokens + completion_tokens,
+            prompt_tokens_details=PromptTokensDetails(cached_tokens=int(prompt_tokens * Config.FAKE_LLM_CACHED_PROMPT_RATIO))
+        )
+        if completion_tokens > max_tokens:
+            raise LengthFinishReasonError(completion=ChatCompletion(
+                id="fake", object="chat.completion", created=0, model=self.model, usage=usage,
+                choices=[Choice(index=0, finish_reason="length", message=ChatCompletionMessage(role="assistant", content=""))]
+            ))
+        return parsed, usage, "stop"
+
+    def _lane(self, model: str) -> tuple[ResilientCaller, SQLiteRateLimiter]:
+        lane = self._lanes.get(model)
+        if lane is None:
+            lane = self._lanes[model] = (ResilientCaller("llm"), SQLiteRateLimiter(key=f"fake|{model}"))
+        return lane
+
+    def _maybe_fail(self):
+        if self.error_rate and self.latency.roll() < self.error_rate:
+            request = httpx.Request("POST", "http://fake-llm/chat/completions")
+            raise InternalServerError("Injected fake LLM failure", response=httpx.Response(500, request=request), body=None)
+
+    async def parse_completion(
+        self,
+        messages: List[Dict[str, str]],
+        response_format: Type[T],
+        max_tokens: int = Config.MAX_TOKENS_DEFAULT,
+        usage: UsageRecord | None = None,
+        model: str | None = None
+    ) -> T:
+        resilience, rate_limiter = self._lane(model or self.model)
+        quota_tokens = count_message_tokens(messages) + max_tokens
+
+        async def attempt():
+            await rate_limiter.acquire(quota_tokens)
+            await asyncio.sleep(self.latency.sample())
+            self._maybe_fail()
+            response = self._respond(messages, response_format, max_tokens)
+            await asyncio.sleep(response[1].completion_tokens * Config.FAKE_LLM_SECONDS_PER_COMPLETION_TOKEN)
+            return response
+
+        try:
+            parsed, reported, finish_reason = await resilience.call(response_format.__name__, attempt)
+        except LengthFinishReasonError as e:
+            if usage is not None:
+                usage.update_from(e.completion.usage, "length")
+            raise
+        if usage is not None:
+            usage.update_from(reported, finish_reason)
+        return parsed
+
+    async def stream_completion(
+        self,
+        messages: List[Dict[str, str]],
+        response_format: Type[T],
+        max_tokens: int = Config.MAX_TOKENS_DEFAULT,
+        usage: UsageRecord | None = None,
+        model: str | None = None
+    ) -> AsyncIterator[tuple[str, Any]]:
+        """Time to first token is FAKE_LLM_STREAM_TTFT_FRACTION of the sampled latency; the rest is spread over chunks."""
+        _, rate_limiter = self._lane(model or self.model)
+        await rate_limiter.acquire(count_message_tokens(messages) + max_tokens)
+        total = self.latency.sample()
+        await asyncio.sleep(total * Config.FAKE_LLM_STREAM_TTFT_FRACTION)
+        self._maybe_fail()
+        parsed, reported, finish_reason = self._respond(messages, response_format, max_tokens)
+        raw = parsed.model_dump_json()
+        chunks = [raw[i:i + Config.FAKE_LLM_STREAM_CHUNK_CHARS] for i in range(0, len(raw), Config.FAKE_LLM_STREAM_CHUNK_CHARS)]
+        decode = total * (1 - Config.FAKE_LLM_STREAM_TTFT_FRACTION) + reported.completion_tokens * Config.FAKE_LLM_SECONDS_PER_COMPLETION_TOKEN
+        per_chunk = decode / max(1, len(chunks))
+        for chunk in chunks:
+            yield "delta", chunk
+            await asyncio.sleep(per_chunk)
+        if usage is not None:
+            usage.update_from(reported, finish_reason)
+        yield "parsed", parsed
+
+    async def aclose(self):
+        for _, rate_limiter in self._lanes.values():
+            rate_limiter.close()
@@ -1,54 +1,214 @@
+import asyncio
 import logging
-from typing import Type, TypeVar, List, Dict, Any
-from openai import AzureOpenAI
+from typing import Type, TypeVar, List, Dict, Any, AsyncIterator
+import httpx
+from openai import AsyncAzureOpenAI, LengthFinishReasonError
 from pydantic import BaseModel
 from app.core.config import Config
+from app.core.tokens import UsageRecord, count_message_tokens
+from app.core.resilience import CircuitOpenError, ResilientCaller, is_retryable
+from app.core.rate_limiter import RateLimitExceededError, SQLiteRateLimiter
+from app.core.endpoint_pool import EndpointPool, PoolEndpoint, parse_endpoint_pool
+from app.core.response_formats import parse_message, prepare_response_formats, response_format_param
+from app.models.llm_schemas import RESPONSE_FORMATS
 
 T = TypeVar("T", bound=BaseModel)
 logger = logging.getLogger(__name__)
 
-class LLMClient:
+def _validate_config():
+    """Validate all critical configuration points before the client is built."""
+    required_vars = {
+        # Pool entries may carry their own keys (checked by parse_endpoint_pool)
+        "OPENAI_API_KEY": Config.KEY or Config.LLM_ENDPOINT_POOL,
+        "AZURE_OPENAI_ENDPOINT": Config.ENDPOINT,
+        "AZURE_OPENAI_DEPLOYMENT_NAME": Config.MODEL
+    }
+
+    missing = [var for var, val in required_vars.items() if not val]
+    if missing:
+        raise RuntimeError(f"CRITICAL: Environment variables missing: {', '.join(missing)}")
+
+class AsyncLLMClient:
     """
-    Factored LLM Client for handling Azure OpenAI interactions.
-    Encapsulates initialization, parsing, and error handling.
+    Azure OpenAI client used by the FastAPI request path and the bulk tools.
+    Holds a single pooled httpx.AsyncClient so concurrent consultations reuse
+    keep-alive connections instead of opening one TLS session per call.
+    Requests are spread over the LLM_ENDPOINT_POOL resources (one SDK client each).
     """
     def __init__(self):
-        # Validate all critical configuration points
-        required_vars = {
-            "OPENAI_API_KEY": Config.KEY,
-            "AZURE_OPENAI_ENDPOINT": Config.ENDPOINT,
-            "AZURE_OPENAI_DEPLOYMENT_NAME": Config.MODEL
-        }
-        
-        missing = [var for var, val in required_vars.items() if not val]
-        if missing:
-            raise RuntimeError(f"CRITICAL: Environment variables missing: {', '.join(missing)}")
-        
-        self.client = AzureOpenAI(
-            azure_endpoint=Config.ENDPOINT,
-            api_key=Config.KEY,
-            api_version=Config.VERSION
+        _validate_config()
+
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=Config.LLM_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=Config.LLM_HTTP_MAX_KEEPALIVE
+            ),
+            timeout=httpx.Timeout(Config.LLM_HTTP_TIMEOUT_SECONDS)
         )
+        self.pool = EndpointPool(parse_endpoint_pool(Config.LLM_ENDPOINT_POOL))
+        self.clients = {
+            endpoint.endpoint: AsyncAzureOpenAI(
+                azure_endpoint=endpoint.endpoint,
+                api_key=endpoint.api_key,
+                api_version=endpoint.api_version,
+                http_client=self.http_client,
+                max_retries=0  # retries, hedging and circuit breaking are handled by ResilientCaller
+            )
+            for endpoint in self.pool.endpoints
+        }
+        self.client = self.clients[self.pool.endpoints[0].endpoint]
         self.model = Config.MODEL
-        logger.info(f"LLMClient initialized. Deployment: {self.model}")
+        prepare_response_formats(*RESPONSE_FORMATS)
+        self.resilience = ResilientCaller("llm")
+        self._callers = {self.model: self.resilience}
+        self._rate_limiters: dict[str, SQLiteRateLimiter] = {}
+        logger.info(
+            f"AsyncLLMClient initialized. Deployment: {self.model}, "
+            f"endpoints: {', '.join(e.name for e in self.pool.endpoints)}, "
+            f"pool size: {Config.LLM_HTTP_MAX_CONNECTIONS}"
+        )
+
+    def _caller(self, model: str) -> ResilientCaller:
+        """Breaker/latency tracker per logical deployment; it only opens once the whole pool keeps failing."""
+        caller = self._callers.get(model)
+        if caller is None:
+            caller = self._callers[model] = ResilientCaller("llm")
+        return caller
+
+    def _rate_limiter(self, endpoint: PoolEndpoint, deployment: str) -> SQLiteRateLimiter:
+        """Quota bucket per resource and deployment (Azure quotas are per deployment)."""
+        key = f"{endpoint.endpoint}|{deployment}"
+        limiter = self._rate_limiters.get(key)
+        if limiter is None:
+            limiter = self._rate_limiters[key] = SQLiteRateLimiter(key=key)
+        return limiter
 
-    def parse_completion(
-        self, 
-        messages: List[Dict[str, str]], 
+    async def parse_completion(
+        self,
+        messages: List[Dict[str, str]],
         response_format: Type[T],
-        max_tokens: int = Config.MAX_TOKENS_DEFAULT
+        max_tokens: int = Config.MAX_TOKENS_DEFAULT,
+        usage: UsageRecord | None = None,
+        model: str | None = None
     ) -> T:
         """
-        Generic structured output parser using the OpenAI Beta parse API.
+        Awaitable structured output parser using the OpenAI Beta parse API (with the precomputed schema).
+        If `usage` is given it is filled with the provider-reported token usage (also on truncation).
+        Transient failures are retried (and slow calls optionally hedged) by the deployment's ResilientCaller.
+        `model` selects another logical deployment (default: AZURE_OPENAI_DEPLOYMENT_NAME); each attempt
+        is sent to the pool endpoint currently expected to answer first.
         """
+        model = model or self.model
+        resilience = self._caller(model)
+        schema = response_format_param(response_format)
+        quota_tokens = count_message_tokens(messages) + max_tokens
+
+        async def admit(endpoint: PoolEndpoint):
+            await self._rate_limiter(endpoint, endpoint.deployment(model)).acquire(quota_tokens)
+
+        async def attempt():
+            async with self.pool.lease(admit) as endpoint:
+                return await self.clients[endpoint.endpoint].beta.chat.completions.parse(
+                    model=endpoint.deployment(model),
+                    messages=messages,
+                    response_format=schema,
+                    max_tokens=max_tokens
+                )
+
         try:
-            response = self.client.beta.chat.completions.parse(
-                model=self.model,
-                messages=messages,
-                response_format=response_format,
-                max_tokens=max_tokens
-            )
-            return response.choices[0].message.parsed
+            response = await resilience.call(response_format.__name__, attempt)
+            if usage is not None:
+                usage.update_from(response.usage, response.choices[0].finish_reason)
+            return parse_message(response_format, response.choices[0].message)
+        except LengthFinishReasonError as e:
+            if usage is not None:
+                usage.update_from(e.completion.usage, "length")
+            logger.error(f"LLM Parsing failed: {e}")
+            raise
         except Exception as e:
             logger.error(f"LLM Parsing failed: {e}")
             raise
+
+    async def stream_completion(
+        self,
+        messages: List[Dict[str, str]],
+        response_format: Type[T],
+        max_tokens: int = Config.MAX_TOKENS_DEFAULT,
+        usage: UsageRecord | None = None,
+        model: str | None = None
+    ) -> AsyncIterator[tuple[str, Any]]:
+        """
+        Streaming structured output. Yields ("delta", raw_json_fragment) as tokens arrive,
+        then a single ("parsed", T) once the SDK has validated the complete response.
+        A stream that fails before its first delta is retried like parse_completion; once text
+        has been yielded it cannot be replayed, so later failures are raised as-is. No hedging.
+        """
+        model = model or self.model
+        resilience = self._caller(model)
+        breaker = resilience.breaker
+        schema = response_format_param(response_format)
+        quota_tokens = count_message_tokens(messages) + max_tokens
+
+        async def admit(endpoint: PoolEndpoint):
+            await self._rate_limiter(endpoint, endpoint.deployment(model)).acquire(quota_tokens)
+
+        attempt = 0
+        while True:
+            attempt += 1
+            emitted = False
+            probe = False
+            try:
+                probe = breaker.before_call()
+                async with self.pool.lease(admit) as endpoint:
+                    async with self.clients[endpoint.endpoint].beta.chat.completions.stream(
+                        model=endpoint.deployment(model),
+                        messages=messages,
+                        response_format=schema,
+                        max_tokens=max_tokens,
+                        stream_options={"include_usage": True}
+                    ) as stream:
+                        async for event in stream:
+                            if event.type == "content.delta":
+                                emitted = True
+                                yield "delta", event.delta
+                        completion = await stream.get_final_completion()
+            except CircuitOpenError:
+                raise
+            except (asyncio.CancelledError, GeneratorExit, RateLimitExceededError):
+                # Cancelled, a consumer that stopped reading, or no quota in time: no verdict on health
+                if probe:
+                    breaker.release_probe()
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    if probe:
+                        breaker.release_probe()
+                    logger.error(f"LLM Streaming failed: {e}")
+                    raise
+                breaker.record_failure()
+                if emitted or attempt >= Config.LLM_RETRY_MAX_ATTEMPTS:
+                    logger.error(f"LLM Streaming failed: {e}")
+                    raise
+                await resilience.backoff(attempt, e)
+                continue
+            breaker.record_success()
+            break
+        if usage is not None:
+            usage.update_from(completion.usage, completion.choices[0].finish_reason)
+        yield "parsed", parse_message(response_format, completion.choices[0].message)
+
+    async def aclose(self):
+        """Release pooled connections. Called from the application lifespan on shutdown."""
+        for client in self.clients.values():
+            await client.close()
+        for rate_limiter in self._rate_limiters.values():
+            rate_limiter.close()
+
+def create_llm_client():
+    """Returns the async LLM backend selected by LLM_BACKEND ("azure" or "fake")."""
+    if Config.LLM_BACKEND == "fake":
+        from app.core.fake_llm import FakeLLMClient
+        return FakeLLMClient()
+    if Config.LLM_BACKEND != "azure":
+        raise RuntimeError(f"Unknown LLM_BACKEND: {Config.LLM_BACKEND!r}")
+    return AsyncLLMClient()
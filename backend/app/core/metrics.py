@@ -0,0 +1,88 @@
+"""
+Process-local metrics registry.
+Counters and timing observations recorded by the pipeline and its infrastructure
+(cache, rate limiter, single-flight, ...). Exposed via GET /api/v1/debug/metrics.
+"""
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Awaitable, TypeVar
+
+R = TypeVar("R")
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[str, float] = defaultdict(float)
+        self._observations: dict[str, dict] = {}
+
+    def incr(self, name: str, value: float = 1):
+        with self._lock:
+            self._counters[name] += value
+
+    def observe(self, name: str, value: float):
+        """Record one sample (e.g. a latency in seconds). Keeps count/sum/min/max/last."""
+        with self._lock:
+            obs = self._observations.get(name)
+            if obs is None:
+                self._observations[name] = {"count": 1, "sum": value, "min": value, "max": value, "last": value}
+                return
+            obs["count"] += 1
+            obs["sum"] += value
+            obs["min"] = min(obs["min"], value)
+            obs["max"] = max(obs["max"], value)
+            obs["last"] = value
+
+    def counter(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            observations = {
+                name: {**obs, "mean": obs["sum"] / obs["count"]}
+                for name, obs in self._observations.items()
+            }
+            return {"counters": dict(self._counters), "observations": observations}
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._observations.clear()
+
+metrics = MetricsRegistry()
+
+class StageTimer:
+    """
+    Per-request wall-clock timings for named pipeline stages.
+    Stages may overlap (concurrent tasks); `report()` shows both the wall-clock total and the
+    sequential sum, so the difference is the time saved by overlapping.
+    """
+    def __init__(self):
+        self._origin = time.perf_counter()
+        self.timings_ms: dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings_ms[name] = round(elapsed * 1000, 1)
+            metrics.observe(f"stage.{name}.seconds", elapsed)
+
+    async def measure(self, name: str, awaitable: Awaitable[R]) -> R:
+        with self.stage(name):
+            return await awaitable
+
+    def report(self) -> dict:
+        wall_clock_ms = round((time.perf_counter() - self._origin) * 1000, 1)
+        sequential_ms = round(sum(self.timings_ms.values()), 1)
+        return {
+            "stage_timings_ms": dict(self.timings_ms),
+            "wall_clock_ms": wall_clock_ms,
+            "sequential_sum_ms": sequential_ms,
+            "overlap_saved_ms": round(max(sequential_ms - wall_clock_ms, 0.0), 1),
+        }
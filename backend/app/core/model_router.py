@@ -0,0 +1,137 @@
+"""
+Per-stage deployment routing (LLM_STAGE_ROUTES).
+
+Each pipeline stage maps to a primary deployment and an optional fallback. The router watches the
+primary's recent latencies per stage; once their median exceeds the stage's latency budget, or a
+primary call fails outright, the stage is served by the fallback for LLM_ROUTE_COOLDOWN_SECONDS and
+then the primary is tried again with a fresh window. Decisions are counted in metrics and can be
+collected per request (debug trace) with `ModelRouter.trace()`.
+"""
+import contextvars
+import json
+import logging
+import statistics
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+from app.core.config import Config
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+_trace: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("model_routing_trace", default=None)
+
+@dataclass(frozen=True)
+class StageRoute:
+    primary: str
+    fallback: Optional[str] = None
+    latency_budget_seconds: Optional[float] = None
+
+@dataclass(frozen=True)
+class RouteDecision:
+    stage: str
+    model: str
+    reason: str  # "default" | "primary" | "fallback:latency" | "fallback:error"
+
+    @property
+    def is_fallback(self) -> bool:
+        return self.reason.startswith("fallback")
+
+def parse_stage_routes(spec: str) -> dict[str, StageRoute]:
+    """Parses the LLM_STAGE_ROUTES JSON; a bare string value is shorthand for {"primary": value}."""
+    raw = json.loads(spec or "{}")
+    if not isinstance(raw, dict):
+        raise ValueError("LLM_STAGE_ROUTES must be a JSON object keyed by stage")
+    routes = {}
+    for stage, route in raw.items():
+        if isinstance(route, str):
+            route = {"primary": route}
+        routes[stage] = StageRoute(
+            primary=route["primary"],
+            fallback=route.get("fallback"),
+            latency_budget_seconds=route.get("latency_budget_seconds")
+        )
+    return routes
+
+class ModelRouter:
+    def __init__(self, routes: dict[str, StageRoute] | None = None, default_model: str | None = None):
+        self.routes = parse_stage_routes(Config.LLM_STAGE_ROUTES) if routes is None else routes
+        self.default_model = default_model or Config.MODEL
+        self._lock = threading.Lock()
+        self._latencies: dict[str, deque[float]] = {}
+        self._fallback_until: dict[str, tuple[float, str]] = {}
+
+    def route(self, stage: str) -> StageRoute:
+        return self.routes.get(stage) or StageRoute(primary=self.default_model)
+
+    def choose(self, stage: str) -> RouteDecision:
+        route = self.route(stage)
+        if stage not in self.routes:
+            decision = RouteDecision(stage, route.primary, "default")
+        else:
+            with self._lock:
+                until, cause = self._fallback_until.get(stage, (0.0, ""))
+                if route.fallback and time.monotonic() < until:
+                    decision = RouteDecision(stage, route.fallback, f"fallback:{cause}")
+                else:
+                    if until:
+                        # Cooldown over: give the primary a fresh window.
+                        del self._fallback_until[stage]
+                        self._latencies.pop(stage, None)
+                    decision = RouteDecision(stage, route.primary, "primary")
+        self._record(decision)
+        return decision
+
+    def observe(self, decision: RouteDecision, seconds: float):
+        """Latency of a successful call; only primary latencies drive the switch."""
+        route = self.route(decision.stage)
+        if decision.reason != "primary" or not route.fallback or route.latency_budget_seconds is None:
+            return
+        with self._lock:
+            window = self._latencies.setdefault(decision.stage, deque(maxlen=Config.LLM_ROUTE_LATENCY_WINDOW))
+            window.append(seconds)
+            if len(window) < Config.LLM_ROUTE_MIN_SAMPLES:
+                return
+            median = statistics.median(window)
+            if median <= route.latency_budget_seconds:
+                return
+            self._fallback_until[decision.stage] = (time.monotonic() + Config.LLM_ROUTE_COOLDOWN_SECONDS, "latency")
+        metrics.incr(f"llm.route.{decision.stage}.switched")
+        logger.warning(
+            f"Stage '{decision.stage}': primary {route.primary} median latency {median:.2f}s exceeds "
+            f"budget {route.latency_budget_seconds:.2f}s; routing to {route.fallback} for {Config.LLM_ROUTE_COOLDOWN_SECONDS:.0f}s"
+        )
+
+    def fail_over(self, decision: RouteDecision) -> Optional[RouteDecision]:
+        """After a failed primary call: the fallback decision for an immediate retry (None if there is no fallback)."""
+        route = self.route(decision.stage)
+        if decision.reason != "primary" or not route.fallback:
+            return None
+        with self._lock:
+            self._fallback_until[decision.stage] = (time.monotonic() + Config.LLM_ROUTE_COOLDOWN_SECONDS, "error")
+        metrics.incr(f"llm.route.{decision.stage}.switched")
+        logger.warning(f"Stage '{decision.stage}': primary {route.primary} failed; retrying on {route.fallback}")
+        fallback = RouteDecision(decision.stage, route.fallback, "fallback:error")
+        self._record(fallback)
+        return fallback
+
+    def _record(self, decision: RouteDecision):
+        metrics.incr(f"llm.route.{decision.stage}.{'fallback' if decision.is_fallback else 'primary'}")
+        trace = _trace.get()
+        if trace is not None:
+            trace.append({"stage": decision.stage, "model": decision.model, "reason": decision.reason})
+
+    @staticmethod
+    @contextmanager
+    def trace() -> Iterator[list]:
+        """Collects every routing decision made in this context (and tasks spawned from it)."""
+        decisions: list = []
+        token = _trace.set(decisions)
+        try:
+            yield decisions
+        finally:
+            _trace.reset(token)
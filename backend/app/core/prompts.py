@@ -1,6 +1,11 @@
 """
 Centralized prompt definitions.
 Provides strict separation of concerns, moving long prompt strings out of execution logic.
+
+Layout for provider-side prompt caching: the *_SYSTEM_PROMPT instruction blocks contain no
+per-request interpolation and are always the first message, so the prefix (plus the
+response_format schema) is byte-identical across requests. Per-patient context goes into a
+later user message via the *_CONTEXT_PROMPT templates, assembled by the build_* functions below.
 """
 
 CLINICAL_EXTRACTION_SYSTEM_PROMPT = """You are a strict, clinical NLP extractor.
@@ -14,12 +19,13 @@ CRITICAL RULES:
 5. IF a finding refers to a past document: Look at 'context_documents' in System Context. Map its 'system_doc_id' EXACTLY to the `system_reference_id` field.
 6. IF an actionable (follow-up/referral/procedure) maps logically to a specific doctor specialty: Look at 'available_doctor_categories' in System Context. You MUST map the matching 'doctor_id' EXACTLY to the `system_reference_id` field.
 7. Preserve the extracted names and dates exactly as they appear in the transcript within the 'description' and 'exact_quote' fields.
+The System Context (available_doctor_categories + context_documents) and the Transcript are provided in the following messages."""
 
-System Context (context_documents + available_doctor_categories):
+CLINICAL_EXTRACTION_CONTEXT_PROMPT = """System Context (available_doctor_categories + context_documents):
 {system_context}"""
 
 PATIENT_SUMMARY_SYSTEM_PROMPT = """You are a patient advocate translator. 
-Translate the provided Clinical Report and Transcript into layman terms for the patient's summary in the following language: {language}
+Translate the provided Clinical Report and Transcript into layman terms for the patient's summary, written in the Target Language given in the following message.
 CRITICAL RULES:
 1. Do NOT add any medical instructions or findings not present in the Clinical Report or Transcript.
 2. Preserve all 'system_reference_id' pointers exactly. 
@@ -27,6 +33,92 @@ CRITICAL RULES:
 4. CRITICAL CITATION FORMAT (NOTEBOOKLM STYLE): When referring to a clinical fact that comes from a specific document or doctor in the JSON, you MUST append an inline citation immediately after the claim. Format your citation EXACTLY as double-brackets containing the system_reference_id: `[[system_reference_id]]`. 
 Example: "The doctor recommended a blood transfusion [[DOC-RAD-202]] and referred you to a dermatologist for your scratchy skin [[D-05]]."
 This is mandatory for the frontend UI to render NotebookLM-style interactive citation pills.
+The System Context, Clinical Report and Transcript are provided in the following messages."""
+
+PATIENT_SUMMARY_CONTEXT_PROMPT = """Target Language: {language}
 
 System Context (Available Doctor Categories & Documents):
 {system_context}"""
+
+def build_clinical_extraction_messages(system_context: str, scrubbed_transcript: str, system_prompt: str = CLINICAL_EXTRACTION_SYSTEM_PROMPT) -> list[dict]:
+    """Static instructions first (full or lean extraction prompt), then per-patient context, then the transcript."""
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": CLINICAL_EXTRACTION_CONTEXT_PROMPT.format(system_context=system_context)},
+        {"role": "user", "content": f"Transcript: {scrubbed_transcript}"}
+    ]
+
+def build_patient_summary_messages(system_context: str, language: str, clinical_json: str, scrubbed_transcript: str) -> list[dict]:
+    """Static instructions first, then language + per-patient context, then report and transcript."""
+    return [
+        {"role": "system", "content": PATIENT_SUMMARY_SYSTEM_PROMPT},
+        {"role": "user", "content": PATIENT_SUMMARY_CONTEXT_PROMPT.format(system_context=system_context, language=language)},
+        {"role": "user", "content": f"Clinical Report:\n{clinical_json}\n\nTranscript:\n{scrubbed_transcript}"}
+    ]
+
+# Fused mode (PIPELINE_MODE=fused): one call returns the clinical report and the patient summary.
+FUSED_CONSULTATION_SYSTEM_PROMPT = f"""You produce TWO outputs from one consultation in a single response.
+
+PART A - final_validated_clinical_report (with negation_check and attribution_check):
+{CLINICAL_EXTRACTION_SYSTEM_PROMPT}
+
+PART B - patient_summary:
+{PATIENT_SUMMARY_SYSTEM_PROMPT}
+The Clinical Report for PART B is the one you produced in PART A. PART B must not mention anything that is not backed by a PART A item."""
+
+FUSED_CONSULTATION_CONTEXT_PROMPT = PATIENT_SUMMARY_CONTEXT_PROMPT
+
+def build_fused_consultation_messages(system_context: str, language: str, scrubbed_transcript: str) -> list[dict]:
+    """Static instructions first, then language + per-patient context, then the transcript (sent once)."""
+    return [
+        {"role": "system", "content": FUSED_CONSULTATION_SYSTEM_PROMPT},
+        {"role": "user", "content": FUSED_CONSULTATION_CONTEXT_PROMPT.format(system_context=system_context, language=language)},
+        {"role": "user", "content": f"Transcript: {scrubbed_transcript}"}
+    ]
+
+# Incremental re-extraction: only the newly dictated segment is sent, with prior findings as compact context.
+INCREMENTAL_EXTRACTION_SYSTEM_PROMPT = f"""{CLINICAL_EXTRACTION_SYSTEM_PROMPT}
+INCREMENTAL MODE: The transcript you receive is only the NEW SEGMENT of an ongoing consultation. Findings already extracted from earlier parts are listed as Prior Findings.
+8. Extract ONLY findings and actionables stated in the new segment; every quote must come from the new segment.
+9. Do NOT repeat a prior finding unless the new segment changes it (e.g. it is now negated, confirmed, or attributed to someone else); then extract it again with a quote from the new segment and the same 'finding' wording."""
+
+INCREMENTAL_EXTRACTION_CONTEXT_PROMPT = """System Context (available_doctor_categories + context_documents):
+{system_context}
+
+Prior Findings:
+{prior_findings}"""
+
+def build_incremental_extraction_messages(system_context: str, prior_findings: str, segment: str) -> list[dict]:
+    """Static instructions first, then context + prior findings, then the new transcript segment."""
+    return [
+        {"role": "system", "content": INCREMENTAL_EXTRACTION_SYSTEM_PROMPT},
+        {"role": "user", "content": INCREMENTAL_EXTRACTION_CONTEXT_PROMPT.format(system_context=system_context, prior_findings=prior_findings)},
+        {"role": "user", "content": f"Transcript: {segment}"}
+    ]
+
+# Lean extraction (EXTRACTION_SCHEMA=lean): same rules, compact output keys, no contextual quotes.
+LEAN_CLINICAL_EXTRACTION_SYSTEM_PROMPT = f"""{CLINICAL_EXTRACTION_SYSTEM_PROMPT}
+COMPACT OUTPUT FORMAT: keys are abbreviated. cc=chief_complaints, dx=assessments, a=actionables; in findings f=finding, s=condition_status, p=subject; in actionables t=action_type, d=description, w=timeframe; everywhere q=exact_quote and r=system_reference_id.
+Do NOT output contextual quotes: rule 4 is applied automatically from the transcript, so 'q' alone must be a verbatim substring.
+Use 'n' only for a terse note (max 20 words) on negations or attributions that are not obvious from the items; otherwise set it to null."""
+
+# Targeted quote repair: only guardrail-rejected items plus the transcript neighbourhood they came from.
+QUOTE_REPAIR_SYSTEM_PROMPT = """You repair citations of clinical findings that failed verification.
+Each Rejected Item was extracted from a consultation transcript, but its 'exact_quote' is not a literal substring of the transcript.
+CRITICAL RULES:
+1. For each item, find where the Transcript Excerpt states it and return a new 'exact_quote' (a short literal, verbatim substring) and 'contextual_quote' (the exact quote plus approx 5 words before and after, also verbatim).
+2. Copy quotes character for character, including punctuation, casing and placeholder tokens such as [PERSON_1]. Do not paraphrase, translate or correct anything.
+3. Never change what the item claims. If the excerpt does not state the item as described (including its negation and its subject), set 'supported' to false and leave both quotes empty.
+4. Return exactly one entry per Rejected Item, with its 'item_index'.
+The Rejected Items and the Transcript Excerpt are provided in the following messages."""
+
+QUOTE_REPAIR_CONTEXT_PROMPT = """Rejected Items:
+{rejected_items}"""
+
+def build_quote_repair_messages(rejected_items: str, excerpt: str) -> list[dict]:
+    """Static instructions first, then the rejected items, then the transcript excerpt."""
+    return [
+        {"role": "system", "content": QUOTE_REPAIR_SYSTEM_PROMPT},
+        {"role": "user", "content": QUOTE_REPAIR_CONTEXT_PROMPT.format(rejected_items=rejected_items)},
+        {"role": "user", "content": f"Transcript: {excerpt}"}
+    ]
@@ -0,0 +1,117 @@
+"""
+Cross-process token-bucket rate limiter for Azure OpenAI RPM/TPM quotas.
+
+Bucket levels live in a small SQLite database (LLM_RATE_LIMIT_DB_PATH) and are updated inside
+`BEGIN IMMEDIATE` transactions, so every uvicorn worker and bulk tool on the host draws from the
+same budget. Callers wait (up to LLM_RATE_LIMIT_MAX_WAIT_SECONDS) for capacity instead of
+provoking 429s. Token cost mirrors Azure's own accounting: estimated prompt tokens + max_tokens.
+"""
+import asyncio
+import logging
+import random
+import sqlite3
+import threading
+import time
+
+from app.core.config import Config
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+class RateLimitExceededError(RuntimeError):
+    """Raised when quota would not free up within LLM_RATE_LIMIT_MAX_WAIT_SECONDS."""
+    def __init__(self, retry_in: float):
+        super().__init__(f"LLM quota exhausted; capacity expected in {retry_in:.1f}s")
+        self.retry_in = retry_in
+
+class SQLiteRateLimiter:
+    """
+    Two buckets per key ("rpm" and "tpm"), each holding up to one minute of quota and refilling
+    continuously at quota/60 per second. A quota of 0 disables that bucket.
+    """
+    def __init__(self, key: str, rpm: int = Config.LLM_RATE_LIMIT_RPM, tpm: int = Config.LLM_RATE_LIMIT_TPM,
+                 path: str = Config.LLM_RATE_LIMIT_DB_PATH):
+        self.key = key
+        self.quotas = {"rpm": rpm, "tpm": tpm}
+        self.path = path
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return any(q > 0 for q in self.quotas.values())
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_rate_buckets ("
+                "key TEXT NOT NULL, kind TEXT NOT NULL, level REAL NOT NULL, updated_at REAL NOT NULL, "
+                "PRIMARY KEY (key, kind))"
+            )
+        return self._conn
+
+    def try_acquire(self, tokens: int) -> float:
+        """Takes 1 request + `tokens` if both buckets allow it and returns 0; otherwise returns seconds until they would."""
+        costs = {"rpm": 1, "tpm": tokens}
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                levels = {}
+                for kind, quota in self.quotas.items():
+                    if quota <= 0:
+                        continue
+                    row = conn.execute(
+                        "SELECT level, updated_at FROM llm_rate_buckets WHERE key = ? AND kind = ?", (self.key, kind)
+                    ).fetchone()
+                    level = quota if row is None else min(quota, row[0] + max(0.0, now - row[1]) * quota / 60)
+                    levels[kind] = level
+
+                # A single request larger than a full minute of quota could never fit; charge it a full bucket.
+                costs = {kind: min(costs[kind], self.quotas[kind]) for kind in levels}
+                wait = max(
+                    ((costs[kind] - level) / (self.quotas[kind] / 60) for kind, level in levels.items() if level < costs[kind]),
+                    default=0.0
+                )
+                for kind, level in levels.items():
+                    conn.execute(
+                        "INSERT OR REPLACE INTO llm_rate_buckets (key, kind, level, updated_at) VALUES (?, ?, ?, ?)",
+                        (self.key, kind, level - costs[kind] if wait == 0 else level, now)
+                    )
+                conn.execute("COMMIT")
+                return wait
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    async def acquire(self, tokens: int) -> float:
+        """Waits for capacity and returns the time spent queued (also recorded as a metric)."""
+        if not self.enabled:
+            return 0.0
+        started = time.monotonic()
+        while True:
+            wait = await asyncio.to_thread(self.try_acquire, tokens)
+            if wait == 0:
+                break
+            elapsed = time.monotonic() - started
+            if elapsed + wait > Config.LLM_RATE_LIMIT_MAX_WAIT_SECONDS:
+                metrics.incr("llm.rate_limit.rejected")
+                raise RateLimitExceededError(wait)
+            # Small jitter so workers woken by the same refill do not stampede the database.
+            await asyncio.sleep(wait + random.uniform(0, 0.05))
+
+        waited = time.monotonic() - started
+        metrics.observe("llm.rate_limit.queue_wait_seconds", waited)
+        if waited > 0.001:
+            metrics.incr("llm.rate_limit.throttled")
+            logger.info(f"LLM call queued {waited:.2f}s for RPM/TPM quota ({self.key})")
+        return waited
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
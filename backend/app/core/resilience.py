@@ -0,0 +1,225 @@
+"""
+Failure handling for LLM calls: retries with exponential jittered backoff (honouring Retry-After),
+optional hedged requests past the observed p95 latency, and a circuit breaker that fails fast
+while the deployment is unhealthy. Used by AsyncLLMClient; the SDK's own retries are disabled.
+"""
+import asyncio
+import logging
+import math
+import random
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import httpx
+from openai import APIConnectionError, APIStatusError
+
+from app.core.config import Config
+from app.core.metrics import metrics
+
+R = TypeVar("R")
+logger = logging.getLogger(__name__)
+
+_RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the provider while the circuit breaker is open."""
+    def __init__(self, retry_in: float):
+        super().__init__(f"LLM deployment marked unhealthy; failing fast (retry in {retry_in:.1f}s)")
+        self.retry_in = retry_in
+
+def is_retryable(exc: BaseException) -> bool:
+    """Transport failures, timeouts, throttling and 5xx are transient; everything else is the caller's problem."""
+    if isinstance(exc, APIStatusError):
+        return exc.status_code in _RETRYABLE_STATUS
+    return isinstance(exc, (APIConnectionError, httpx.TransportError))
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """Server-requested delay from `retry-after-ms` / `retry-after` (seconds form only)."""
+    response = getattr(exc, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        return None
+    return None
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """
+    Full-jitter exponential backoff for the given (1-based) failed attempt, capped at
+    LLM_RETRY_MAX_DELAY_SECONDS. A Retry-After hint is a floor, not a replacement.
+    """
+    ceiling = min(Config.LLM_RETRY_MAX_DELAY_SECONDS, Config.LLM_RETRY_BASE_DELAY_SECONDS * (2 ** (attempt - 1)))
+    delay = random.uniform(0, ceiling)
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, Config.LLM_RETRY_MAX_DELAY_SECONDS))
+    return delay
+
+class CircuitBreaker:
+    """
+    Classic closed -> open -> half-open breaker. Opens after LLM_CIRCUIT_FAILURE_THRESHOLD
+    consecutive transient failures; after LLM_CIRCUIT_RESET_SECONDS a single probe call is let
+    through and its outcome decides whether to close again or re-open.
+    """
+    def __init__(self, name: str = "llm"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state_locked()
+
+    def _state_locked(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= Config.LLM_CIRCUIT_RESET_SECONDS:
+            return "half_open"
+        return "open"
+
+    def before_call(self) -> bool:
+        """Admits or rejects a call; True if the admitted call is the half-open probe."""
+        with self._lock:
+            state = self._state_locked()
+            if state == "closed":
+                return False
+            if state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            retry_in = max(0.0, Config.LLM_CIRCUIT_RESET_SECONDS - (time.monotonic() - self._opened_at))
+        metrics.incr(f"{self.name}.circuit.rejected")
+        raise CircuitOpenError(retry_in)
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info(f"Circuit '{self.name}' closed after successful probe.")
+            self._failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            was_probe = self._probe_in_flight
+            self._probe_in_flight = False
+            if was_probe or self._failures >= Config.LLM_CIRCUIT_FAILURE_THRESHOLD:
+                if was_probe or self._opened_at is None:
+                    logger.warning(f"Circuit '{self.name}' opened after {self._failures} consecutive failures.")
+                    metrics.incr(f"{self.name}.circuit.opened")
+                self._opened_at = time.monotonic()
+
+    def release_probe(self):
+        """A probe that ended in a non-transient error says nothing about health; let the next call probe."""
+        with self._lock:
+            self._probe_in_flight = False
+
+class LatencyTracker:
+    """Rolling window of successful call latencies per key; source of the hedging threshold."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples: dict[str, deque[float]] = {}
+
+    def observe(self, key: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=Config.LLM_LATENCY_WINDOW)).append(seconds)
+
+    def percentile(self, key: str, q: float) -> Optional[float]:
+        with self._lock:
+            samples = self._samples.get(key)
+            if not samples or len(samples) < Config.LLM_HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)]
+
+class ResilientCaller:
+    """
+    Wraps an awaitable factory (one fresh provider request per call) with the breaker,
+    retry loop and optional hedging. `key` groups latencies (e.g. by response schema),
+    since extraction and summary calls have very different latency profiles.
+    """
+    def __init__(self, name: str = "llm"):
+        self.name = name
+        self.breaker = CircuitBreaker(name)
+        self.latencies = LatencyTracker()
+
+    async def call(self, key: str, factory: Callable[[], Awaitable[R]], hedge: bool = True) -> R:
+        attempt = 0
+        while True:
+            attempt += 1
+            probe = self.breaker.before_call()
+            try:
+                if hedge and Config.LLM_HEDGE_ENABLED:
+                    result = await self._hedged(key, factory)
+                else:
+                    result = await self._timed(key, factory)
+            except (asyncio.CancelledError, GeneratorExit):
+                # Abandoned (disconnect, deadline, no single-flight waiter left): no verdict on health
+                if probe:
+                    self.breaker.release_probe()
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    if probe:
+                        self.breaker.release_probe()
+                    raise
+                self.breaker.record_failure()
+                metrics.incr(f"{self.name}.failures")
+                if attempt >= Config.LLM_RETRY_MAX_ATTEMPTS:
+                    logger.error(f"LLM call '{key}' failed after {attempt} attempts: {e}")
+                    raise
+                logger.warning(f"LLM call '{key}' attempt {attempt} failed: {e}")
+                await self.backoff(attempt, e)
+                continue
+            self.breaker.record_success()
+            return result
+
+    async def backoff(self, attempt: int, exc: BaseException):
+        delay = backoff_delay(attempt, retry_after_seconds(exc))
+        metrics.incr(f"{self.name}.retries")
+        logger.info(f"Retrying LLM call in {delay:.2f}s (attempt {attempt + 1}/{Config.LLM_RETRY_MAX_ATTEMPTS})")
+        await asyncio.sleep(delay)
+
+    async def _timed(self, key: str, factory: Callable[[], Awaitable[R]]) -> R:
+        started = time.perf_counter()
+        result = await factory()
+        self.latencies.observe(key, time.perf_counter() - started)
+        return result
+
+    async def _hedged(self, key: str, factory: Callable[[], Awaitable[R]]) -> R:
+        threshold = self.latencies.percentile(key, Config.LLM_HEDGE_LATENCY_PERCENTILE)
+        if threshold is None:
+            return await self._timed(key, factory)
+
+        primary = asyncio.create_task(self._timed(key, factory))
+        pending = {primary}
+        error: Optional[BaseException] = None
+        try:
+            done, _ = await asyncio.wait(pending, timeout=max(threshold, Config.LLM_HEDGE_MIN_DELAY_SECONDS))
+            if done:
+                return primary.result()
+
+            metrics.incr(f"{self.name}.hedge.fired")
+            hedge = asyncio.create_task(self._timed(key, factory))
+            pending = {primary, hedge}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            metrics.incr(f"{self.name}.hedge.won")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
@@ -0,0 +1,52 @@
+"""
+Precomputed structured-output request parameters.
+
+Given a Pydantic class, the SDK's beta `parse` / `stream` helpers rebuild the strict JSON schema
+(`to_strict_json_schema`, a full `model_json_schema` walk, 1.5-3.5 ms for our models) on every
+call, and the stream helper also re-parses the whole partial JSON snapshot on every chunk. Instead
+the clients hand the SDK the ready `json_schema` parameter, built once per class from the strict
+schema of the SDK's public `pydantic_function_tool` (the same builder `parse` uses, so the request
+body is unchanged), and validate the final content with the class's compiled pydantic-core
+validator. `benchmark_cli.py formats` measures the difference.
+"""
+import threading
+from typing import Optional, Type, TypeVar
+
+from openai import pydantic_function_tool
+from pydantic import BaseModel
+
+T = TypeVar("T", bound=BaseModel)
+
+_params: dict[type, dict] = {}
+_lock = threading.Lock()
+
+def build_response_format_param(response_format: Type[BaseModel]) -> dict:
+    """What the SDK builds on every `parse` / `stream` call (a full strict-schema walk)."""
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "schema": pydantic_function_tool(response_format)["function"]["parameters"],
+            "name": response_format.__name__,
+            "strict": True
+        }
+    }
+
+def response_format_param(response_format: Type[BaseModel]) -> dict:
+    """The `response_format` request parameter for a structured-output class, built on first use."""
+    param = _params.get(response_format)
+    if param is None:
+        param = build_response_format_param(response_format)
+        with _lock:
+            param = _params.setdefault(response_format, param)
+    return param
+
+def prepare_response_formats(*response_formats: Type[BaseModel]):
+    """Builds the parameters up front (client start-up) so no request pays for it."""
+    for response_format in response_formats:
+        response_format_param(response_format)
+
+def parse_message(response_format: Type[T], message) -> Optional[T]:
+    """What the SDK would put in `message.parsed`: None for refusals and empty content."""
+    if message.refusal or not message.content:
+        return None
+    return response_format.model_validate_json(message.content)
@@ -0,0 +1,97 @@
+"""
+Local token accounting and adaptive completion budgets for pipeline LLM stages.
+Counts with tiktoken (a declared dependency; its o200k_base file is fetched once, or read from
+TIKTOKEN_CACHE_DIR on offline hosts). Only a broken install falls back to ~4 characters/token.
+"""
+import logging
+import math
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from app.core.config import Config
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+    logger.warning("tiktoken is not installed; token counts (and TPM quota reservations) use a 4 chars/token estimate.")
+_ENCODING = tiktoken.get_encoding("o200k_base") if tiktoken is not None else None
+
+# Chat framing overhead per message and for reply priming (OpenAI chat format)
+_TOKENS_PER_MESSAGE = 3
+_TOKENS_REPLY_PRIMING = 3
+
+def count_tokens(text: str) -> int:
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / 4)
+
+def count_message_tokens(messages: List[Dict[str, str]]) -> int:
+    return sum(_TOKENS_PER_MESSAGE + count_tokens(m.get("content", "")) for m in messages) + _TOKENS_REPLY_PRIMING
+
+@dataclass
+class UsageRecord:
+    """Filled in by AsyncLLMClient from the provider response; passed in by the caller."""
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    finish_reason: Optional[str] = None
+
+    def update_from(self, usage, finish_reason: Optional[str] = None):
+        if usage is not None:
+            self.prompt_tokens = usage.prompt_tokens or 0
+            self.completion_tokens = usage.completion_tokens or 0
+            details = getattr(usage, "prompt_tokens_details", None)
+            self.cached_tokens = (getattr(details, "cached_tokens", 0) or 0) if details else 0
+        self.finish_reason = finish_reason
+
+class AdaptiveTokenBudget:
+    """
+    Derives `max_tokens` for one stage from the size of its input and the completion/input
+    ratios observed so far: budget = input_tokens * p95(ratio) * headroom, clamped to
+    [ADAPTIVE_MAX_TOKENS_MIN, cap]. Until enough samples exist the static cap is used.
+    """
+    def __init__(self, stage: str, cap: int):
+        self.stage = stage
+        self.cap = cap
+        self._ratios: deque[float] = deque(maxlen=Config.ADAPTIVE_MAX_TOKENS_WINDOW)
+        self._lock = threading.Lock()
+
+    def max_tokens_for(self, input_tokens: int) -> int:
+        if not Config.ADAPTIVE_MAX_TOKENS_ENABLED:
+            return self.cap
+        with self._lock:
+            if len(self._ratios) < Config.ADAPTIVE_MAX_TOKENS_MIN_SAMPLES:
+                return self.cap
+            ordered = sorted(self._ratios)
+        p95 = ordered[min(len(ordered) - 1, math.ceil(0.95 * len(ordered)) - 1)]
+        budget = math.ceil(input_tokens * p95 * Config.ADAPTIVE_MAX_TOKENS_HEADROOM)
+        return max(Config.ADAPTIVE_MAX_TOKENS_MIN, min(self.cap, budget))
+
+    def observe(self, input_tokens: int, usage: UsageRecord):
+        # Truncated completions understate the real need; never learn from them.
+        if input_tokens <= 0 or usage.completion_tokens <= 0 or usage.finish_reason == "length":
+            return
+        with self._lock:
+            self._ratios.append(usage.completion_tokens / input_tokens)
+
+def record_usage(stage: str, estimated_prompt_tokens: int, max_tokens: int, usage: UsageRecord):
+    """Publishes per-stage token accounting to the metrics registry."""
+    metrics.incr(f"llm.{stage}.calls")
+    metrics.incr(f"llm.{stage}.prompt_tokens", usage.prompt_tokens)
+    metrics.incr(f"llm.{stage}.completion_tokens", usage.completion_tokens)
+    metrics.incr(f"llm.{stage}.cached_prompt_tokens", usage.cached_tokens)
+    if usage.prompt_tokens:
+        metrics.observe(f"llm.{stage}.prompt_cache_hit_ratio", usage.cached_tokens / usage.prompt_tokens)
+    metrics.observe(f"llm.{stage}.prompt_tokens_estimated", estimated_prompt_tokens)
+    metrics.observe(f"llm.{stage}.max_tokens_granted", max_tokens)
+    if usage.completion_tokens:
+        metrics.observe(f"llm.{stage}.completion_tokens", usage.completion_tokens)
+        metrics.observe(f"llm.{stage}.budget_utilisation", usage.completion_tokens / max_tokens)
+    if usage.finish_reason == "length":
+        metrics.incr(f"llm.{stage}.truncated")
@@ -1,39 +1,66 @@
+import asyncio
 import logging
 import json
 import subprocess
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Depends
+from typing import Awaitable, Callable, TypeVar
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
-from app.core.llm_client import LLMClient
-from app.core.database import get_db
+from app.core.llm_client import create_llm_client
+from app.core.model_router import ModelRouter
+from app.core.resilience import CircuitOpenError
+from app.core.rate_limiter import RateLimitExceededError
+from app.core.config import Config
+from app.core.database import SessionLocal, get_db
+from app.core.metrics import metrics, StageTimer
 from app.services.db_service import DBService
 from app.models.api_models import (
     EncounterMetadata, OrchestrationResponse, DraftResponse, FinalizeRequest,
-    ConsultationRequest, DebugDraftRequest, DebugDraftResponse
+    ConsultationRequest, DebugDraftRequest, DebugDraftResponse,
+    IncrementalDraftRequest, IncrementalDraftResponse, PatientSummaryStatusResponse
 )
-from app.services.pipeline import ZeroHallucinationPipeline
+from app.services.pipeline import ZeroHallucinationPipeline, PIPELINE_MODES
 from app.services.orchestrator import OrchestratorService
+from app.services.result_cache import LLMResultCache
+from app.services.checkpoints import DraftCheckpoint, DraftCheckpointStore
+from app.services.streaming import sse_event
+from app.services.single_flight import SingleFlight, content_digest, single_flight_key
+from app.services.cancellation import DEADLINE_HEADER, RequestCancelled, request_timeout, run_cancellable
 from app.models.persistence_models import Patient, EHRDocument, MedicalCaseModel, AppointmentModel, Doctor
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("api")
+R = TypeVar("R")
 
 class AppState:
     orchestrator: OrchestratorService | None = None
 
 state = AppState()
 
+# Identical concurrent draft requests (double-clicks, frontend retries) share one pipeline run
+draft_flights = SingleFlight("generate_draft")
+debug_draft_flights = SingleFlight("debug_run_draft")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    llm = LLMClient()
-    pipeline = ZeroHallucinationPipeline(llm=llm)
-    state.orchestrator = OrchestratorService(pipeline=pipeline)
+    llm = create_llm_client()
+    cache = LLMResultCache() if Config.LLM_CACHE_ENABLED else None
+    checkpoints = DraftCheckpointStore() if Config.DRAFT_CHECKPOINTS_ENABLED else None
+    pipeline = ZeroHallucinationPipeline(llm=llm, cache=cache)
+    state.orchestrator = OrchestratorService(pipeline=pipeline, checkpoints=checkpoints)
     logger.info("Application lifespan started. Orchestrator loaded.")
     yield
+    await state.orchestrator.summary_jobs.aclose()
     state.orchestrator = None
+    await llm.aclose()
+    if cache:
+        cache.close()
+    if checkpoints:
+        checkpoints.close()
     logger.info("Application lifespan ended.")
 
 app = FastAPI(lifespan=lifespan, title="Mesh Orchestrated Clinical Engine")
@@ -85,8 +112,155 @@ def get_ehr_document(system_doc_id: str, db: Session = Depends(get_db)):
         "content": doc.content
     }
 
+async def _normalize_uploaded_audio(audio_bytes: bytes, patient_id: str) -> str:
+    """Persists the upload and transcodes it to 16kHz mono WAV for Azure Speech (ffmpeg off the event loop)."""
+    raw_audio_path = f"/tmp/incoming_{patient_id}_raw"
+    with open(raw_audio_path, "wb") as buffer:
+        buffer.write(audio_bytes)
+
+    audio_path = f"/tmp/incoming_{patient_id}.wav"
+
+    await asyncio.to_thread(
+        subprocess.run,
+        ["ffmpeg", "-y", "-i", raw_audio_path, "-ar", "16000", "-ac", "1", audio_path],
+        check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    return audio_path
+
+def _file_digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return content_digest(f.read())
+
+async def _checkpointed_audio(audio_bytes: bytes, patient_id: str, checkpoint: DraftCheckpoint | None) -> str | None:
+    """
+    _normalize_uploaded_audio, skipped when resuming a draft: not needed once its transcript is
+    checkpointed (None), and the earlier WAV is reused while it is still on disk unchanged.
+    """
+    if checkpoint is not None:
+        if checkpoint.has("transcript"):
+            return None
+        saved = checkpoint.load("audio")
+        if saved and _os.path.exists(saved["path"]) and await asyncio.to_thread(_file_digest, saved["path"]) == saved["sha256"]:
+            return saved["path"]
+    audio_path = await _normalize_uploaded_audio(audio_bytes, patient_id)
+    if checkpoint is not None:
+        checkpoint.save("audio", {"path": audio_path, "sha256": await asyncio.to_thread(_file_digest, audio_path)})
+    return audio_path
+
+async def _in_own_session(work: Callable[[Session], Awaitable[R]]) -> R:
+    """A single-flight run can outlive the request that started it, so it opens its own Session."""
+    with SessionLocal() as db:
+        return await work(db)
+
+def _cancelled_response(e: RequestCancelled) -> HTTPException:
+    # 499 (client closed request) is never read; 504 tells a caller with a deadline it was not met
+    return HTTPException(status_code=504 if e.reason == "deadline" else 499, detail=str(e))
+
 @app.post("/api/v1/generate-draft", response_model=DraftResponse)
 async def generate_draft(
+    request: Request,
+    patient_id: str = Form(..., description="Used to fetch DB context."),
+    doctor_id: str = Form(..., description="Used for referral mapping."),
+    encounter_date: str = Form(..., description="ISO 8601 Datetime."),
+    language: str = Form("en", description="Translation language."),
+    transcript: str = Form(None, description="Optional fallback transcript from frontend WebSpeech API"),
+    pipeline_mode: str = Form(None, description="'two_call' or 'fused' (one LLM call for report + summary). Defaults to PIPELINE_MODE."),
+    defer_summary: bool = Form(False, description="Return after extraction + guardrail; fetch the patient summary from /drafts/{draft_id}/patient-summary."),
+    audio: UploadFile = File(...)
+):
+    if pipeline_mode is not None and pipeline_mode not in PIPELINE_MODES:
+        raise HTTPException(status_code=422, detail=f"pipeline_mode must be one of {PIPELINE_MODES}")
+    if defer_summary and pipeline_mode == "fused":
+        raise HTTPException(status_code=422, detail="defer_summary needs the two_call pipeline (fused mode writes both in one call)")
+    try:
+        audio_bytes = await audio.read()
+        key = single_flight_key(
+            patient_id, doctor_id, encounter_date, language, pipeline_mode, defer_summary,
+            content_digest(audio_bytes), content_digest(transcript)
+        )
+
+        async def run_draft(db: Session) -> DraftResponse:
+            timer = StageTimer()
+            # The key identifies the draft, so retrying a failed request resumes from its checkpoints
+            checkpoint = None if defer_summary else state.orchestrator.draft_checkpoint(key)
+            audio_path = await timer.measure("audio_normalization", _checkpointed_audio(audio_bytes, patient_id, checkpoint))
+
+            if defer_summary:
+                clinical_dict, token_map, full_metadata, draft_id = await state.orchestrator.generate_progressive_draft(
+                    audio_file_path=audio_path,
+                    db=db,
+                    patient_id=patient_id,
+                    doctor_id=doctor_id,
+                    encounter_date=encounter_date,
+                    language=language,
+                    fallback_transcript=transcript,
+                    timer=timer
+                )
+                return DraftResponse(
+                    administrative_metadata=full_metadata,
+                    patient_summary_md="",
+                    clinical_draft_json=clinical_dict,
+                    token_map=token_map,
+                    pipeline_metadata=timer.report(),
+                    draft_id=draft_id,
+                    patient_summary_status="pending"
+                )
+
+            clinical_dict, patient_dict, token_map, full_metadata = await state.orchestrator.generate_draft(
+                audio_file_path=audio_path,
+                db=db,
+                patient_id=patient_id,
+                doctor_id=doctor_id,
+                encounter_date=encounter_date,
+                language=language,
+                fallback_transcript=transcript,
+                timer=timer,
+                pipeline_mode=pipeline_mode,
+                checkpoint=checkpoint
+            )
+
+            return DraftResponse(
+                administrative_metadata=full_metadata,
+                patient_summary_md=patient_dict.get("layman_explanation", ""),
+                clinical_draft_json=clinical_dict,
+                token_map=token_map,
+                pipeline_metadata=timer.report()
+            )
+
+        return await run_cancellable(
+            draft_flights.do(key, lambda: _in_own_session(run_draft)), request.is_disconnected, request_timeout(request.headers.get(DEADLINE_HEADER))
+        )
+
+    except RequestCancelled as e:
+        raise _cancelled_response(e)
+    except (CircuitOpenError, RateLimitExceededError) as e:
+        logger.error(f"Draft Generation Rejected: {e}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(max(1, round(e.retry_in)))})
+    except Exception as e:
+        logger.error(f"Draft Generation Failed: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/v1/drafts/{draft_id}/patient-summary", response_model=PatientSummaryStatusResponse)
+async def get_deferred_patient_summary(draft_id: str, wait_seconds: float = 0):
+    """
+    Patient summary of a `defer_summary` draft. `wait_seconds` long-polls (capped at
+    DEFERRED_SUMMARY_MAX_WAIT_SECONDS) until the summary is ready or has failed.
+    """
+    task = await state.orchestrator.summary_jobs.wait(draft_id, wait_seconds)
+    if task is None:
+        raise HTTPException(status_code=404, detail=f"Draft {draft_id} unknown or expired.")
+    if not task.done():
+        return PatientSummaryStatusResponse(draft_id=draft_id, status="pending")
+    if task.cancelled() or task.exception() is not None:
+        detail = "cancelled" if task.cancelled() else str(task.exception())
+        return PatientSummaryStatusResponse(draft_id=draft_id, status="failed", detail=detail)
+    summary = task.result()
+    return PatientSummaryStatusResponse(
+        draft_id=draft_id, status="ready", patient_summary_md=summary.get("layman_explanation", ""), patient_summary=summary
+    )
+
+@app.post("/api/v1/generate-draft/stream")
+async def generate_draft_stream(
     patient_id: str = Form(..., description="Used to fetch DB context."),
     doctor_id: str = Form(..., description="Used for referral mapping."),
     encounter_date: str = Form(..., description="ISO 8601 Datetime."),
@@ -95,37 +269,82 @@ async def generate_draft(
     audio: UploadFile = File(...),
     db: Session = Depends(get_db)
 ):
+    """
+    Server-Sent Events variant of /generate-draft. Event sequence:
+      metadata -> clinical_item* -> clinical_draft -> summary_delta* -> patient_summary -> done   (or error)
+    `clinical_item` (STREAM_CLINICAL_ITEMS) carries each hydrated, guardrail-validated item as the model finishes it;
+    `clinical_draft` is the complete report (`truncated` if the extraction hit its token cap).
+    `summary_delta` carries hydrated `layman_explanation` fragments as the model writes them;
+    `patient_summary` carries the final schema-validated, hydrated PatientSummary.
+    """
     try:
-        raw_audio_path = f"/tmp/incoming_{patient_id}_raw"
-        with open(raw_audio_path, "wb") as buffer:
-            buffer.write(await audio.read())
-            
-        audio_path = f"/tmp/incoming_{patient_id}.wav"
-        
-        subprocess.run(
-            ["ffmpeg", "-y", "-i", raw_audio_path, "-ar", "16000", "-ac", "1", audio_path],
-            check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
-        )
-        
-        clinical_dict, patient_dict, token_map, full_metadata = await state.orchestrator.generate_draft(
-            audio_file_path=audio_path,
-            db=db,
-            patient_id=patient_id,
-            doctor_id=doctor_id,
-            encounter_date=encounter_date,
-            language=language,
-            fallback_transcript=transcript
+        audio_path = await _normalize_uploaded_audio(await audio.read(), patient_id)
+        # DB context is loaded before streaming starts: the request-scoped session is not used afterwards.
+        full_metadata = await asyncio.to_thread(state.orchestrator.load_encounter_context, db, patient_id, doctor_id, encounter_date)
+    except Exception as e:
+        logger.error(f"Draft Stream Setup Failed: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def event_source():
+        try:
+            async for event, data in state.orchestrator.stream_draft(
+                audio_file_path=audio_path,
+                full_metadata=full_metadata,
+                language=language,
+                fallback_transcript=transcript
+            ):
+                yield sse_event(event, data)
+            yield sse_event("done", {})
+        except Exception as e:
+            logger.error(f"Draft Stream Failed: {e}", exc_info=True)
+            yield sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/api/v1/generate-draft/incremental", response_model=IncrementalDraftResponse)
+async def generate_incremental_draft(request: IncrementalDraftRequest, http_request: Request, db: Session = Depends(get_db)):
+    """
+    Text-in draft for a growing transcript (live dictation / resent fallback transcript).
+    Send the whole transcript so far on every call; only the appended part is re-extracted.
+    """
+    try:
+        timer = StageTimer()
+        clinical_dict, patient_dict, extraction, full_metadata = await run_cancellable(
+            state.orchestrator.generate_incremental_draft(
+                session_id=request.session_id,
+                db=db,
+                patient_id=request.patient_id,
+                doctor_id=request.doctor_id,
+                encounter_date=request.encounter_date,
+                transcript=request.transcript,
+                language=request.language,
+                final=request.final,
+                timer=timer
+            ),
+            http_request.is_disconnected,
+            request_timeout(http_request.headers.get(DEADLINE_HEADER))
         )
-        
-        return DraftResponse(
+        return IncrementalDraftResponse(
+            session_id=request.session_id,
+            update=extraction.last_update,
+            covered_chars=extraction.raw_covered,
             administrative_metadata=full_metadata,
-            patient_summary_md=patient_dict.get("layman_explanation", ""),
             clinical_draft_json=clinical_dict,
-            token_map=token_map
+            patient_summary_md=patient_dict.get("layman_explanation", "") if patient_dict else None,
+            token_map=extraction.token_map,
+            pipeline_metadata=timer.report()
         )
-        
+    except RequestCancelled as e:
+        raise _cancelled_response(e)
+    except (CircuitOpenError, RateLimitExceededError) as e:
+        logger.error(f"Incremental Draft Rejected: {e}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(max(1, round(e.retry_in)))})
     except Exception as e:
-        logger.error(f"Draft Generation Failed: {e}", exc_info=True)
+        logger.error(f"Incremental Draft Failed: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/v1/finalize-report", response_model=OrchestrationResponse)
@@ -216,7 +435,7 @@ async def test_generate_consultation(
 
 
 @app.post("/api/v1/debug/run-draft", response_model=DebugDraftResponse)
-async def debug_run_draft(request: DebugDraftRequest, db: Session = Depends(get_db)):
+async def debug_run_draft(request: DebugDraftRequest):
     """
     DEBUG ENDPOINT — Text-only pipeline entry point for prompt engineering and integration testing.
 
@@ -225,17 +444,27 @@ async def debug_run_draft(request: DebugDraftRequest, db: Session = Depends(get_
     artifact for inspection:
       - DB context loaded (EHR docs, doctors) — what the LLM sees
       - Raw vs scrubbed transcript + token map
-      - The exact system_context string injected into the system prompt
+      - The exact system_context string injected into the context message
       - Raw LLM extraction output (before guardrail)
-      - Which exact_quote strings were stripped by the guardrail
+      - Which exact_quote strings were stripped (or recovered as near misses / by the repair call) by the guardrail,
+        and the spans of the surviving quotes
       - The validated clinical draft
       - Patient summary (LLM call 2)
       - Hydrated finals (PII restored)
+    Identical concurrent requests share one run.
     """
+    key = single_flight_key(
+        request.patient_id, request.doctor_id, request.encounter_date, request.language,
+        request.skip_pii_scrub, request.bypass_cache, content_digest(request.transcript)
+    )
+    return await debug_draft_flights.do(key, lambda: _in_own_session(lambda db: _run_debug_draft(request, db)))
+
+async def _run_debug_draft(request: DebugDraftRequest, db: Session) -> DebugDraftResponse:
     import json
     from app.services.scrubber import scrubber as _scrubber
     from app.core.prompts import CLINICAL_EXTRACTION_SYSTEM_PROMPT, PATIENT_SUMMARY_SYSTEM_PROMPT
 
+    owned_llm = None
     try:
         # 1. Fetch DB context (same as production path)
         patient_meta, context_docs = DBService.get_patient_context(db, request.patient_id)
@@ -266,49 +495,40 @@ async def debug_run_draft(request: DebugDraftRequest, db: Session = Depends(get_
             scrubbed_transcript = raw_transcript
             token_map = {}
         else:
-            scrubbed_transcript, token_map = _scrubber.scrub(raw_transcript)
+            scrubbed_transcript, token_map = await asyncio.to_thread(_scrubber.scrub, raw_transcript)
 
         # 3. Build system_context string exactly as production does
-        system_context = json.dumps({
-            "context_documents": full_metadata.get("context_documents", []),
-            "available_doctor_categories": full_metadata.get("available_doctor_categories", [])
-        })
+        system_context = ZeroHallucinationPipeline.build_system_context(full_metadata)
 
         # 4. LLM Call 1: Clinical Extraction + Guardrail (instrumented)
         # Handle case when called directly from TestClient outside lifespan 
         if state.orchestrator and state.orchestrator.pipeline:
             pipeline = state.orchestrator.pipeline
         else:
-            from app.core.llm_client import LLMClient
-            from app.services.pipeline import ZeroHallucinationPipeline
-            llm = LLMClient()
-            pipeline = ZeroHallucinationPipeline(llm=llm)
-
-        thought_process = pipeline.generate_clinical_report(scrubbed_transcript, system_context)
-        raw_extraction = thought_process.final_validated_clinical_report.model_dump()
-
-        # Identify which quotes the guardrail would strip
-        hallucinations_stripped: list[str] = []
-        def _check_item(item: dict) -> bool:
-            quote = item.get("exact_quote", "")
-            valid = bool(quote) and scrubbed_transcript.find(quote) != -1
-            if not valid:
-                hallucinations_stripped.append(quote or "<empty quote>")
-            return valid
-
-        validated_clinical = {
-            "chief_complaints": [c for c in raw_extraction["chief_complaints"] if _check_item(c)],
-            "assessments": [a for a in raw_extraction["assessments"] if _check_item(a)],
-            "actionables": [act for act in raw_extraction["actionables"] if _check_item(act)],
-        }
-
-        # 5. LLM Call 2: Patient Summary
-        patient_summary_dict = pipeline.generate_patient_summary(
-            validated_clinical_dict=validated_clinical,
-            scrubbed_transcript=scrubbed_transcript,
-            system_context=system_context,
-            language=request.language,
-        )
+            # Closed below, so its pooled connections do not outlive this request
+            owned_llm = create_llm_client()
+            pipeline = ZeroHallucinationPipeline(llm=owned_llm)
+
+        # Every per-stage routing decision (primary / fallback deployment) made for this draft
+        with ModelRouter.trace() as model_routing:
+            thought_process = await pipeline.generate_clinical_report(
+                scrubbed_transcript, system_context, bypass_cache=request.bypass_cache
+            )
+            raw_extraction = thought_process.final_validated_clinical_report.model_dump()
+
+            # Guardrail (same one-pass engine as production), keeping the stripped quotes and spans for inspection
+            guardrail_result = await pipeline.check_and_repair_quotes(thought_process, scrubbed_transcript, bypass_cache=request.bypass_cache)
+            hallucinations_stripped = [quote or "<empty quote>" for quote in guardrail_result.stripped]
+            validated_clinical = guardrail_result.report
+
+            # 5. LLM Call 2: Patient Summary
+            patient_summary_dict = await pipeline.generate_patient_summary(
+                validated_clinical_dict=validated_clinical,
+                scrubbed_transcript=scrubbed_transcript,
+                system_context=system_context,
+                language=request.language,
+                bypass_cache=request.bypass_cache,
+            )
 
         # 6. Hydrate (restore PII tokens)
         hydrated_clinical = _scrubber.hydrate_dict(validated_clinical, token_map)
@@ -325,6 +545,10 @@ async def debug_run_draft(request: DebugDraftRequest, db: Session = Depends(get_
             system_context_injected=system_context,
             clinical_extraction_raw=raw_extraction,
             hallucinations_stripped=hallucinations_stripped,
+            quote_spans=guardrail_result.span_payload(),
+            quotes_recovered=guardrail_result.recovered,
+            quotes_repaired=guardrail_result.repaired,
+            model_routing=model_routing,
             clinical_draft_validated=validated_clinical,
             patient_summary_md=patient_summary_dict.get("layman_explanation", ""),
             clinical_final_hydrated=hydrated_clinical,
@@ -337,6 +561,9 @@ async def debug_run_draft(request: DebugDraftRequest, db: Session = Depends(get_
     except Exception as e:
         logger.error(f"Debug Draft Failed: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if owned_llm is not None:
+            await owned_llm.aclose()
 
 
 @app.get("/api/v1/debug/db-context/{patient_id}")
@@ -359,8 +586,8 @@ async def debug_db_context(patient_id: str, doctor_id: str = "D-99", db: Session
     ]
 
     system_context = json.dumps({
-        "context_documents": context_docs,
         "available_doctor_categories": available_doctor_categories,
+        "context_documents": context_docs,
     }, indent=2)
 
     return {
@@ -371,12 +598,24 @@ async def debug_db_context(patient_id: str, doctor_id: str = "D-99", db: Session
         "available_doctor_categories": available_doctor_categories,
         "system_context_injected_into_llm": system_context,
         "clinical_extraction_system_prompt_preview": (
-            f"[CLINICAL_EXTRACTION_SYSTEM_PROMPT with system_context injected — "
-            f"{len(system_context)} chars of context]"
+            f"[CLINICAL_EXTRACTION_SYSTEM_PROMPT (static, cacheable prefix) followed by "
+            f"CLINICAL_EXTRACTION_CONTEXT_PROMPT with {len(system_context)} chars of context]"
         ),
     }
 
 
+@app.get("/api/v1/debug/metrics")
+async def debug_metrics():
+    """
+    DEBUG ENDPOINT — Process-local pipeline counters and timings (cache hit/miss, ...).
+    """
+    pipeline = state.orchestrator.pipeline if state.orchestrator else None
+    return {
+        **metrics.snapshot(),
+        "llm_cache": pipeline.cache.stats() if pipeline and pipeline.cache else None,
+    }
+
+
 @app.get("/api/v1/eeszt/patients")
 async def get_eeszt_patients(db: Session = Depends(get_db)):
     patients = db.query(Patient).all()
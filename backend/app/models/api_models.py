@@ -31,6 +31,35 @@ class DraftResponse(BaseModel):
     patient_summary_md: str
     clinical_draft_json: dict = Field(..., description="The editable, hydrated clinical dictionary.")
     token_map: dict = Field(default={}, description="The presidio token map required for final re-hydration.")
+    pipeline_metadata: dict = Field(default={}, description="Per-stage wall-clock timings (ms) and overlap savings for this draft.")
+    draft_id: Optional[str] = Field(default=None, description="Set with defer_summary: poll /drafts/{draft_id}/patient-summary.")
+    patient_summary_status: str = Field(default="ready", description="'ready', or 'pending' while a deferred summary is generated.")
+
+class PatientSummaryStatusResponse(BaseModel):
+    draft_id: str
+    status: str = Field(..., description="'pending', 'ready' or 'failed'.")
+    patient_summary_md: Optional[str] = Field(default=None, description="Set once ready.")
+    patient_summary: Optional[dict] = Field(default=None, description="The full hydrated PatientSummary, once ready.")
+    detail: Optional[str] = Field(default=None, description="Failure reason.")
+
+class IncrementalDraftRequest(BaseModel):
+    session_id: str = Field(..., min_length=1, max_length=100, description="Client-chosen id, stable for the whole consultation.")
+    patient_id: str = Field(..., description="Used to fetch DB context.")
+    doctor_id: str = Field(..., description="Used for referral mapping.")
+    encounter_date: str = Field(..., description="ISO 8601 Datetime.")
+    transcript: str = Field(..., description="The full transcript so far (previous text plus anything appended).")
+    language: str = Field(default="en", description="Patient summary language (used when final).")
+    final: bool = Field(default=False, description="Consultation ended: also generate the patient summary and close the session.")
+
+class IncrementalDraftResponse(BaseModel):
+    session_id: str
+    update: str = Field(..., description="'full', 'incremental' (only the appended segment was extracted) or 'unchanged'.")
+    covered_chars: int = Field(..., description="Length of the transcript prefix reflected in the draft.")
+    administrative_metadata: dict
+    clinical_draft_json: dict = Field(..., description="The editable, hydrated clinical dictionary.")
+    patient_summary_md: Optional[str] = Field(default=None, description="Only set on the final call.")
+    token_map: dict = Field(default={}, description="The presidio token map required for final re-hydration.")
+    pipeline_metadata: dict = Field(default={}, description="Per-stage wall-clock timings (ms) for this call.")
 
 class FinalizeRequest(BaseModel):
     appointment_id: Optional[str] = None
@@ -64,6 +93,11 @@ class DebugDraftRequest(BaseModel):
         description="If true, skips Presidio and sends the transcript verbatim to the LLM. "
                     "Useful when transcript is already anonymized."
     )
+    bypass_cache: bool = Field(
+        default=False,
+        description="If true, skips the LLM result cache lookup and forces fresh LLM calls. "
+                    "Use while iterating on prompts."
+    )
 
 class DebugStageResult(BaseModel):
     """One stage of the debug pipeline trace."""
@@ -93,6 +127,10 @@ class DebugDraftResponse(BaseModel):
     # LLM Call 1: Clinical extraction
     clinical_extraction_raw: dict       # before guardrail stripping
     hallucinations_stripped: List[str]  # quotes that failed verbatim check
+    quote_spans: dict = {}              # [start, end) offsets into scrubbed_transcript per validated item
+    quotes_recovered: List[dict] = []   # near-miss quotes snapped to their verbatim span instead of stripped
+    quotes_repaired: List[dict] = []    # stripped items whose quotes were fixed by the targeted repair call
+    model_routing: List[dict] = []      # per-stage deployment decisions ({stage, model, reason}) made for this draft
     clinical_draft_validated: dict      # after guardrail
     
     # LLM Call 2: Patient summary
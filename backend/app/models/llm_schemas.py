@@ -53,3 +53,80 @@ class PatientSummary(BaseModel):
     actionables: List[ActionableItem] = Field(
         ..., description="Clear instructions for the patient to follow, directly mapping to the clinical report."
     )
+
+class FusedConsultation(BaseModel):
+    negation_check: str = Field(
+        ..., description="Step 1: Explicitly state any negations heard (e.g., 'Patient denied chest pain')."
+    )
+    attribution_check: str = Field(
+        ..., description="Step 2: Outline the subjects mentioned to distinguish patient vs family."
+    )
+    final_validated_clinical_report: ClinicalReport = Field(
+        ..., description="Step 3: The final clinical report extracted from the transcript."
+    )
+    patient_summary: PatientSummary = Field(
+        ..., description="Step 4: The patient-facing summary of the report above, in the target language."
+    )
+
+class RepairedQuote(BaseModel):
+    item_index: int = Field(..., description="The 'item_index' of the Rejected Item this entry repairs.")
+    supported: bool = Field(
+        ..., description="False if the excerpt does not state the item as described; the item is then discarded."
+    )
+    exact_quote: str = Field(..., description="Literal, verbatim substring of the excerpt supporting the item (empty if unsupported).")
+    contextual_quote: str = Field(
+        ..., description="The verbatim exact_quote plus approx 5 words before and after (empty if unsupported)."
+    )
+
+class QuoteRepair(BaseModel):
+    repairs: List[RepairedQuote] = Field(..., description="Exactly one entry per Rejected Item.")
+
+# Lean extraction schema (EXTRACTION_SCHEMA=lean): the same report with terse keys, optional reasoning
+# and no contextual quotes (derived from the transcript afterwards), to cut output tokens.
+class LeanFinding(BaseModel):
+    f: str = Field(..., description="finding")
+    s: SchemaConstraints.CONDITION_STATUS = Field(..., description="condition_status")
+    p: SchemaConstraints.SUBJECT = Field(..., description="subject")
+    q: str = Field(..., description="exact_quote: literal 1-4 word transcript substring")
+    r: Optional[str] = Field(default=None, description="system_reference_id")
+
+class LeanAction(BaseModel):
+    t: SchemaConstraints.ACTION_TYPE = Field(..., description="action_type")
+    d: str = Field(..., description="description")
+    w: Optional[str] = Field(default=None, description="timeframe")
+    r: Optional[str] = Field(default=None, description="system_reference_id")
+    q: str = Field(..., description="exact_quote: literal transcript substring")
+
+# Lean array keys -> full ClinicalReport sections
+LEAN_SECTIONS = {"cc": "chief_complaints", "dx": "assessments", "a": "actionables"}
+
+class LeanClinicalExtraction(BaseModel):
+    n: Optional[str] = Field(default=None, description="Optional terse note on non-obvious negations/attributions (max 20 words).")
+    cc: List[LeanFinding] = Field(..., description="chief_complaints")
+    dx: List[LeanFinding] = Field(..., description="assessments")
+    a: List[LeanAction] = Field(..., description="actionables")
+
+    def expand(self, contextual_quote) -> ClinicalExtractionThoughtProcess:
+        """Full-schema equivalent; `contextual_quote(exact_quote)` supplies the surrounding phrase."""
+        def finding(item: LeanFinding) -> DiagnosticResult:
+            return DiagnosticResult(
+                finding=item.f, condition_status=item.s, subject=item.p, exact_quote=item.q,
+                contextual_quote=contextual_quote(item.q), system_reference_id=item.r
+            )
+        return ClinicalExtractionThoughtProcess(
+            negation_check=self.n or "",
+            attribution_check="",
+            final_validated_clinical_report=ClinicalReport(
+                chief_complaints=[finding(i) for i in self.cc],
+                assessments=[finding(i) for i in self.dx],
+                actionables=[
+                    ActionableItem(
+                        action_type=i.t, description=i.d, timeframe=i.w, system_reference_id=i.r,
+                        exact_quote=i.q, contextual_quote=contextual_quote(i.q)
+                    ) for i in self.a
+                ]
+            )
+        )
+
+# Every class the pipeline requests as structured output (schemas are precomputed at client start-up)
+RESPONSE_FORMATS = (ClinicalExtractionThoughtProcess, LeanClinicalExtraction, PatientSummary, FusedConsultation, QuoteRepair)
@@ -0,0 +1,190 @@
+"""
+In-process bulk re-processing of transcript corpora through ZeroHallucinationPipeline.run_consultation.
+
+Input files are streamed (never loaded as a whole corpus):
+  *.json            one case object `{"metadata": {...}, "transcript": "..."}` or a list of them
+  *.ndjson/*.jsonl  one case object per line
+A case may carry `id` and `language`; otherwise the id is derived from the file name (and position).
+
+The NDJSON output file doubles as the checkpoint: every finished case is appended and flushed
+immediately, and a re-run with the same output skips ids already recorded as `ok`.
+"""
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, Optional
+
+from app.core.config import Config
+from app.core.metrics import StageTimer, metrics
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class BatchCase:
+    case_id: str
+    source: str
+    transcript: str
+    metadata: dict = field(default_factory=dict)
+    language: str = "en"
+
+def _to_case(obj: dict, default_id: str, source: str, default_language: str) -> BatchCase:
+    return BatchCase(
+        case_id=str(obj.get("id") or obj.get("case_id") or default_id),
+        source=source,
+        transcript=obj["transcript"],
+        metadata=obj.get("metadata", {}),
+        language=obj.get("language", default_language)
+    )
+
+def iter_cases(paths: Iterable[str], default_language: str = "en") -> Iterator[BatchCase]:
+    """Yields cases lazily from JSON / NDJSON files, in the order given."""
+    for path in paths:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        if path.endswith((".ndjson", ".jsonl")):
+            with open(path, encoding="utf-8") as f:
+                for line_no, line in enumerate(f, start=1):
+                    if line.strip():
+                        yield _to_case(json.loads(line), f"{stem}#{line_no}", path, default_language)
+            continue
+
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, list):
+            for i, obj in enumerate(data):
+                yield _to_case(obj, f"{stem}#{i}", path, default_language)
+        else:
+            yield _to_case(data, stem, path, default_language)
+
+def load_completed(output_path: str, retry_failed: bool = True) -> set[str]:
+    """Ids already recorded in a previous (possibly interrupted) run's output."""
+    done: set[str] = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a torn last line from a killed run; that case is simply redone
+            if record.get("status") == "ok" or not retry_failed:
+                done.add(record["id"])
+    return done
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, "rb") as f:
+        if f.seek(0, os.SEEK_END) == 0:
+            return True
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+def _percentile(ordered: list[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+class BatchRunner:
+    """
+    Runs cases through the pipeline with at most `concurrency` consultations in flight.
+    Cases are pulled from the iterator through a bounded queue, so memory stays flat
+    regardless of corpus size.
+    """
+    def __init__(self, pipeline, output_path: str, concurrency: int = Config.BATCH_CONCURRENCY,
+                 bypass_cache: bool = False, retry_failed: bool = True, mode: str | None = None):
+        self.pipeline = pipeline
+        self.output_path = output_path
+        self.concurrency = max(1, concurrency)
+        self.bypass_cache = bypass_cache
+        self.retry_failed = retry_failed
+        self.mode = mode
+
+    async def _process(self, case: BatchCase) -> dict:
+        timer = StageTimer()
+        started = time.perf_counter()
+        record = {"id": case.case_id, "source": case.source, "language": case.language}
+        try:
+            clinical, patient, _ = await self.pipeline.run_consultation(
+                case.transcript,
+                metadata_context=case.metadata,
+                language=case.language,
+                bypass_cache=self.bypass_cache,
+                timer=timer,
+                mode=self.mode
+            )
+            record.update(status="ok", clinical_draft_json=clinical, patient_summary=patient)
+        except Exception as e:
+            logger.error(f"Batch case {case.case_id} failed: {e}")
+            record.update(status="error", error=f"{type(e).__name__}: {e}")
+        record["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        record["timings"] = timer.report()
+        return record
+
+    async def run(self, cases: Iterable[BatchCase]) -> dict:
+        completed = load_completed(self.output_path, retry_failed=self.retry_failed)
+        queue: asyncio.Queue[Optional[BatchCase]] = asyncio.Queue(maxsize=self.concurrency * 2)
+        latencies: list[float] = []
+        counts = {"succeeded": 0, "failed": 0, "skipped": 0}
+        started = time.perf_counter()
+
+        async def produce():
+            seen: set[str] = set()
+            try:
+                for case in cases:
+                    if case.case_id in completed or case.case_id in seen:
+                        counts["skipped"] += 1
+                        continue
+                    seen.add(case.case_id)
+                    await queue.put(case)
+            finally:
+                # Workers drain what is queued, then stop (also when reading the input failed).
+                for _ in range(self.concurrency):
+                    await queue.put(None)
+
+        with open(self.output_path, "a", encoding="utf-8") as out:
+            if not _ends_with_newline(self.output_path):
+                out.write("\n")  # terminate a torn line so the next record starts clean
+
+            async def work():
+                while (case := await queue.get()) is not None:
+                    record = await self._process(case)
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    out.flush()
+                    latencies.append(record["latency_ms"])
+                    key = "succeeded" if record["status"] == "ok" else "failed"
+                    counts[key] += 1
+                    metrics.incr(f"batch.{key}")
+                    metrics.observe("batch.item_seconds", record["latency_ms"] / 1000)
+                    logger.info(f"[{counts['succeeded'] + counts['failed']}] {case.case_id}: {record['status']} in {record['latency_ms']:.0f} ms")
+
+            workers = [asyncio.create_task(work()) for _ in range(self.concurrency)]
+            try:
+                await produce()
+            except asyncio.CancelledError:
+                for worker in workers:
+                    worker.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+                raise
+            except Exception:
+                # Unreadable input: finish and record what was already queued before the file closes
+                await asyncio.gather(*workers, return_exceptions=True)
+                raise
+            await asyncio.gather(*workers)
+
+        wall_clock = time.perf_counter() - started
+        processed = counts["succeeded"] + counts["failed"]
+        ordered = sorted(latencies)
+        return {
+            "processed": processed,
+            **counts,
+            "concurrency": self.concurrency,
+            "wall_clock_s": round(wall_clock, 2),
+            "throughput_per_min": round(processed / wall_clock * 60, 2) if wall_clock > 0 else 0.0,
+            "latency_ms": {
+                "p50": _percentile(ordered, 0.50),
+                "p95": _percentile(ordered, 0.95),
+                "max": ordered[-1] if ordered else 0.0
+            }
+        }
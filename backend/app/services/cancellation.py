@@ -0,0 +1,68 @@
+"""
+Request-scoped cancellation for the draft endpoints. The request's work runs as a task that is
+cancelled when the client disconnects or the request deadline passes: the `X-Request-Timeout`
+header (seconds, e.g. propagated by the frontend or a gateway), else REQUEST_DEADLINE_SECONDS.
+Cancellation reaches every awaited stage: in-flight LLM calls are aborted (their HTTP requests
+closed), the Azure transcription session is stopped, and calls not yet issued are never made.
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from app.core.config import Config
+from app.core.metrics import metrics
+
+R = TypeVar("R")
+logger = logging.getLogger(__name__)
+
+DEADLINE_HEADER = "X-Request-Timeout"
+
+class RequestCancelled(RuntimeError):
+    """The request's work was abandoned; `reason` is "disconnect" or "deadline"."""
+    def __init__(self, reason: str, elapsed: float):
+        super().__init__(f"Request cancelled ({reason}) after {elapsed:.1f}s")
+        self.reason = reason
+        self.elapsed = elapsed
+
+def request_timeout(header_value: Optional[str]) -> Optional[float]:
+    """Seconds the client will wait: the deadline header if valid and positive, else the configured default (None = no deadline)."""
+    try:
+        timeout = float(header_value) if header_value else Config.REQUEST_DEADLINE_SECONDS
+    except ValueError:
+        timeout = Config.REQUEST_DEADLINE_SECONDS
+    return timeout if timeout > 0 else None
+
+async def run_cancellable(work: Awaitable[R], is_disconnected: Callable[[], Awaitable[bool]], timeout: Optional[float] = None) -> R:
+    """
+    Awaits `work`, polling `is_disconnected` every REQUEST_DISCONNECT_POLL_SECONDS. On disconnect or
+    once `timeout` has elapsed the work is cancelled (and awaited) and RequestCancelled is raised.
+    """
+    task = asyncio.ensure_future(work)
+    started = time.perf_counter()
+    deadline = started + timeout if timeout is not None else None
+    try:
+        while True:
+            poll = Config.REQUEST_DISCONNECT_POLL_SECONDS
+            if deadline is not None:
+                poll = min(poll, max(0.0, deadline - time.perf_counter()))
+            done, _ = await asyncio.wait({task}, timeout=poll)
+            if done:
+                return task.result()
+            if deadline is not None and time.perf_counter() >= deadline:
+                reason = "deadline"
+                break
+            if await is_disconnected():
+                reason = "disconnect"
+                break
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    elapsed = time.perf_counter() - started
+    metrics.incr(f"request.cancelled.{reason}")
+    metrics.observe("request.cancelled.elapsed_seconds", elapsed)
+    logger.warning(f"Request work cancelled after {elapsed:.2f}s: {reason}")
+    raise RequestCancelled(reason, elapsed)
@@ -0,0 +1,100 @@
+"""
+Per-stage checkpoints for /generate-draft, so a retry after a failure (e.g. the patient summary call)
+resumes from the last completed stage instead of repeating ffmpeg, transcription, scrubbing and
+extraction. Entries are keyed by (draft id, stage); the draft id is a hash of the request inputs,
+so an identical retry finds them. Stages: "audio" (normalized file path + sha256), "transcript",
+"scrub" (scrubbed transcript + token map), "extraction" (raw report), "validated" (guardrailed
+report), "summary". Checkpoints hold raw transcripts and token maps (PII): they live for
+DRAFT_CHECKPOINT_TTL_SECONDS at most and are deleted as soon as the draft completes.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+from app.core.config import Config
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+class DraftCheckpointStore:
+    """
+    In-memory SQLite store for one process by default. A file path (opt-in) shares it between the workers
+    using that file; expired rows are purged on open, read and write so an idle server keeps no stale PII.
+    """
+    def __init__(self, path: str = Config.DRAFT_CHECKPOINT_SQLITE_PATH, ttl_seconds: float = Config.DRAFT_CHECKPOINT_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path or ":memory:", check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS draft_checkpoints ("
+            " draft_id TEXT NOT NULL, stage TEXT NOT NULL, value TEXT NOT NULL, created_at REAL NOT NULL,"
+            " PRIMARY KEY (draft_id, stage))"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+        with self._lock:
+            self._purge_expired_locked(time.time())
+
+    def _purge_expired_locked(self, now: float):
+        self._conn.execute("DELETE FROM draft_checkpoints WHERE created_at < ?", (now - self.ttl_seconds,))
+        self._conn.commit()
+
+    def get(self, draft_id: str, stage: str) -> Optional[Any]:
+        with self._lock:
+            self._purge_expired_locked(time.time())
+            row = self._conn.execute(
+                "SELECT value, created_at FROM draft_checkpoints WHERE draft_id = ? AND stage = ?", (draft_id, stage)
+            ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def put(self, draft_id: str, stage: str, value: Any):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO draft_checkpoints (draft_id, stage, value, created_at) VALUES (?, ?, ?, ?)",
+                (draft_id, stage, json.dumps(value), now)
+            )
+            self._purge_expired_locked(now)
+
+    def clear(self, draft_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM draft_checkpoints WHERE draft_id = ?", (draft_id,))
+            self._conn.commit()
+
+    def draft(self, draft_id: str) -> "DraftCheckpoint":
+        return DraftCheckpoint(self, draft_id)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class DraftCheckpoint:
+    """One draft's checkpoints. A failed write only costs the resume, never the draft."""
+    def __init__(self, store: DraftCheckpointStore, draft_id: str):
+        self.store = store
+        self.draft_id = draft_id
+
+    def has(self, stage: str) -> bool:
+        return self.store.get(self.draft_id, stage) is not None
+
+    def load(self, stage: str) -> Optional[Any]:
+        value = self.store.get(self.draft_id, stage)
+        if value is not None:
+            metrics.incr(f"draft_checkpoint.resumed.{stage}")
+            logger.info(f"Draft {self.draft_id[:12]}: resuming from '{stage}' checkpoint")
+        return value
+
+    def save(self, stage: str, value: Any):
+        try:
+            self.store.put(self.draft_id, stage, value)
+        except sqlite3.Error as e:
+            logger.warning(f"Draft checkpoint write failed for '{stage}': {e}")
+
+    def clear(self):
+        self.store.clear(self.draft_id)
@@ -0,0 +1,79 @@
+"""
+Speaker-turn aware windowing of long transcripts for parallel clinical extraction.
+Windows are contiguous slices of the scrubbed transcript (so every verbatim quote found in a
+window is also verbatim in the full transcript) and overlap by whole turns to keep context.
+"""
+import re
+from dataclasses import dataclass
+
+# "[Guest-1]: ..." (Azure diarization, joined on one line) or "Doctor: ..." / "Dr. Miller: ..." at the
+# start of a line (synthetic transcripts). Capitalised words only, so prose like "I said: " is no turn.
+_TURN_START = re.compile(
+    r"(?:(?:(?<=\s)|^)\[[^\[\]\n]{1,40}\]|^[ \t]*[A-Z][A-Za-z'\-]*(?:\.? [A-Z][A-Za-z'\-]*){0,2}):\s",
+    re.MULTILINE
+)
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+@dataclass(frozen=True)
+class TranscriptWindow:
+    index: int
+    start: int  # absolute character offset into the full transcript
+    end: int
+    text: str
+
+def _segment_bounds(transcript: str, max_chars: int) -> list[tuple[int, int]]:
+    """Speaker-turn spans; turns longer than `max_chars` are split at sentence ends, then whitespace."""
+    starts = sorted({0, *(m.start() for m in _TURN_START.finditer(transcript))})
+    turns = [(s, e) for s, e in zip(starts, starts[1:] + [len(transcript)]) if e > s]
+
+    segments: list[tuple[int, int]] = []
+    for start, end in turns:
+        if end - start <= max_chars:
+            segments.append((start, end))
+            continue
+        cuts = [start] + [start + m.end() for m in _SENTENCE_END.finditer(transcript[start:end])] + [end]
+        piece_start = start
+        for prev, cut in zip(cuts, cuts[1:]):
+            if cut - piece_start > max_chars and prev > piece_start:
+                segments.append((piece_start, prev))
+                piece_start = prev
+            while cut - piece_start > max_chars:
+                hard = transcript.rfind(" ", piece_start + 1, piece_start + max_chars)
+                hard = hard + 1 if hard > piece_start else piece_start + max_chars
+                segments.append((piece_start, hard))
+                piece_start = hard
+        if end > piece_start:
+            segments.append((piece_start, end))
+    return segments
+
+def split_into_windows(transcript: str, window_chars: int, overlap_chars: int) -> list[TranscriptWindow]:
+    """
+    Packs whole speaker turns into windows of at most `window_chars`. Each subsequent window
+    re-reads the trailing whole turns of the previous one that fit within `overlap_chars`.
+    """
+    if len(transcript) <= window_chars:
+        return [TranscriptWindow(index=0, start=0, end=len(transcript), text=transcript)]
+
+    segments = _segment_bounds(transcript, window_chars)
+    windows: list[TranscriptWindow] = []
+    first = 0
+    while first < len(segments):
+        last = first
+        while last + 1 < len(segments) and segments[last + 1][1] - segments[first][0] <= window_chars:
+            last += 1
+        start, end = segments[first][0], segments[last][1]
+        windows.append(TranscriptWindow(index=len(windows), start=start, end=end, text=transcript[start:end]))
+        if last == len(segments) - 1:
+            break
+
+        # Step back over trailing turns so the next window re-reads ~overlap_chars of context
+        next_first = last + 1
+        while next_first - 1 > first and end - segments[next_first - 1][0] <= overlap_chars:
+            next_first -= 1
+        first = next_first
+    return windows
+
+def last_turn_start(transcript: str) -> int | None:
+    """Offset of the last speaker turn (None if the text has no turn markers)."""
+    starts = [m.start() for m in _TURN_START.finditer(transcript)]
+    return starts[-1] if starts else None
@@ -0,0 +1,416 @@
+"""
+One-pass deterministic quote guardrail.
+Every distinct exact_quote / contextual_quote of a report is compiled into one Aho-Corasick
+automaton and matched in a single scan of the transcript (instead of one str.find per item),
+returning the character spans of every occurrence so callers and the UI never search again.
+Optionally, quotes that miss by a few characters (punctuation, casing, spacing) are snapped to their
+verbatim span via a k-gram index and bounded edit distance instead of being stripped.
+"""
+import heapq
+import logging
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from app.core.config import Config
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+try:
+    import ahocorasick
+except ImportError:
+    # A declared dependency; only a broken install gets here, and the guardrail then scans once per quote
+    ahocorasick = None
+    logger.warning("pyahocorasick is not installed; the quote guardrail falls back to one str.find per pattern.")
+
+SECTIONS = ("chief_complaints", "assessments", "actionables")
+_WHITESPACE = re.compile(r"\s+")
+# Recovery must never flip a negation ("I do have" -> "I don't have" is a small edit but a new meaning)
+_NEGATION = re.compile(r"\b(?:no|not|never|none|nothing|without|denies|denied|negative)\b|n't\b", re.IGNORECASE)
+# Nor swap one scrubbed identity for another ("[PERSON_1]" -> "[PERSON_2]" is one edit but another person)
+_PLACEHOLDER = re.compile(r"[A-Z_]+_\d+")
+
+Span = tuple[int, int]
+
+_KGRAM = 4  # index granularity for near-miss candidate search
+_MAX_FUZZY_CANDIDATES = 8  # alignment attempts per near-miss quote
+
+def normalize_quote(text: str) -> str:
+    """Whitespace runs collapsed to one space, surrounding whitespace dropped, lowercased."""
+    return _WHITESPACE.sub(" ", text).strip().lower()
+
+def normalize_with_offsets(text: str) -> tuple[str, list[int]]:
+    """
+    Same normalization as normalize_quote (without the strip) for a transcript, plus `offsets` where
+    offsets[i] is the original index of normalized character i (offsets[len] == len(text)).
+    """
+    chars: list[str] = []
+    offsets: list[int] = []
+    previous_space = False
+    for index, char in enumerate(text):
+        if char.isspace():
+            if previous_space:
+                continue
+            previous_space = True
+            chars.append(" ")
+            offsets.append(index)
+            continue
+        previous_space = False
+        for lowered in char.lower():  # a few characters lowercase to two code points
+            chars.append(lowered)
+            offsets.append(index)
+    offsets.append(len(text))
+    return "".join(chars), offsets
+
+class QuoteAutomaton:
+    """
+    Multi-pattern matcher over a fixed set of quotes; `search` reports overlapping occurrences too.
+    Uses the C Aho-Corasick automaton from pyahocorasick when installed (one pass over the text);
+    otherwise enumerates each distinct pattern with str.find, which beats a pure-Python automaton.
+    """
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns = list(dict.fromkeys(p for p in patterns if p))
+        self._automaton = None
+        if ahocorasick is not None and self.patterns:
+            self._automaton = ahocorasick.Automaton()
+            for pattern in self.patterns:
+                self._automaton.add_word(pattern, pattern)
+            self._automaton.make_automaton()
+
+    def search(self, text: str) -> dict[str, list[Span]]:
+        """Maps every pattern to the (start, end) spans of all its occurrences in `text`, in order."""
+        matches: dict[str, list[Span]] = {pattern: [] for pattern in self.patterns}
+        if self._automaton is not None:
+            for end, pattern in self._automaton.iter(text):
+                matches[pattern].append((end + 1 - len(pattern), end + 1))
+            return matches
+
+        for pattern, spans in matches.items():
+            start = text.find(pattern)
+            while start != -1:
+                spans.append((start, start + len(pattern)))
+                start = text.find(pattern, start + 1)
+        return matches
+
+def _negations(text: str) -> list[str]:
+    return sorted(match.lower() for match in _NEGATION.findall(text))
+
+def _fold(text: str) -> str:
+    """Lowercase without changing the length, so folded offsets are transcript offsets."""
+    folded = text.lower()
+    if len(folded) == len(text):
+        return folded
+    return "".join(c.lower() if len(c.lower()) == 1 else c for c in text)
+
+def _best_alignment(quote: str, window: str) -> tuple[int, int, int]:
+    """
+    Semi-global edit distance (free start and end in `window`): returns (distance, start, end) of
+    the window substring closest to `quote`, preferring the one whose length is closest to the quote's.
+    """
+    m = len(quote)
+    dist = list(range(m + 1))  # column for the empty window prefix
+    starts = [0] * (m + 1)
+    best = (dist[m], m, 0, 0)
+    for j, char in enumerate(window, start=1):
+        prev_diag, prev_diag_start = dist[0], starts[0]
+        dist[0], starts[0] = 0, j  # an alignment may begin after any window character
+        for i in range(1, m + 1):
+            up, up_start = dist[i], starts[i]
+            substitute = prev_diag + (quote[i - 1] != char)
+            delete = dist[i - 1] + 1   # quote char missing from the window
+            insert = up + 1            # window char missing from the quote
+            if substitute <= delete and substitute <= insert:
+                dist[i], starts[i] = substitute, prev_diag_start
+            elif delete <= insert:
+                dist[i], starts[i] = delete, starts[i - 1]
+            else:
+                dist[i], starts[i] = insert, up_start
+            prev_diag, prev_diag_start = up, up_start
+        candidate = (dist[m], abs((j - starts[m]) - m), starts[m], j)
+        if candidate < best:
+            best = candidate
+    return best[0], best[2], best[3]
+
+def _edit_distance(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+class TranscriptIndex:
+    """
+    Case-folded k-gram positions over a transcript. A quote within d edits of some span shares at
+    least (len - k + 1) - k*d k-grams with it (q-gram lemma), so only diagonals collecting that many
+    votes are aligned; the index is built once per guardrail pass, on the first near miss.
+    """
+    def __init__(self, transcript: str, k: int = _KGRAM):
+        self.text = transcript
+        self.folded = _fold(transcript)
+        self.k = k
+        self.grams: dict[str, list[int]] = defaultdict(list)
+        for position in range(len(self.folded) - k + 1):
+            self.grams[self.folded[position:position + k]].append(position)
+
+    def _votes(self, folded_quote: str) -> Counter:
+        """Shared k-grams per diagonal (transcript position - quote offset)."""
+        votes = Counter()
+        for offset in range(len(folded_quote) - self.k + 1):
+            for position in self.grams.get(folded_quote[offset:offset + self.k], ()):
+                votes[position - offset] += 1
+        return votes
+
+    def anchor(self, text: str, min_votes: int = 2) -> Span | None:
+        """Transcript span most likely to be about `text` (best k-gram diagonal), however far from verbatim."""
+        folded = _fold(text)
+        votes = self._votes(folded)
+        if not votes:
+            return None
+        diagonal, count = max(votes.items(), key=lambda pair: (pair[1], -pair[0]))
+        if count < min_votes:
+            return None
+        return max(0, diagonal), min(len(self.text), diagonal + len(folded))
+
+    def find_near(self, quote: str, max_edits: int) -> tuple[Span, int] | None:
+        """Closest verbatim span within `max_edits` edits of `quote`, with its distance, or None."""
+        folded_quote = _fold(quote)
+        m, k = len(folded_quote), self.k
+        needed = (m - k + 1) - k * max_edits
+        if needed <= 0:
+            return None
+
+        votes = self._votes(folded_quote)
+        # Insertions/deletions shift the diagonal by up to max_edits; pool neighbouring votes
+        # (sliding window over the sorted diagonals).
+        diagonals = sorted(votes)
+        pooled = []
+        low = high = 0
+        window_votes = 0
+        for diagonal in diagonals:
+            while high < len(diagonals) and diagonals[high] <= diagonal + max_edits:
+                window_votes += votes[diagonals[high]]
+                high += 1
+            while diagonals[low] < diagonal - max_edits:
+                window_votes -= votes[diagonals[low]]
+                low += 1
+            if window_votes >= needed:
+                pooled.append((window_votes, diagonal))
+        candidates = [diagonal for _, diagonal in heapq.nlargest(_MAX_FUZZY_CANDIDATES, pooled)]
+
+        best = None
+        for diagonal in sorted(candidates):
+            window_start = max(0, diagonal - max_edits)
+            window = self.folded[window_start:diagonal + m + max_edits]
+            distance, start, end = _best_alignment(folded_quote, window)
+            if distance <= max_edits and (best is None or distance < best[1]):
+                best = ((window_start + start, window_start + end), distance)
+        if best is None:
+            return None
+
+        (start, end), distance = best
+        return self._snap(folded_quote, start, end, max_edits)
+
+    def _snap(self, folded_quote: str, start: int, end: int, max_edits: int) -> tuple[Span, int]:
+        """
+        Equally good alignments can differ by a stray character at either edge; re-score nearby
+        start/end pairs and prefer the closest one that starts and ends on token boundaries.
+        """
+        text, folded = self.text, self.folded
+        def starts_token(p: int) -> bool:
+            return p == 0 or text[p - 1].isspace() or (text[p].isalnum() and not text[p - 1].isalnum())
+        def ends_token(p: int) -> bool:
+            return p == len(text) or text[p].isspace() or (text[p - 1].isalnum() and not text[p].isalnum())
+
+        starts = {start} | {p for p in range(max(0, start - max_edits), min(len(text), start + max_edits + 1)) if starts_token(p)}
+        ends = {end} | {p for p in range(max(1, end - max_edits), min(len(text), end + max_edits) + 1) if ends_token(p)}
+        scored = []
+        for s in starts:
+            for e in ends:
+                if e - s <= 0:
+                    continue
+                distance = _edit_distance(folded_quote, folded[s:e])
+                if distance <= max_edits:
+                    scored.append((distance, not (starts_token(s) and ends_token(e)), abs((e - s) - len(folded_quote)), s, e))
+        distance, _, _, start, end = min(scored)
+
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        return (start, end), distance
+
+@dataclass
+class GuardrailResult:
+    report: dict  # validated ClinicalReport dict: items whose exact_quote was not found are removed
+    spans: dict[str, list[dict]] = field(default_factory=dict)  # per section, aligned with report items
+    stripped: list[str] = field(default_factory=list)  # exact_quote of every removed item, in report order
+    recovered: list[dict] = field(default_factory=list)  # near-miss quotes snapped to their verbatim span
+    rejected: list[dict] = field(default_factory=list)  # {"section", "item"} for every stripped item
+    repaired: list[dict] = field(default_factory=list)  # stripped items restored by a repair call
+    rewritten: dict[str, str] = field(default_factory=dict)  # LLM exact_quote -> transcript text it was accepted as
+
+    def span_payload(self) -> dict:
+        """JSON-friendly spans: {section: [{"exact_quote": [s, e], "contextual_quote": [s, e] | None}]}."""
+        return {
+            section: [{key: list(span) if span else None for key, span in item.items()} for item in items]
+            for section, items in self.spans.items()
+        }
+
+_WORDS_BEFORE = re.compile(r"(?:\S+\s+){0,5}$")
+_WORDS_AFTER = re.compile(r"(?:\s+\S+){0,5}")
+
+def contextual_window(transcript: str, quote: str, reach: int = 200) -> str:
+    """
+    The first occurrence of `quote` plus up to 5 words on either side, as a verbatim slice (the
+    contextual_quote convention). Used when the model is not asked to write contextual quotes;
+    a quote that is not in the transcript is returned unchanged for the guardrail to judge.
+    """
+    start = transcript.find(quote) if quote else -1
+    if start == -1:
+        return quote
+    end = start + len(quote)
+    before = _WORDS_BEFORE.search(transcript, max(0, start - reach), start)
+    after = _WORDS_AFTER.match(transcript, end, min(len(transcript), end + reach))
+    return transcript[before.start():after.end()].strip()
+
+def repair_excerpt(transcript: str, items: list[dict], radius: int) -> tuple[str, list[int]]:
+    """
+    Transcript neighbourhoods (+/- `radius` chars, widened to whitespace) of the spans that rejected
+    items most likely refer to, as merged verbatim slices joined by "\n...\n", plus the indexes of the
+    items that could be anchored at all (an item sharing no text with the transcript is not repairable).
+    """
+    index = TranscriptIndex(transcript)
+    regions, anchored = [], []
+    for position, item in enumerate(items):
+        probes = [item.get("contextual_quote"), item.get("exact_quote"), item.get("description") or item.get("finding")]
+        span = next((found for found in (index.anchor(p) for p in probes if p) if found), None)
+        if span is None:
+            continue
+        anchored.append(position)
+        start = transcript.rfind(" ", 0, max(0, span[0] - radius)) + 1
+        end = transcript.find(" ", min(len(transcript), span[1] + radius))
+        regions.append((start, len(transcript) if end == -1 else end))
+
+    merged: list[list[int]] = []
+    for start, end in sorted(regions):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return "\n...\n".join(transcript[start:end] for start, end in merged), anchored
+
+class QuoteGuardrail:
+    """
+    Strict mode matches quotes verbatim (the historical `str.find` semantics). Normalized mode
+    matches across whitespace and case differences and rewrites each accepted quote to the exact
+    transcript text it matched, so downstream verbatim lookups keep working.
+    With fuzzy recovery on, a quote that is still not found but lies within a bounded edit distance
+    of a transcript span is rewritten to that span and reported in `recovered` rather than stripped.
+    Spans are character offsets into the transcript the report was validated against.
+    """
+    def __init__(self, normalize: bool | None = None, fuzzy: bool | None = None):
+        self.normalize = Config.GUARDRAIL_NORMALIZE_QUOTES if normalize is None else normalize
+        self.fuzzy = Config.GUARDRAIL_FUZZY_RECOVERY if fuzzy is None else fuzzy
+
+    def _key(self, quote: str) -> str:
+        return normalize_quote(quote) if self.normalize else quote
+
+    def locate(self, quotes: Iterable[str], transcript: str) -> dict[str, list[Span]]:
+        """All occurrences (as spans into `transcript`) of each distinct quote, keyed by the quote's match key."""
+        automaton = QuoteAutomaton(self._key(q) for q in quotes if q)
+        if not automaton.patterns:
+            return {}
+        if not self.normalize:
+            return automaton.search(transcript)
+        haystack, offsets = normalize_with_offsets(transcript)
+        return {
+            pattern: [(offsets[start], offsets[end - 1] + 1) for start, end in found]
+            for pattern, found in automaton.search(haystack).items()
+        }
+
+    def check(self, report: dict, transcript: str) -> GuardrailResult:
+        items = [item for section in SECTIONS for item in report.get(section, [])]
+        located = self.locate(
+            [item.get("exact_quote") for item in items] + [item.get("contextual_quote") for item in items],
+            transcript
+        )
+
+        result = GuardrailResult(report=dict(report))
+        index: TranscriptIndex | None = None
+
+        def recover(section: str, position: int, field_name: str, quote: str | None) -> Span | None:
+            nonlocal index
+            if not self.fuzzy or not quote or len(quote) < Config.GUARDRAIL_FUZZY_MIN_QUOTE_CHARS:
+                return None
+            if index is None:
+                index = TranscriptIndex(transcript)
+            near = index.find_near(quote, max(1, int(len(quote) * Config.GUARDRAIL_FUZZY_MAX_EDIT_RATIO)))
+            if near is None:
+                return None
+            span, distance = near
+            if _negations(quote) != _negations(transcript[span[0]:span[1]]):
+                logger.warning(f"Guardrail near miss not recovered (negation differs): '{quote}'")
+                return None
+            if _PLACEHOLDER.findall(quote) != _PLACEHOLDER.findall(transcript[span[0]:span[1]]):
+                logger.warning(f"Guardrail near miss not recovered (PII placeholders differ): '{quote}'")
+                return None
+            result.recovered.append({
+                "section": section, "index": position, "field": field_name,
+                "llm_quote": quote, "quote": transcript[span[0]:span[1]], "distance": distance
+            })
+            return span
+
+        for section in SECTIONS:
+            kept, kept_spans = [], []
+            for item in report.get(section, []):
+                exact, contextual = item.get("exact_quote"), item.get("contextual_quote")
+                exact_spans = located.get(self._key(exact), []) if exact else []
+                if not exact_spans:
+                    near_span = recover(section, len(kept), "exact_quote", exact)
+                    if near_span is None:
+                        logger.warning(f"Guardrail Trip: Hallucinated quote stripped: '{exact}'")
+                        result.stripped.append(exact or "")
+                        result.rejected.append({"section": section, "item": item})
+                        continue
+                    logger.warning(f"Guardrail near miss recovered: '{exact}' -> '{transcript[near_span[0]:near_span[1]]}'")
+                    exact_spans = [near_span]
+                    item = {**item, "exact_quote": transcript[near_span[0]:near_span[1]]}
+
+                contextual_spans = located.get(self._key(contextual or ""), [])
+                if not contextual_spans:
+                    near_span = recover(section, len(kept), "contextual_quote", contextual)
+                    if near_span is not None:
+                        contextual_spans = [near_span]
+                        item = {**item, "contextual_quote": transcript[near_span[0]:near_span[1]]}
+
+                exact_span, contextual_span = self._pair(exact_spans, contextual_spans)
+                if self.normalize:
+                    item = {**item, "exact_quote": transcript[exact_span[0]:exact_span[1]]}
+                    if contextual_span:
+                        item["contextual_quote"] = transcript[contextual_span[0]:contextual_span[1]]
+                if item["exact_quote"] != exact:
+                    result.rewritten[exact] = item["exact_quote"]
+                kept.append(item)
+                kept_spans.append({"exact_quote": exact_span, "contextual_quote": contextual_span})
+            result.report[section] = kept
+            result.spans[section] = kept_spans
+
+        if result.recovered:
+            metrics.incr("guardrail.recovered", len(result.recovered))
+        if result.stripped:
+            metrics.incr("guardrail.stripped", len(result.stripped))
+            logger.info(f"Guardrail stripped {len(result.stripped)} of {len(items)} item(s) (transcript length: {len(transcript)})")
+        return result
+
+    @staticmethod
+    def _pair(exact_spans: list[Span], contextual_spans: list[Span]) -> tuple[Span, Span | None]:
+        """Prefers an exact occurrence inside a contextual occurrence; otherwise the first of each."""
+        for c_start, c_end in contextual_spans:
+            for e_start, e_end in exact_spans:
+                if c_start <= e_start and e_end <= c_end:
+                    return (e_start, e_end), (c_start, c_end)
+        return exact_spans[0], contextual_spans[0] if contextual_spans else None
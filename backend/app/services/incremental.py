@@ -0,0 +1,171 @@
+"""
+State and merge rules for incremental re-extraction of a growing transcript
+(live dictation, or the browser fallback transcript being resent).
+
+The state is plain data: the raw prefix it covers (length + digest, to detect edits rather than
+appends), the scrubbed transcript so far, the token map shared by all scrubbed segments and the
+validated (scrubbed) clinical report. Losing it only costs a full re-extraction.
+
+Scrubbing is settled only up to INCREMENTAL_OVERLAP_CHARS before the covered end: the raw text after
+that point is scrubbed again together with the next append, so a name split across two appends is
+seen whole by Presidio.
+"""
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+
+from app.core.config import Config
+
+SECTIONS = ("chief_complaints", "assessments", "actionables")
+
+@dataclass
+class IncrementalExtraction:
+    raw_covered: int = 0
+    raw_digest: str = ""
+    scrubbed_transcript: str = ""
+    token_map: dict = field(default_factory=dict)
+    report: dict = field(default_factory=lambda: {s: [] for s in SECTIONS})
+    last_update: str = "full"  # how the latest call was served: "full", "incremental" or "unchanged"
+    settled_raw: int = 0  # raw prefix whose scrubbing is final ...
+    settled_scrubbed: int = 0  # ... and its length once scrubbed
+
+    def extends(self, raw_transcript: str) -> bool:
+        """True if `raw_transcript` is this state's covered text plus an append."""
+        return (
+            self.raw_covered > 0
+            and len(raw_transcript) >= self.raw_covered
+            and raw_digest(raw_transcript[:self.raw_covered]) == self.raw_digest
+        )
+
+def raw_digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def scrubbed_offset(raw_offset: int, spans: list[tuple[int, int, str]]) -> int:
+    """Offset in the scrubbed text of `raw_offset`; inside a replaced entity, the end of its token."""
+    shift = 0
+    for start, end, token in spans:
+        if start >= raw_offset:
+            break
+        if end > raw_offset:
+            return start + shift + len(token)
+        shift += len(token) - (end - start)
+    return raw_offset + shift
+
+def settle_point(raw_text: str, spans: list[tuple[int, int, str]], overlap_chars: int) -> tuple[int, int]:
+    """
+    (raw, scrubbed) offsets of the last word boundary at least `overlap_chars` before the end of
+    `raw_text` that is outside every replaced entity; (0, 0) if there is none.
+    """
+    cut = len(raw_text) - overlap_chars
+    while cut > 0:
+        if raw_text[cut - 1].isspace():
+            entity_start = next((start for start, end, _ in spans if start < cut < end), None)
+            if entity_start is None:
+                return cut, scrubbed_offset(cut, spans)
+            cut = entity_start + 1
+        cut -= 1
+    return 0, 0
+
+def summarize_findings(report: dict) -> str:
+    """Compact prior-findings context (no quotes) for the incremental prompt."""
+    lines = []
+    for section in ("chief_complaints", "assessments"):
+        for item in report.get(section, []):
+            lines.append(f"- {section}: {item['finding']} ({item['condition_status']}, {item['subject']})")
+    for item in report.get("actionables", []):
+        lines.append(f"- actionable: {item['action_type']}: {item['description']}")
+    return "\n".join(lines) or "(none)"
+
+def _identity(section: str, item: dict) -> tuple:
+    if section == "actionables":
+        return (item["action_type"], item["description"].strip().lower())
+    return (item["finding"].strip().lower(), item["subject"])
+
+def merge_incremental(prior: dict, new: dict) -> dict:
+    """
+    Prior items keep their order; items from the new segment follow. A new item with the same
+    clinical identity as a prior one supersedes it (e.g. a symptom later negated or re-attributed).
+    """
+    merged = {}
+    for section in SECTIONS:
+        new_items = new.get(section, [])
+        superseded = {_identity(section, item) for item in new_items}
+        kept = [item for item in prior.get(section, []) if _identity(section, item) not in superseded]
+        seen, merged[section] = set(), []
+        for item in kept + new_items:
+            key = _identity(section, item)
+            if key not in seen:
+                seen.add(key)
+                merged[section].append(item)
+    return merged
+
+class IncrementalSessionStore:
+    """
+    Per-process LRU of in-progress consultations, keyed by a client-chosen session id. Calls for one
+    session must hold `session_lock(session_id)` so concurrent appends do not race on its state.
+    """
+    def __init__(self, max_entries: int = Config.INCREMENTAL_SESSION_MAX_ENTRIES, ttl_seconds: float = Config.INCREMENTAL_SESSION_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, dict, IncrementalExtraction]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._session_locks: dict[str, asyncio.Lock] = {}
+        self._lock_users: dict[str, int] = {}
+
+    def session_lock(self, session_id: str) -> "_SessionLock":
+        return _SessionLock(self, session_id)
+
+    def get(self, session_id: str) -> Optional[tuple[dict, IncrementalExtraction]]:
+        """Returns (full_metadata, state) or None if unknown or expired."""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            touched_at, metadata, state = entry
+            if time.time() - touched_at > self.ttl_seconds:
+                del self._entries[session_id]
+                return None
+            self._entries.move_to_end(session_id)
+            return metadata, state
+
+    def put(self, session_id: str, metadata: dict, state: IncrementalExtraction):
+        with self._lock:
+            self._entries[session_id] = (time.time(), metadata, state)
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, session_id: str):
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+class _SessionLock:
+    """Async context manager serializing calls for one session; the lock is dropped with its last user."""
+    def __init__(self, store: IncrementalSessionStore, session_id: str):
+        self.store = store
+        self.session_id = session_id
+
+    async def __aenter__(self):
+        store = self.store
+        lock = store._session_locks.setdefault(self.session_id, asyncio.Lock())
+        store._lock_users[self.session_id] = store._lock_users.get(self.session_id, 0) + 1
+        try:
+            await lock.acquire()
+        except BaseException:
+            self._leave()
+            raise
+
+    async def __aexit__(self, *exc):
+        self.store._session_locks[self.session_id].release()
+        self._leave()
+
+    def _leave(self):
+        store = self.store
+        store._lock_users[self.session_id] -= 1
+        if not store._lock_users[self.session_id]:
+            del store._lock_users[self.session_id]
+            del store._session_locks[self.session_id]
@@ -1,52 +1,80 @@
 import asyncio
+import functools
 import os
+import threading
 import shutil
 import logging
-from typing import Tuple
+from typing import Any, AsyncIterator, Tuple
 from sqlalchemy.orm import Session
 
 from app.services.pipeline import ZeroHallucinationPipeline
+from app.services.incremental import IncrementalExtraction, IncrementalSessionStore
+from app.services.summary_jobs import SummaryJobStore
+from app.services.checkpoints import DraftCheckpoint, DraftCheckpointStore
 from app.services.db_service import DBService
+from app.services.scrubber import scrubber
+from app.core.metrics import StageTimer, metrics
 from app.transcriber.transcribe import transcribe_file_with_diarization
 from app.report_generator.generate_report import generate_report_from_dict
 
 logger = logging.getLogger(__name__)
 
 class OrchestratorService:
-    def __init__(self, pipeline: ZeroHallucinationPipeline):
+    def __init__(self, pipeline: ZeroHallucinationPipeline, checkpoints: DraftCheckpointStore | None = None):
         self.pipeline = pipeline
+        self.incremental_sessions = IncrementalSessionStore()
+        self.summary_jobs = SummaryJobStore()
+        self.checkpoints = checkpoints
 
-    async def generate_draft(
-        self,
-        audio_file_path: str,
-        db: Session,
-        patient_id: str,
-        doctor_id: str,
-        encounter_date: str,
-        language: str = "en",
-        fallback_transcript: str = None
-    ) -> Tuple[dict, dict, dict, dict]:
-        """
-        Step 1: Audio -> Transcript -> LLM Pipeline -> Draft JSON.
-        Returns the raw clinical dictionary, patient dictionary, token map, and metadata.
-        """
-        logger.info(f"Generating draft for patient {patient_id} in language {language}")
-        
+    def draft_checkpoint(self, draft_key: str) -> DraftCheckpoint | None:
+        """The checkpoints of the draft identified by `draft_key` (None when checkpointing is off)."""
+        return self.checkpoints.draft(draft_key) if self.checkpoints is not None else None
+
+    @staticmethod
+    def load_encounter_context(db: Session, patient_id: str, doctor_id: str, encounter_date: str) -> dict:
+        """Fetches DB context (patient, doctor, EHR pointers, referral targets) into the full metadata dict."""
         patient_meta, context_docs = DBService.get_patient_context(db, patient_id)
         if not patient_meta:
             raise ValueError(f"Patient {patient_id} context could not be retrieved.")
-            
+
         doctor_meta = DBService.get_doctor_context(db, doctor_id)
         available_doctors = DBService.get_available_doctors(db)
-        
+        available_doctor_categories = [{"doctor_id": d["doctor_id"], "specialty": d["specialty"]} for d in available_doctors]
+
+        return {
+            "patient_id": patient_id,
+            "patient_name": patient_meta["name"],
+            "patient_taj": patient_meta["taj"],
+            "doctor_id": doctor_id,
+            "doctor_name": doctor_meta["name"],
+            "doctor_seal": doctor_meta["seal_number"],
+            "encounter_date": encounter_date,
+            "context_documents": context_docs,
+            "available_doctor_categories": available_doctor_categories
+        }
+
+    @staticmethod
+    async def transcribe_audio(audio_file_path: str, fallback_transcript: str = None) -> str:
+        """
+        Azure diarized transcription in the default executor, falling back to the browser transcript.
+        Cancelling the caller stops the Azure session.
+        """
+        stop_event = threading.Event()
         try:
             loop = asyncio.get_running_loop()
-            transcript_lines = await loop.run_in_executor(None, transcribe_file_with_diarization, audio_file_path)
+            transcript_lines = await loop.run_in_executor(
+                None, functools.partial(transcribe_file_with_diarization, audio_file_path, stop_event=stop_event)
+            )
             raw_transcript = " ".join(transcript_lines).strip()
+        except asyncio.CancelledError:
+            # The executor thread cannot be cancelled; tell the Azure session to stop instead
+            stop_event.set()
+            metrics.incr("transcription.cancelled")
+            raise
         except Exception as e:
             logger.warning(f"Azure transcription failed: {e}. Falling back to browser transcript.")
             raw_transcript = ""
-        
+
         if not raw_transcript:
             if fallback_transcript:
                 logger.info("Using fallback browser transcript.")
@@ -57,29 +85,193 @@ class OrchestratorService:
                     "Check that SPEECH_KEY and SERVICE_REGION are set correctly in .env, "
                     "or ensure your browser has microphone permissions to provide a fallback transcript."
                 )
-        
-        available_doctor_categories = [{"doctor_id": d["doctor_id"], "specialty": d["specialty"]} for d in available_doctors]
-        
-        full_metadata = {
-            "patient_id": patient_id,
-            "patient_name": patient_meta["name"],
-            "patient_taj": patient_meta["taj"],
-            "doctor_id": doctor_id,
-            "doctor_name": doctor_meta["name"],
-            "doctor_seal": doctor_meta["seal_number"],
-            "encounter_date": encounter_date,
-            "context_documents": context_docs,
-            "available_doctor_categories": available_doctor_categories
-        }
-        
-        hydrated_clinical, hydrated_patient, token_map = self.pipeline.run_consultation(
+        return raw_transcript
+
+    async def generate_draft(
+        self,
+        audio_file_path: str,
+        db: Session,
+        patient_id: str,
+        doctor_id: str,
+        encounter_date: str,
+        language: str = "en",
+        fallback_transcript: str = None,
+        timer: StageTimer | None = None,
+        pipeline_mode: str | None = None,
+        checkpoint: DraftCheckpoint | None = None
+    ) -> Tuple[dict, dict, dict, dict]:
+        """
+        Step 1: Audio -> Transcript -> LLM Pipeline -> Draft JSON.
+        Returns the raw clinical dictionary, patient dictionary, token map, and metadata.
+
+        DB context loading, Azure transcription and Presidio warm-up are independent and run
+        concurrently; the pipeline starts as soon as all three have landed (transcription
+        dominates). Per-stage durations are recorded on `timer`. With a `checkpoint`, every
+        completed stage is saved so a retry of a failed draft resumes from the last one; the
+        checkpoints are dropped once the draft succeeds.
+        """
+        logger.info(f"Generating draft for patient {patient_id} in language {language}")
+        timer = timer or StageTimer()
+        full_metadata, raw_transcript = await self._gather_inputs(audio_file_path, db, patient_id, doctor_id, encounter_date, fallback_transcript, timer, checkpoint)
+
+        hydrated_clinical, hydrated_patient, token_map = await self.pipeline.run_consultation(
             raw_transcript=raw_transcript,
             metadata_context=full_metadata,
-            language=language
+            language=language,
+            timer=timer,
+            mode=pipeline_mode,
+            checkpoint=checkpoint
         )
-        
+        if checkpoint is not None:
+            checkpoint.clear()
+
         return hydrated_clinical, hydrated_patient, token_map, full_metadata
 
+    async def generate_progressive_draft(
+        self,
+        audio_file_path: str,
+        db: Session,
+        patient_id: str,
+        doctor_id: str,
+        encounter_date: str,
+        language: str = "en",
+        fallback_transcript: str = None,
+        timer: StageTimer | None = None
+    ) -> Tuple[dict, dict, dict, str]:
+        """
+        generate_draft that returns right after extraction and the guardrail: (clinical dict, token map,
+        metadata, draft_id). The patient summary runs in the background; fetch it from `summary_jobs`.
+        """
+        logger.info(f"Generating progressive draft for patient {patient_id} in language {language}")
+        timer = timer or StageTimer()
+        full_metadata, raw_transcript = await self._gather_inputs(audio_file_path, db, patient_id, doctor_id, encounter_date, fallback_transcript, timer)
+
+        hydrated_clinical, token_map, summarize = await self.pipeline.run_clinical_draft(
+            raw_transcript=raw_transcript,
+            metadata_context=full_metadata,
+            language=language,
+            timer=timer
+        )
+        draft_id = self.summary_jobs.submit(summarize())
+        return hydrated_clinical, token_map, full_metadata, draft_id
+
+    async def _gather_inputs(
+        self, audio_file_path: str, db: Session, patient_id: str, doctor_id: str, encounter_date: str,
+        fallback_transcript: str | None, timer: StageTimer, checkpoint: DraftCheckpoint | None = None
+    ) -> Tuple[dict, str]:
+        """
+        DB context loading, Azure transcription and Presidio warm-up are independent and run
+        concurrently; returns (full_metadata, raw_transcript) once all three have landed.
+        A transcript checkpointed by an earlier attempt replaces the transcription.
+        """
+        # The Session is only touched from this one worker thread while the task runs.
+        context_task = asyncio.create_task(timer.measure(
+            "db_context", asyncio.to_thread(self.load_encounter_context, db, patient_id, doctor_id, encounter_date)
+        ))
+        warmup_task = asyncio.create_task(timer.measure("scrubber_warmup", asyncio.to_thread(scrubber.warm_up)))
+        transcription_task = asyncio.create_task(timer.measure(
+            "transcription", self._checkpointed_transcription(audio_file_path, fallback_transcript, checkpoint)
+        ))
+        try:
+            full_metadata, _, raw_transcript = await asyncio.gather(context_task, warmup_task, transcription_task)
+        except BaseException:
+            # Threads cannot be cancelled: wait for the DB load and warm-up so the request-scoped
+            # Session is not closed under a running query, and stop the transcription.
+            transcription_task.cancel()
+            await asyncio.gather(context_task, warmup_task, transcription_task, return_exceptions=True)
+            raise
+        return full_metadata, raw_transcript
+
+    async def _checkpointed_transcription(self, audio_file_path: str, fallback_transcript: str | None, checkpoint: DraftCheckpoint | None) -> str:
+        raw_transcript = checkpoint.load("transcript") if checkpoint is not None else None
+        if raw_transcript is None:
+            raw_transcript = await self.transcribe_audio(audio_file_path, fallback_transcript)
+            if checkpoint is not None:
+                checkpoint.save("transcript", raw_transcript)
+        return raw_transcript
+
+    async def generate_incremental_draft(
+        self,
+        session_id: str,
+        db: Session,
+        patient_id: str,
+        doctor_id: str,
+        encounter_date: str,
+        transcript: str,
+        language: str = "en",
+        final: bool = False,
+        timer: StageTimer | None = None
+    ) -> Tuple[dict, dict | None, IncrementalExtraction, dict]:
+        """
+        Draft for a transcript that keeps growing during the consultation. Each call re-extracts
+        only what was appended since the previous call of the same session; `final=True` also
+        writes the patient summary and closes the session. Calls for one session run one at a time.
+        Returns the hydrated clinical dict, hydrated patient dict (final only), state and metadata.
+        """
+        timer = timer or StageTimer()
+        async with self.incremental_sessions.session_lock(session_id):
+            return await self._incremental_draft(session_id, db, patient_id, doctor_id, encounter_date, transcript, language, final, timer)
+
+    async def _incremental_draft(
+        self, session_id: str, db: Session, patient_id: str, doctor_id: str, encounter_date: str,
+        transcript: str, language: str, final: bool, timer: StageTimer
+    ) -> Tuple[dict, dict | None, IncrementalExtraction, dict]:
+        session = self.incremental_sessions.get(session_id)
+        if session is not None and session[0].get("patient_id") != patient_id:
+            session = None
+        if session is None:
+            with timer.stage("db_context"):
+                full_metadata = await asyncio.to_thread(self.load_encounter_context, db, patient_id, doctor_id, encounter_date)
+            state = None
+        else:
+            full_metadata, state = session
+        system_context = self.pipeline.build_system_context(full_metadata)
+
+        with timer.stage("clinical_extraction"):
+            state = await self.pipeline.extract_incremental(transcript, system_context, state)
+
+        hydrated_patient = None
+        if final:
+            with timer.stage("patient_summary"):
+                patient_summary_dict = await self.pipeline.generate_patient_summary(
+                    validated_clinical_dict=state.report,
+                    scrubbed_transcript=state.scrubbed_transcript,
+                    system_context=system_context,
+                    language=language
+                )
+            hydrated_patient = scrubber.hydrate_dict(patient_summary_dict, state.token_map)
+            self.incremental_sessions.pop(session_id)
+        else:
+            self.incremental_sessions.put(session_id, full_metadata, state)
+
+        return scrubber.hydrate_dict(state.report, state.token_map), hydrated_patient, state, full_metadata
+
+    async def stream_draft(
+        self,
+        audio_file_path: str,
+        full_metadata: dict,
+        language: str = "en",
+        fallback_transcript: str = None
+    ) -> AsyncIterator[tuple[str, Any]]:
+        """
+        Streaming counterpart of generate_draft. DB context is loaded by the caller (request-scoped
+        session); this yields ("metadata", ...) first, then the pipeline's streaming events.
+        """
+        logger.info(f"Streaming draft for patient {full_metadata['patient_id']} in language {language}")
+        yield "metadata", full_metadata
+
+        warmup_task = asyncio.create_task(asyncio.to_thread(scrubber.warm_up))
+        try:
+            raw_transcript = await self.transcribe_audio(audio_file_path, fallback_transcript)
+        finally:
+            await asyncio.gather(warmup_task, return_exceptions=True)
+        async for event in self.pipeline.stream_consultation(
+            raw_transcript=raw_transcript,
+            metadata_context=full_metadata,
+            language=language
+        ):
+            yield event
+
     @staticmethod
     def _build_soap_dynamic_data(clinical: dict, source_label: str = "audio consultation") -> dict:
         """Convert the structured clinical dict into a SOAP-compatible flat dict for the PDF template."""
@@ -170,7 +362,7 @@ class OrchestratorService:
         }
         
         # 3. Run Pipeline
-        hydrated_clinical, hydrated_patient, _ = self.pipeline.run_consultation(
+        hydrated_clinical, hydrated_patient, _ = await self.pipeline.run_consultation(
             raw_transcript=raw_transcript,
             metadata_context=full_metadata,
             language="en"
@@ -1,108 +1,763 @@
+import asyncio
+import dataclasses
 import logging
 import json
-from app.core.llm_client import LLMClient
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable
+from app.core.llm_client import AsyncLLMClient
 from app.core.config import Config
-from app.models.llm_schemas import ClinicalExtractionThoughtProcess, PatientSummary
+from app.core.metrics import StageTimer, metrics
+from app.core.model_router import ModelRouter, RouteDecision
+from app.core.rate_limiter import RateLimitExceededError
+from app.core.resilience import CircuitOpenError, is_retryable
+from app.core.tokens import AdaptiveTokenBudget, UsageRecord, count_tokens, count_message_tokens, record_usage
+from openai import LengthFinishReasonError
+from pydantic import ValidationError
+from app.models.llm_schemas import (
+    LEAN_SECTIONS, ActionableItem, ClinicalExtractionThoughtProcess, ClinicalReport, DiagnosticResult,
+    FusedConsultation, LeanClinicalExtraction, PatientSummary, QuoteRepair
+)
 from app.services.scrubber import scrubber
-from app.core.prompts import CLINICAL_EXTRACTION_SYSTEM_PROMPT, PATIENT_SUMMARY_SYSTEM_PROMPT
+from app.services.result_cache import LLMResultCache
+from app.services.checkpoints import DraftCheckpoint
+from app.services.streaming import JsonArrayItemStreamer, JsonStringFieldStreamer, StreamingHydrator
+from app.services.guardrail import SECTIONS, GuardrailResult, QuoteGuardrail, contextual_window, repair_excerpt
+from app.services.chunking import TranscriptWindow, last_turn_start, split_into_windows
+from app.services.incremental import IncrementalExtraction, merge_incremental, raw_digest, scrubbed_offset, settle_point, summarize_findings
+from app.core.prompts import (
+    CLINICAL_EXTRACTION_SYSTEM_PROMPT, CLINICAL_EXTRACTION_CONTEXT_PROMPT, LEAN_CLINICAL_EXTRACTION_SYSTEM_PROMPT,
+    PATIENT_SUMMARY_SYSTEM_PROMPT, PATIENT_SUMMARY_CONTEXT_PROMPT,
+    FUSED_CONSULTATION_SYSTEM_PROMPT, FUSED_CONSULTATION_CONTEXT_PROMPT,
+    INCREMENTAL_EXTRACTION_SYSTEM_PROMPT, INCREMENTAL_EXTRACTION_CONTEXT_PROMPT,
+    QUOTE_REPAIR_SYSTEM_PROMPT, QUOTE_REPAIR_CONTEXT_PROMPT,
+    build_clinical_extraction_messages, build_patient_summary_messages, build_fused_consultation_messages,
+    build_incremental_extraction_messages, build_quote_repair_messages
+)
 
 logger = logging.getLogger(__name__)
 
+PIPELINE_MODES = ("two_call", "fused")
+EXTRACTION_SCHEMAS = ("full", "lean")
+
 class ZeroHallucinationPipeline:
-    def __init__(self, llm: LLMClient):
+    def __init__(self, llm: AsyncLLMClient, cache: LLMResultCache | None = None, extraction_schema: str | None = None,
+                 router: ModelRouter | None = None):
         self.llm = llm
+        self.cache = cache
+        self.router = router or ModelRouter(default_model=getattr(llm, "model", None))
+        self.extraction_schema = extraction_schema or Config.EXTRACTION_SCHEMA
+        if self.extraction_schema not in EXTRACTION_SCHEMAS:
+            raise ValueError(f"Unknown extraction schema {self.extraction_schema!r}; expected one of {EXTRACTION_SCHEMAS}")
+        self.guardrail = QuoteGuardrail()
+        self.budgets = {
+            "clinical_extraction": AdaptiveTokenBudget("clinical_extraction", cap=Config.MAX_TOKENS_CLINICAL_EXTRACTION),
+            "clinical_extraction_lean": AdaptiveTokenBudget("clinical_extraction_lean", cap=Config.MAX_TOKENS_CLINICAL_EXTRACTION),
+            "patient_summary": AdaptiveTokenBudget("patient_summary", cap=Config.MAX_TOKENS_PATIENT_SUMMARY),
+            "fused_consultation": AdaptiveTokenBudget("fused_consultation", cap=Config.MAX_TOKENS_FUSED_CONSULTATION),
+            "incremental_extraction": AdaptiveTokenBudget("incremental_extraction", cap=Config.MAX_TOKENS_CLINICAL_EXTRACTION),
+            "quote_repair": AdaptiveTokenBudget("quote_repair", cap=Config.MAX_TOKENS_QUOTE_REPAIR),
+        }
 
-    def generate_clinical_report(self, scrubbed_transcript: str, system_context: str) -> ClinicalExtractionThoughtProcess:
-        system_prompt = CLINICAL_EXTRACTION_SYSTEM_PROMPT.format(system_context=system_context)
+    async def _parse(self, stage: str, messages: list[dict], response_format, basis_text: str):
+        """
+        Token-accounted LLM call on the stage's routed deployment. `max_tokens` comes from the stage's
+        adaptive budget sized on `basis_text` (the variable input); a completion truncated by a learned
+        budget is retried once at the static cap. Returns the result and the decision that served it.
+        """
+        budget = self.budgets[stage]
+        basis_tokens = count_tokens(basis_text)
+        estimated_prompt_tokens = count_message_tokens(messages)
+        max_tokens = budget.max_tokens_for(basis_tokens)
 
-        return self.llm.parse_completion(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Transcript: {scrubbed_transcript}"}
-            ],
-            response_format=ClinicalExtractionThoughtProcess,
-            max_tokens=Config.MAX_TOKENS_CLINICAL_EXTRACTION
+        decision = self.router.choose(stage)
+        usage = UsageRecord()
+        started = time.perf_counter()
+        try:
+            result, decision = await self._routed_parse(decision, messages, response_format, max_tokens, usage)
+        except asyncio.CancelledError:
+            # Request abandoned (disconnect / deadline): the provider call was aborted mid-flight
+            metrics.incr(f"llm.{stage}.cancelled")
+            raise
+        except LengthFinishReasonError:
+            record_usage(stage, estimated_prompt_tokens, max_tokens, usage)
+            if max_tokens >= budget.cap:
+                raise
+            logger.warning(f"{stage}: completion truncated at adaptive max_tokens={max_tokens}; retrying at cap {budget.cap}")
+            metrics.incr(f"llm.{stage}.budget_retries")
+            max_tokens = budget.cap
+            usage = UsageRecord()
+            started = time.perf_counter()
+            result, decision = await self._routed_parse(decision, messages, response_format, max_tokens, usage)
+
+        elapsed = time.perf_counter() - started
+        self.router.observe(decision, elapsed)
+        metrics.observe(f"llm.{stage}.latency_seconds", elapsed)
+        record_usage(stage, estimated_prompt_tokens, max_tokens, usage)
+        budget.observe(basis_tokens, usage)
+        return result, decision
+
+    @staticmethod
+    def _model_kwargs(decision: RouteDecision) -> dict:
+        # Unrouted stages leave the deployment to the client (and keep duck-typed clients working).
+        return {} if decision.reason == "default" else {"model": decision.model}
+
+    async def _routed_parse(self, decision: RouteDecision, messages: list[dict], response_format, max_tokens: int, usage: UsageRecord):
+        """parse_completion on `decision`'s deployment; a primary that is down or throttled is retried once on the fallback."""
+        try:
+            return await self.llm.parse_completion(
+                messages=messages, response_format=response_format, max_tokens=max_tokens, usage=usage, **self._model_kwargs(decision)
+            ), decision
+        except Exception as e:
+            if not (is_retryable(e) or isinstance(e, (CircuitOpenError, RateLimitExceededError))):
+                raise
+            fallback = self.router.fail_over(decision)
+            if fallback is None:
+                raise
+            return await self.llm.parse_completion(
+                messages=messages, response_format=response_format, max_tokens=max_tokens, usage=usage, model=fallback.model
+            ), fallback
+
+    def _cache_key(self, stage: str, prompt: str, scrubbed_transcript: str, system_context: str, language: str = "", extra: str = "") -> str | None:
+        """Key of `stage` (the routed stage name) as answered by its primary deployment."""
+        if self.cache is None:
+            return None
+        return self.cache.make_key(
+            stage=stage,
+            model=self.router.route(stage).primary,
+            prompt=prompt,
+            scrubbed_transcript=scrubbed_transcript,
+            system_context=system_context,
+            language=language,
+            extra=extra
         )
 
-    def validate_quotes(self, report: ClinicalExtractionThoughtProcess, scrubbed_transcript: str) -> dict:
+    async def _cache_lookup(self, stage: str, cache_key: str | None, bypass_cache: bool) -> str | None:
+        if not cache_key:
+            return None
+        if bypass_cache:
+            self.cache.record_bypass(stage)
+            return None
+        return await self.cache.get(cache_key, stage)
+
+    async def _cache_store(self, cache_key: str | None, stage: str, value: str, decision: RouteDecision):
+        """Caches a result under its primary-model key; fallback-served results are not cached."""
+        if not cache_key:
+            return
+        if decision.is_fallback:
+            metrics.incr(f"llm_cache.{stage}.skipped_fallback")
+            return
+        await self.cache.put(cache_key, stage, value)
+
+    @staticmethod
+    def build_system_context(metadata_context: dict) -> str:
+        """Stringify the opaque-pointer context (EHR docs + available doctor categories) sent to every LLM call."""
+        # Doctor categories are shared by every patient, so they lead (longer common prefix).
+        return json.dumps({
+            "available_doctor_categories": metadata_context.get("available_doctor_categories", []),
+            "context_documents": metadata_context.get("context_documents", [])
+        })
+
+    def _clinical_extraction_request(self, scrubbed_transcript: str, system_context: str) -> tuple[str, list[dict], type, str | None]:
+        """(budget stage, messages, response format, cache key) of LLM Call 1 for the configured schema."""
+        lean = self.extraction_schema == "lean"
+        system_prompt = LEAN_CLINICAL_EXTRACTION_SYSTEM_PROMPT if lean else CLINICAL_EXTRACTION_SYSTEM_PROMPT
+        return (
+            "clinical_extraction_lean" if lean else "clinical_extraction",
+            build_clinical_extraction_messages(system_context, scrubbed_transcript, system_prompt),
+            LeanClinicalExtraction if lean else ClinicalExtractionThoughtProcess,
+            self._cache_key("clinical_extraction_lean" if lean else "clinical_extraction", system_prompt + CLINICAL_EXTRACTION_CONTEXT_PROMPT, scrubbed_transcript, system_context)
+        )
+
+    async def generate_clinical_report(self, scrubbed_transcript: str, system_context: str, bypass_cache: bool = False) -> ClinicalExtractionThoughtProcess:
+        """
+        LLM Call 1. With the lean extraction schema the model writes LeanClinicalExtraction, which is
+        expanded into the full schema here (contextual quotes cut from the transcript), so callers and
+        the cache always see ClinicalExtractionThoughtProcess.
+        """
+        stage, messages, response_format, cache_key = self._clinical_extraction_request(scrubbed_transcript, system_context)
+        cached = await self._cache_lookup("clinical_extraction", cache_key, bypass_cache)
+        if cached is not None:
+            return ClinicalExtractionThoughtProcess.model_validate_json(cached)
+
+        parsed, decision = await self._parse(stage, messages=messages, response_format=response_format, basis_text=scrubbed_transcript)
+        report = parsed.expand(lambda quote: contextual_window(scrubbed_transcript, quote)) if response_format is LeanClinicalExtraction else parsed
+        await self._cache_store(cache_key, "clinical_extraction", report.model_dump_json(), decision)
+        return report
+
+    async def stream_clinical_items(self, scrubbed_transcript: str, system_context: str, bypass_cache: bool = False) -> AsyncIterator[tuple[str, Any]]:
+        """
+        Progressive LLM Call 1 + guardrail. Yields ("item", {"section", "item"}) for every extracted
+        element whose quotes pass the guardrail as soon as the model has closed it, then exactly one
+        ("report", {"result": GuardrailResult, "truncated": bool}) for the whole report, quote repair
+        included. Streams at the stage's static cap; a completion cut off there still ends with a report
+        built from the elements already finished (not cached).
+        """
+        stage, messages, response_format, cache_key = self._clinical_extraction_request(scrubbed_transcript, system_context)
+        lean = response_format is LeanClinicalExtraction
+        cached = await self._cache_lookup("clinical_extraction", cache_key, bypass_cache)
+        truncated = False
+        if cached is not None:
+            report = ClinicalExtractionThoughtProcess.model_validate_json(cached)
+            for section in SECTIONS:
+                for item in getattr(report.final_validated_clinical_report, section):
+                    for payload in self._checked_item(section, item.model_dump(), scrubbed_transcript):
+                        yield "item", payload
+        else:
+            budget = self.budgets[stage]
+            basis_tokens = count_tokens(scrubbed_transcript)
+            max_tokens = budget.cap
+            decision = self.router.choose(stage)
+            usage = UsageRecord()
+            started = time.perf_counter()
+            streamer = JsonArrayItemStreamer(LEAN_SECTIONS if lean else SECTIONS)
+            finished = {section: [] for section in SECTIONS}
+            try:
+                async for kind, payload in self.llm.stream_completion(
+                    messages=messages,
+                    response_format=response_format,
+                    max_tokens=max_tokens,
+                    usage=usage,
+                    **self._model_kwargs(decision)
+                ):
+                    if kind == "delta":
+                        for field, raw in streamer.feed(payload):
+                            streamed = self._streamed_item(field, raw, lean, scrubbed_transcript)
+                            if streamed is None:
+                                continue
+                            section, item = streamed
+                            finished[section].append(item)
+                            for checked_item in self._checked_item(section, item, scrubbed_transcript):
+                                yield "item", checked_item
+                    else:
+                        report = payload.expand(lambda quote: contextual_window(scrubbed_transcript, quote)) if lean else payload
+            except LengthFinishReasonError:
+                record_usage(stage, count_message_tokens(messages), max_tokens, usage)
+                metrics.incr(f"llm.{stage}.truncated_partial")
+                logger.warning(f"{stage}: streamed completion truncated at {max_tokens} tokens; keeping {sum(map(len, finished.values()))} finished items")
+                truncated = True
+                report = ClinicalExtractionThoughtProcess(
+                    negation_check="", attribution_check="",
+                    final_validated_clinical_report=ClinicalReport(**finished)
+                )
+            else:
+                self.router.observe(decision, time.perf_counter() - started)
+                record_usage(stage, count_message_tokens(messages), max_tokens, usage)
+                budget.observe(basis_tokens, usage)
+                await self._cache_store(cache_key, "clinical_extraction", report.model_dump_json(), decision)
+
+        checked = await self.check_and_repair_quotes(report, scrubbed_transcript, bypass_cache=bypass_cache)
+        yield "report", {"result": checked, "truncated": truncated}
+
+    @staticmethod
+    def _streamed_item(field: str, raw: dict, lean: bool, scrubbed_transcript: str) -> tuple[str, dict] | None:
+        """Schema-validated full-schema item for a streamed array element (None if the element is malformed)."""
+        try:
+            if lean:
+                section = LEAN_SECTIONS[field]
+                partial = LeanClinicalExtraction(**{**{key: [] for key in LEAN_SECTIONS}, field: [raw]})
+                expanded = partial.expand(lambda quote: contextual_window(scrubbed_transcript, quote))
+                return section, getattr(expanded.final_validated_clinical_report, section)[0].model_dump()
+            model = ActionableItem if field == "actionables" else DiagnosticResult
+            return field, model.model_validate(raw).model_dump()
+        except ValidationError as e:
+            logger.warning(f"Dropping malformed streamed {field} item: {e}")
+            return None
+
+    def _checked_item(self, section: str, item: dict, scrubbed_transcript: str) -> list[dict]:
+        """Guardrail for a single item: [] if stripped, else one {"section", "item"} event payload."""
+        checked = self.guardrail.check({**{s: [] for s in SECTIONS}, section: [item]}, scrubbed_transcript)
+        return [{"section": section, "item": validated} for validated in checked.report[section]]
+
+    def check_quotes(self, report: ClinicalExtractionThoughtProcess, scrubbed_transcript: str) -> GuardrailResult:
         """
-        Deterministic Guardrail: Verify all extracted quotes exist verbatim in the scrubbed transcript.
-        If a quote does not exist, it's a hallucination; the item is stripped.
+        Deterministic Guardrail: Verify all extracted quotes exist in the scrubbed transcript (one
+        multi-pattern pass). If a quote does not exist, it's a hallucination; the item is stripped.
+        The result also carries the character span of every surviving quote.
         """
-        valid_report = report.final_validated_clinical_report.model_dump()
-        
         logger.info(f"Validating quotes against scrubbed transcript (length: {len(scrubbed_transcript)})")
-        # For debugging in tests, we'll log the first 100 chars
-        logger.debug(f"Scrubbed excerpt: {scrubbed_transcript[:100]}...")
-
-        def is_valid(item: dict) -> bool:
-            quote = item.get("exact_quote")
-            if not quote:
-                return False
-            
-            # Strict verbatim check
-            exists = scrubbed_transcript.find(quote) != -1
-            if not exists:
-                logger.warning(f"Guardrail Trip: Hallucinated quote stripped: '{quote}'")
-                logger.info(f"Full scrubbed transcript for comparison: {repr(scrubbed_transcript)}")
-            return exists
-
-        # Validate each category
-        valid_report["chief_complaints"] = [c for c in valid_report["chief_complaints"] if is_valid(c)]
-        valid_report["assessments"] = [a for a in valid_report["assessments"] if is_valid(a)]
-        valid_report["actionables"] = [act for act in valid_report["actionables"] if is_valid(act)]
-
-        return valid_report
-
-    def generate_patient_summary(self, validated_clinical_dict: dict, scrubbed_transcript: str, system_context: str, language: str = "en") -> dict:
-        system_prompt = PATIENT_SUMMARY_SYSTEM_PROMPT.format(system_context=system_context, language=language)
-
-        parsed = self.llm.parse_completion(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Clinical Report:\n{json.dumps(validated_clinical_dict)}\n\nTranscript:\n{scrubbed_transcript}"}
-            ],
+        return self.guardrail.check(report.final_validated_clinical_report.model_dump(), scrubbed_transcript)
+
+    def validate_quotes(self, report: ClinicalExtractionThoughtProcess, scrubbed_transcript: str) -> dict:
+        """Guardrail returning only the validated ClinicalReport dict."""
+        return self.check_quotes(report, scrubbed_transcript).report
+
+    async def repair_quotes(self, checked: GuardrailResult, scrubbed_transcript: str, bypass_cache: bool = False) -> GuardrailResult:
+        """
+        Targeted repair of guardrail-stripped items: one small structured call with only the rejected
+        items and the transcript neighbourhoods they most likely came from, asking for verbatim quotes.
+        Repaired items are re-validated against the full transcript and appended to their section;
+        anything still unsupported stays stripped. Replaces a full extraction retry.
+        """
+        if not Config.GUARDRAIL_REPAIR_ENABLED or not checked.rejected:
+            return checked
+        rejected = checked.rejected[:Config.GUARDRAIL_REPAIR_MAX_ITEMS]
+        metrics.incr("guardrail.repair.attempted", len(rejected))
+        excerpt, anchored = repair_excerpt(scrubbed_transcript, [r["item"] for r in rejected], Config.GUARDRAIL_REPAIR_CONTEXT_CHARS)
+        if not anchored:
+            metrics.incr("guardrail.repair.failed", len(rejected))
+            metrics.observe("guardrail.repair.rate", 0.0)
+            return checked
+
+        rejected_items = json.dumps([
+            {"item_index": i, "section": rejected[i]["section"],
+             **{k: v for k, v in rejected[i]["item"].items() if k != "system_reference_id"}}
+            for i in anchored
+        ])
+        cache_key = self._cache_key("quote_repair", QUOTE_REPAIR_SYSTEM_PROMPT + QUOTE_REPAIR_CONTEXT_PROMPT, excerpt, "", extra=rejected_items)
+        cached = await self._cache_lookup("quote_repair", cache_key, bypass_cache)
+        try:
+            if cached is not None:
+                repair = QuoteRepair.model_validate_json(cached)
+            else:
+                repair, decision = await self._parse(
+                    "quote_repair",
+                    messages=build_quote_repair_messages(rejected_items, excerpt),
+                    response_format=QuoteRepair,
+                    basis_text=rejected_items + excerpt
+                )
+                await self._cache_store(cache_key, "quote_repair", repair.model_dump_json(), decision)
+        except Exception as e:
+            logger.warning(f"Quote repair call failed; {len(rejected)} item(s) stay stripped: {e}")
+            metrics.incr("guardrail.repair.failed", len(rejected))
+            metrics.observe("guardrail.repair.rate", 0.0)
+            return checked
+
+        # Only the quotes change; the clinical content of a rejected item is never taken from the repair call.
+        candidates: dict[str, list[dict]] = {section: [] for section in SECTIONS}
+        sources: dict[int, dict] = {}
+        for entry in repair.repairs:
+            if entry.supported and entry.item_index in anchored and entry.item_index not in sources:
+                original = rejected[entry.item_index]
+                item = {**original["item"], "exact_quote": entry.exact_quote, "contextual_quote": entry.contextual_quote}
+                candidates[original["section"]].append(item)
+                sources[id(item)] = original
+        rechecked = self.guardrail.check(candidates, scrubbed_transcript)
+        still_rejected = {id(r["item"]) for r in rechecked.rejected}
+
+        report = {section: list(checked.report[section]) for section in SECTIONS}
+        spans = {section: list(checked.spans[section]) for section in SECTIONS}
+        repaired, restored = [], set()
+        for section in SECTIONS:
+            survivors = [item for item in candidates[section] if id(item) not in still_rejected]
+            for item, validated, item_spans in zip(survivors, rechecked.report[section], rechecked.spans[section]):
+                original = sources[id(item)]
+                restored.add(id(original["item"]))
+                repaired.append({
+                    "section": section, "index": len(report[section]),
+                    "llm_quote": original["item"].get("exact_quote"), "quote": validated["exact_quote"]
+                })
+                report[section].append(validated)
+                spans[section].append(item_spans)
+
+        remaining = [r for r in checked.rejected if id(r["item"]) not in restored]
+        metrics.incr("guardrail.repair.repaired", len(repaired))
+        metrics.incr("guardrail.repair.failed", len(rejected) - len(repaired))
+        metrics.observe("guardrail.repair.rate", len(repaired) / len(rejected))
+        logger.info(f"Quote repair restored {len(repaired)} of {len(rejected)} stripped item(s)")
+        return dataclasses.replace(
+            checked,
+            report={**checked.report, **report},
+            spans=spans,
+            stripped=[r["item"].get("exact_quote") or "" for r in remaining],
+            rejected=remaining,
+            repaired=checked.repaired + repaired
+        )
+
+    async def check_and_repair_quotes(self, report: ClinicalExtractionThoughtProcess, scrubbed_transcript: str, bypass_cache: bool = False) -> GuardrailResult:
+        """check_quotes followed by the targeted repair call for whatever it stripped."""
+        return await self.repair_quotes(self.check_quotes(report, scrubbed_transcript), scrubbed_transcript, bypass_cache=bypass_cache)
+
+    def _patient_summary_request(self, validated_clinical_dict: dict, scrubbed_transcript: str, system_context: str, language: str) -> tuple[list[dict], str | None]:
+        """Builds the summary messages and its cache key (shared by the blocking and streaming variants)."""
+        clinical_json = json.dumps(validated_clinical_dict)
+        messages = build_patient_summary_messages(system_context, language, clinical_json, scrubbed_transcript)
+        cache_key = self._cache_key("patient_summary", PATIENT_SUMMARY_SYSTEM_PROMPT + PATIENT_SUMMARY_CONTEXT_PROMPT, scrubbed_transcript, system_context, language, extra=clinical_json)
+        return messages, cache_key
+
+    async def generate_patient_summary(self, validated_clinical_dict: dict, scrubbed_transcript: str, system_context: str, language: str = "en", bypass_cache: bool = False) -> dict:
+        messages, cache_key = self._patient_summary_request(validated_clinical_dict, scrubbed_transcript, system_context, language)
+        cached = await self._cache_lookup("patient_summary", cache_key, bypass_cache)
+        if cached is not None:
+            return json.loads(cached)
+
+        parsed, decision = await self._parse(
+            "patient_summary",
+            messages=messages,
             response_format=PatientSummary,
-            max_tokens=Config.MAX_TOKENS_PATIENT_SUMMARY
+            basis_text=messages[-1]["content"]
         )
-        return parsed.model_dump()
-
-    def run_consultation(self, raw_transcript: str, metadata_context: dict, language: str = "en") -> tuple[dict, dict, dict]:
-        """Runs the complete E2E zero-hallucination pipeline."""
-        # 1. PII Scrubbing
-        scrubbed_transcript, token_map = scrubber.scrub(raw_transcript)
-        
-        # 2. Stringify system context (including available doctor categories)
-        system_context = json.dumps({
-            "context_documents": metadata_context.get("context_documents", []),
-            "available_doctor_categories": metadata_context.get("available_doctor_categories", [])
-        })
-        
-        # 3. LLM Call 1: Structured Extraction (CoVe)
+        summary = parsed.model_dump()
+        await self._cache_store(cache_key, "patient_summary", json.dumps(summary), decision)
+        return summary
+
+    async def stream_patient_summary(self, validated_clinical_dict: dict, scrubbed_transcript: str, system_context: str, language: str = "en", bypass_cache: bool = False) -> AsyncIterator[tuple[str, Any]]:
+        """
+        Streaming variant of generate_patient_summary.
+        Yields ("delta", text) with scrubbed `layman_explanation` text as the model produces it,
+        then exactly one ("summary", dict) carrying the schema-validated PatientSummary.
+        """
+        messages, cache_key = self._patient_summary_request(validated_clinical_dict, scrubbed_transcript, system_context, language)
+        cached = await self._cache_lookup("patient_summary", cache_key, bypass_cache)
+        if cached is not None:
+            summary = json.loads(cached)
+            yield "delta", summary["layman_explanation"]
+            yield "summary", summary
+            return
+
+        budget = self.budgets["patient_summary"]
+        basis_tokens = count_tokens(messages[-1]["content"])
+        max_tokens = budget.max_tokens_for(basis_tokens)
+        decision = self.router.choose("patient_summary")
+        usage = UsageRecord()
+        started = time.perf_counter()
+        first_token_seen = False
+
+        field_streamer = JsonStringFieldStreamer("layman_explanation")
+        async for kind, payload in self.llm.stream_completion(
+            messages=messages,
+            response_format=PatientSummary,
+            max_tokens=max_tokens,
+            usage=usage,
+            **self._model_kwargs(decision)
+        ):
+            if kind == "delta":
+                if not first_token_seen:
+                    first_token_seen = True
+                    metrics.observe("llm.patient_summary.ttft_seconds", time.perf_counter() - started)
+                text = field_streamer.feed(payload)
+                if text:
+                    yield "delta", text
+            else:
+                self.router.observe(decision, time.perf_counter() - started)
+                record_usage("patient_summary", count_message_tokens(messages), max_tokens, usage)
+                budget.observe(basis_tokens, usage)
+                summary = payload.model_dump()
+                await self._cache_store(cache_key, "patient_summary", json.dumps(summary), decision)
+                yield "summary", summary
+
+    async def generate_fused_consultation(self, scrubbed_transcript: str, system_context: str, language: str = "en", bypass_cache: bool = False) -> FusedConsultation:
+        """Single LLM call producing the CoVe clinical report and the patient summary together."""
+        cache_key = self._cache_key("fused_consultation", FUSED_CONSULTATION_SYSTEM_PROMPT + FUSED_CONSULTATION_CONTEXT_PROMPT, scrubbed_transcript, system_context, language)
+        cached = await self._cache_lookup("fused_consultation", cache_key, bypass_cache)
+        if cached is not None:
+            return FusedConsultation.model_validate_json(cached)
+
+        fused, decision = await self._parse(
+            "fused_consultation",
+            messages=build_fused_consultation_messages(system_context, language, scrubbed_transcript),
+            response_format=FusedConsultation,
+            basis_text=scrubbed_transcript
+        )
+        await self._cache_store(cache_key, "fused_consultation", fused.model_dump_json(), decision)
+        return fused
+
+    def validate_fused(self, fused: FusedConsultation, scrubbed_transcript: str) -> tuple[dict, dict]:
+        """
+        Guardrail for fused mode. The summary was written before the guardrail ran, so its
+        actionables are restricted to those whose exact_quote survived in the validated report
+        (matched on the quote the model wrote, and rewritten like their clinical counterpart).
+        """
+        checked = self.check_quotes(fused, scrubbed_transcript)
+        validated_clinical_dict = checked.report
+        surviving_quotes = {a["exact_quote"] for a in validated_clinical_dict["actionables"]}
+        patient_summary_dict = fused.patient_summary.model_dump()
+        kept = []
+        for actionable in patient_summary_dict["actionables"]:
+            quote = checked.rewritten.get(actionable["exact_quote"], actionable["exact_quote"])
+            if quote in surviving_quotes:
+                kept.append({**actionable, "exact_quote": quote})
+        if len(kept) < len(patient_summary_dict["actionables"]):
+            logger.warning(f"Fused summary: {len(patient_summary_dict['actionables']) - len(kept)} actionable(s) without a validated clinical counterpart stripped")
+        patient_summary_dict["actionables"] = kept
+        return validated_clinical_dict, patient_summary_dict
+
+    async def scrub_and_contextualize(self, raw_transcript: str, metadata_context: dict, checkpoint: DraftCheckpoint | None = None) -> tuple[str, dict, str]:
+        """PII scrubbing (CPU-bound Presidio pass, kept off the event loop) plus system context assembly."""
+        saved = checkpoint.load("scrub") if checkpoint is not None else None
+        if saved is not None:
+            scrubbed_transcript, token_map = saved["scrubbed_transcript"], saved["token_map"]
+        else:
+            scrubbed_transcript, token_map = await asyncio.to_thread(scrubber.scrub, raw_transcript)
+            if checkpoint is not None:
+                checkpoint.save("scrub", {"scrubbed_transcript": scrubbed_transcript, "token_map": token_map})
+        return scrubbed_transcript, token_map, self.build_system_context(metadata_context)
+
+    async def generate_windowed_clinical_report(self, scrubbed_transcript: str, system_context: str, bypass_cache: bool = False) -> dict:
+        """
+        Long-consultation extraction: split the transcript into overlapping speaker-turn windows,
+        extract each window concurrently (bounded fan-out), guardrail every item against its own
+        window, then merge and deduplicate in transcript order. Returns a validated ClinicalReport dict.
+        """
+        windows = split_into_windows(
+            scrubbed_transcript,
+            window_chars=Config.EXTRACTION_WINDOW_CHARS,
+            overlap_chars=Config.EXTRACTION_WINDOW_OVERLAP_CHARS
+        )
+        logger.info(f"Windowed extraction: {len(scrubbed_transcript)} chars -> {len(windows)} windows")
+        semaphore = asyncio.Semaphore(Config.EXTRACTION_MAX_CONCURRENCY)
+
+        async def extract_window(window: TranscriptWindow) -> tuple[TranscriptWindow, GuardrailResult]:
+            async with semaphore:
+                report = await self.generate_clinical_report(window.text, system_context, bypass_cache=bypass_cache)
+            return window, await self.check_and_repair_quotes(report, window.text, bypass_cache=bypass_cache)
+
+        results = await asyncio.gather(*[extract_window(w) for w in windows])
+        return self.merge_window_reports(results)
+
+    @staticmethod
+    def merge_window_reports(results: list[tuple[TranscriptWindow, GuardrailResult]]) -> dict:
+        """
+        Merges per-window guardrail results in the order of their absolute exact_quote spans. An item
+        whose span overlaps an item already kept from another window (which can only happen in the
+        text both windows read) is that finding re-read and is dropped. If several kept items overlap
+        it (one quote supporting several findings), the one with the same clinical wording absorbs it,
+        else the one it overlaps most; each kept item absorbs at most one item per window. The same
+        wording at another point of the transcript is a separate mention and is kept.
+        """
+        def identity(section: str, item: dict) -> tuple:
+            if section == "actionables":
+                return (item["action_type"], item["description"].strip().lower())
+            return (item["finding"].strip().lower(), item["condition_status"], item["subject"])
+
+        merged = {}
+        for section in ("chief_complaints", "assessments", "actionables"):
+            located = []
+            for window, checked in results:
+                for item, spans in zip(checked.report[section], checked.spans[section]):
+                    start, end = spans["exact_quote"]
+                    located.append((window.start + start, window.start + end, window.index, item))
+            located.sort(key=lambda entry: (entry[0], entry[2]))
+
+            kept: list[dict] = []
+            merged[section] = []
+            for start, end, index, item in located:
+                key = identity(section, item)
+                kept = [k for k in kept if k["end"] > start]  # spans are sorted by start: the rest cannot overlap again
+                rereads = [k for k in kept if k["window"] != index and index not in k["absorbed"] and k["start"] < end]
+                if rereads:
+                    match = next((k for k in rereads if k["identity"] == key), None) or max(
+                        rereads, key=lambda k: min(end, k["end"]) - max(start, k["start"])
+                    )
+                    match["absorbed"].add(index)
+                    continue
+                kept.append({"start": start, "end": end, "window": index, "identity": key, "absorbed": set()})
+                merged[section].append(item)
+        return merged
+
+    async def extract_and_validate(self, scrubbed_transcript: str, system_context: str, bypass_cache: bool = False, checkpoint: DraftCheckpoint | None = None) -> dict:
+        """
+        LLM Call 1 (structured CoVe extraction) followed by the deterministic quote guardrail.
+        Transcripts above EXTRACTION_WINDOWING_THRESHOLD_CHARS use windowed parallel extraction.
+        With a `checkpoint`, the raw extraction and the validated report are saved and reused on a retry.
+        """
+        validated_clinical_dict = checkpoint.load("validated") if checkpoint is not None else None
+        if validated_clinical_dict is not None:
+            return validated_clinical_dict
         try:
-            thought_process = self.generate_clinical_report(scrubbed_transcript, system_context)
+            if len(scrubbed_transcript) > Config.EXTRACTION_WINDOWING_THRESHOLD_CHARS:
+                validated_clinical_dict = await self.generate_windowed_clinical_report(scrubbed_transcript, system_context, bypass_cache=bypass_cache)
+            else:
+                raw_extraction = checkpoint.load("extraction") if checkpoint is not None else None
+                if raw_extraction is not None:
+                    thought_process = ClinicalExtractionThoughtProcess.model_validate(raw_extraction)
+                else:
+                    thought_process = await self.generate_clinical_report(scrubbed_transcript, system_context, bypass_cache=bypass_cache)
+                    if checkpoint is not None:
+                        checkpoint.save("extraction", thought_process.model_dump())
         except Exception as e:
             logger.error(f"Clinical Extraction Failed: {e}")
             raise
+        if validated_clinical_dict is None:
+            validated_clinical_dict = (await self.check_and_repair_quotes(thought_process, scrubbed_transcript, bypass_cache=bypass_cache)).report
+        if checkpoint is not None:
+            checkpoint.save("validated", validated_clinical_dict)
+        return validated_clinical_dict
+
+    async def generate_incremental_report(self, segment: str, system_context: str, prior_findings: str, bypass_cache: bool = False) -> ClinicalExtractionThoughtProcess:
+        cache_key = self._cache_key("incremental_extraction", INCREMENTAL_EXTRACTION_SYSTEM_PROMPT + INCREMENTAL_EXTRACTION_CONTEXT_PROMPT, segment, system_context, extra=prior_findings)
+        cached = await self._cache_lookup("incremental_extraction", cache_key, bypass_cache)
+        if cached is not None:
+            return ClinicalExtractionThoughtProcess.model_validate_json(cached)
+
+        report, decision = await self._parse(
+            "incremental_extraction",
+            messages=build_incremental_extraction_messages(system_context, prior_findings, segment),
+            response_format=ClinicalExtractionThoughtProcess,
+            basis_text=segment
+        )
+        await self._cache_store(cache_key, "incremental_extraction", report.model_dump_json(), decision)
+        return report
+
+    async def extract_incremental(self, raw_transcript: str, system_context: str, state: IncrementalExtraction | None = None, bypass_cache: bool = False) -> IncrementalExtraction:
+        """
+        Scrub + extract + guardrail for a transcript that grows by appends. When `raw_transcript`
+        extends `state`, only the appended text plus the unsettled overlap before it is scrubbed, and
+        only the new segment (from the start of the last covered speaker turn, so an unfinished turn is
+        re-read whole; from the overlap if the transcript has no speaker labels) is sent to the LLM
+        with a compact list of prior findings; the validated result is merged into the prior report.
+        Edits to already-covered text, or a segment long enough for windowing, fall back to a full run.
+        Returns a new state; the validated report in it is scrubbed (hydrate with its token_map).
+        """
+        if state is not None and state.extends(raw_transcript):
+            appended = raw_transcript[state.raw_covered:]
+            if not appended.strip():
+                metrics.incr("incremental.unchanged")
+                return dataclasses.replace(state, last_update="unchanged")
 
-        # 4. Deterministic Guardrail Validation
-        validated_clinical_dict = self.validate_quotes(thought_process, scrubbed_transcript)
+            tail = raw_transcript[state.settled_raw:]
+            scrubbed_tail, token_map, spans = await asyncio.to_thread(scrubber.scrub_with_spans, tail, state.token_map)
+            scrubbed_transcript = state.scrubbed_transcript[:state.settled_scrubbed] + scrubbed_tail
+            covered_end = state.settled_scrubbed + scrubbed_offset(state.raw_covered - state.settled_raw, spans)
+            turn_start = last_turn_start(scrubbed_transcript[:covered_end])
+            segment = scrubbed_transcript[turn_start if turn_start is not None else state.settled_scrubbed:]
+            settled_raw, settled_scrubbed = settle_point(tail, spans, Config.INCREMENTAL_OVERLAP_CHARS)
+            if len(segment) <= Config.EXTRACTION_WINDOWING_THRESHOLD_CHARS:
+                metrics.incr("incremental.appended")
+                report = await self.generate_incremental_report(segment, system_context, summarize_findings(state.report), bypass_cache=bypass_cache)
+                checked = await self.check_and_repair_quotes(report, segment, bypass_cache=bypass_cache)
+                return IncrementalExtraction(
+                    raw_covered=len(raw_transcript),
+                    raw_digest=raw_digest(raw_transcript),
+                    scrubbed_transcript=scrubbed_transcript,
+                    token_map=token_map,
+                    report=merge_incremental(state.report, checked.report),
+                    last_update="incremental",
+                    settled_raw=state.settled_raw + settled_raw,
+                    settled_scrubbed=state.settled_scrubbed + settled_scrubbed
+                )
+
+        metrics.incr("incremental.full")
+        scrubbed_transcript, token_map, spans = await asyncio.to_thread(scrubber.scrub_with_spans, raw_transcript, {})
+        settled_raw, settled_scrubbed = settle_point(raw_transcript, spans, Config.INCREMENTAL_OVERLAP_CHARS)
+        return IncrementalExtraction(
+            raw_covered=len(raw_transcript),
+            raw_digest=raw_digest(raw_transcript),
+            scrubbed_transcript=scrubbed_transcript,
+            token_map=token_map,
+            report=await self.extract_and_validate(scrubbed_transcript, system_context, bypass_cache=bypass_cache),
+            last_update="full",
+            settled_raw=settled_raw,
+            settled_scrubbed=settled_scrubbed
+        )
+
+    async def run_consultation(self, raw_transcript: str, metadata_context: dict, language: str = "en", bypass_cache: bool = False, timer: StageTimer | None = None, mode: str | None = None, checkpoint: DraftCheckpoint | None = None) -> tuple[dict, dict, dict]:
+        """
+        Runs the complete E2E zero-hallucination pipeline. Stage durations are recorded on `timer` if given.
+        `mode` ("two_call" | "fused", default PIPELINE_MODE) selects separate or fused LLM calls; transcripts
+        long enough for windowed extraction always use the two-call path. Stages completed under
+        `checkpoint` by an earlier, failed attempt are loaded instead of re-run.
+        """
+        timer = timer or StageTimer()
+        mode = mode or Config.PIPELINE_MODE
+        if mode not in PIPELINE_MODES:
+            raise ValueError(f"Unknown pipeline mode {mode!r}; expected one of {PIPELINE_MODES}")
+
+        # 1-2. PII Scrubbing + system context (including available doctor categories)
+        with timer.stage("scrub"):
+            scrubbed_transcript, token_map, system_context = await self.scrub_and_contextualize(raw_transcript, metadata_context, checkpoint)
+
+        if mode == "fused" and len(scrubbed_transcript) <= Config.EXTRACTION_WINDOWING_THRESHOLD_CHARS:
+            # 3-5. One LLM call for report + summary, then the deterministic guardrail over both
+            with timer.stage("fused_consultation"):
+                fused = await self.generate_fused_consultation(scrubbed_transcript, system_context, language, bypass_cache=bypass_cache)
+                validated_clinical_dict, patient_summary_dict = self.validate_fused(fused, scrubbed_transcript)
+            return (
+                scrubber.hydrate_dict(validated_clinical_dict, token_map),
+                scrubber.hydrate_dict(patient_summary_dict, token_map),
+                token_map
+            )
+
+        # 3-4. LLM Call 1: Structured Extraction (CoVe) + Deterministic Guardrail Validation
+        with timer.stage("clinical_extraction"):
+            validated_clinical_dict = await self.extract_and_validate(scrubbed_transcript, system_context, bypass_cache=bypass_cache, checkpoint=checkpoint)
 
         # 5. LLM Call 2: Patient Summary Translation
-        try:
-            patient_summary_dict = self.generate_patient_summary(
+        patient_summary_dict = checkpoint.load("summary") if checkpoint is not None else None
+        if patient_summary_dict is None:
+            try:
+                with timer.stage("patient_summary"):
+                    patient_summary_dict = await self.generate_patient_summary(
+                        validated_clinical_dict=validated_clinical_dict,
+                        scrubbed_transcript=scrubbed_transcript,
+                        system_context=system_context,
+                        language=language,
+                        bypass_cache=bypass_cache
+                    )
+            except Exception as e:
+                logger.error(f"Patient Summary Failed: {e}")
+                raise
+            if checkpoint is not None:
+                checkpoint.save("summary", patient_summary_dict)
+
+        # 6. Metadata Hydration (Swap tokens back to PII)
+        hydrated_clinical = scrubber.hydrate_dict(validated_clinical_dict, token_map)
+        hydrated_patient = scrubber.hydrate_dict(patient_summary_dict, token_map)
+
+        return hydrated_clinical, hydrated_patient, token_map
+
+    async def run_clinical_draft(self, raw_transcript: str, metadata_context: dict, language: str = "en", bypass_cache: bool = False, timer: StageTimer | None = None) -> tuple[dict, dict, Callable[[], Awaitable[dict]]]:
+        """
+        Progressive two-call pipeline: returns (hydrated clinical report, token_map, summarize) as soon as
+        extraction and the guardrail are done. Awaiting `summarize()` runs LLM Call 2 and returns the
+        hydrated PatientSummary, so the caller decides when (or in which task) the summary is produced.
+        """
+        timer = timer or StageTimer()
+        with timer.stage("scrub"):
+            scrubbed_transcript, token_map, system_context = await self.scrub_and_contextualize(raw_transcript, metadata_context)
+        with timer.stage("clinical_extraction"):
+            validated_clinical_dict = await self.extract_and_validate(scrubbed_transcript, system_context, bypass_cache=bypass_cache)
+
+        async def summarize() -> dict:
+            patient_summary_dict = await self.generate_patient_summary(
                 validated_clinical_dict=validated_clinical_dict,
                 scrubbed_transcript=scrubbed_transcript,
                 system_context=system_context,
-                language=language
+                language=language,
+                bypass_cache=bypass_cache
             )
-        except Exception as e:
-            logger.error(f"Patient Summary Failed: {e}")
-            raise
+            return scrubber.hydrate_dict(patient_summary_dict, token_map)
 
-        # 6. Metadata Hydration (Swap tokens back to PII)
-        hydrated_clinical = scrubber.hydrate_dict(validated_clinical_dict, token_map)
-        hydrated_patient = scrubber.hydrate_dict(patient_summary_dict, token_map)
+        return scrubber.hydrate_dict(validated_clinical_dict, token_map), token_map, summarize
 
-        return hydrated_clinical, hydrated_patient, token_map 
+    async def stream_consultation(self, raw_transcript: str, metadata_context: dict, language: str = "en", bypass_cache: bool = False) -> AsyncIterator[tuple[str, Any]]:
+        """
+        Streaming E2E pipeline. Yields hydrated events in order:
+          ("clinical_item", {"section", "item"}) per guardrail-validated item as the model finishes it
+            (STREAM_CLINICAL_ITEMS; transcripts short enough for a single extraction call),
+          ("clinical_draft", {"clinical_draft_json", "token_map", "truncated"}) once the guardrail has run,
+          ("summary_delta", text) for each hydrated `layman_explanation` fragment,
+          ("patient_summary", dict) with the final validated, hydrated PatientSummary.
+        """
+        scrubbed_transcript, token_map, system_context = await self.scrub_and_contextualize(raw_transcript, metadata_context)
+        truncated = False
+        if Config.STREAM_CLINICAL_ITEMS and len(scrubbed_transcript) <= Config.EXTRACTION_WINDOWING_THRESHOLD_CHARS:
+            async for kind, payload in self.stream_clinical_items(scrubbed_transcript, system_context, bypass_cache=bypass_cache):
+                if kind == "item":
+                    yield "clinical_item", scrubber.hydrate_dict(payload, token_map)
+                else:
+                    validated_clinical_dict, truncated = payload["result"].report, payload["truncated"]
+        else:
+            validated_clinical_dict = await self.extract_and_validate(scrubbed_transcript, system_context, bypass_cache=bypass_cache)
+        yield "clinical_draft", {
+            "clinical_draft_json": scrubber.hydrate_dict(validated_clinical_dict, token_map),
+            "token_map": token_map,
+            "truncated": truncated
+        }
 
+        hydrator = StreamingHydrator(token_map)
+        async for kind, payload in self.stream_patient_summary(
+            validated_clinical_dict=validated_clinical_dict,
+            scrubbed_transcript=scrubbed_transcript,
+            system_context=system_context,
+            language=language,
+            bypass_cache=bypass_cache
+        ):
+            if kind == "delta":
+                text = hydrator.feed(payload)
+                if text:
+                    yield "summary_delta", text
+            else:
+                tail = hydrator.flush()
+                if tail:
+                    yield "summary_delta", tail
+                yield "patient_summary", scrubber.hydrate_dict(payload, token_map)
@@ -0,0 +1,203 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.core.config import Config
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+class _MemoryTier:
+    """In-process LRU with per-entry TTL. Evicts least-recently-used entries beyond `max_entries`."""
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created_at, value = entry
+            if time.time() - created_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: str, created_at: Optional[float] = None):
+        with self._lock:
+            self._entries[key] = (created_at or time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+class _SQLiteTier:
+    """
+    Persistent tier. Survives restarts and is shared by every worker pointing at the same file.
+    Blocking: LLMResultCache runs it in a worker thread. last_access is only rewritten once it is
+    ACCESS_REFRESH_SECONDS stale, and TTL/size eviction runs every `evict_every` puts, not on each one.
+    """
+    ACCESS_REFRESH_SECONDS = 60.0
+
+    def __init__(self, path: str, max_entries: int, ttl_seconds: float, evict_every: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.evict_every = max(1, evict_every)
+        self._puts = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_result_cache ("
+            " key TEXT PRIMARY KEY, stage TEXT, value TEXT, created_at REAL, last_access REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_access ON llm_result_cache(last_access)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+        with self._lock:
+            self._evict_locked(time.time())
+
+    def get(self, key: str) -> Optional[tuple[float, str]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT created_at, value, last_access FROM llm_result_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[0] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_result_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            if now - row[2] > self.ACCESS_REFRESH_SECONDS:
+                self._conn.execute("UPDATE llm_result_cache SET last_access = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+            return row[0], row[1]
+
+    def put(self, key: str, stage: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_result_cache (key, stage, value, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, stage, value, now, now)
+            )
+            self._puts += 1
+            if self._puts % self.evict_every == 0:
+                self._evict_locked(now)
+            self._conn.commit()
+
+    def _evict_locked(self, now: float):
+        self._conn.execute("DELETE FROM llm_result_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+        self._conn.execute(
+            "DELETE FROM llm_result_cache WHERE key IN ("
+            " SELECT key FROM llm_result_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+        self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_result_cache").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class LLMResultCache:
+    """
+    Two-tier (memory LRU -> SQLite) cache for deterministic pipeline LLM stages.
+    Values are JSON strings; callers own (de)serialization into their Pydantic models.
+    get/put are coroutines: the memory tier answers inline, SQLite I/O runs in a worker thread.
+    """
+    def __init__(
+        self,
+        sqlite_path: Optional[str] = Config.LLM_CACHE_SQLITE_PATH,
+        memory_max_entries: int = Config.LLM_CACHE_MEMORY_MAX_ENTRIES,
+        memory_ttl_seconds: float = Config.LLM_CACHE_MEMORY_TTL_SECONDS,
+        sqlite_max_entries: int = Config.LLM_CACHE_SQLITE_MAX_ENTRIES,
+        sqlite_ttl_seconds: float = Config.LLM_CACHE_SQLITE_TTL_SECONDS,
+        sqlite_evict_every: int = Config.LLM_CACHE_SQLITE_EVICT_EVERY
+    ):
+        self.memory = _MemoryTier(memory_max_entries, memory_ttl_seconds)
+        self.sqlite = _SQLiteTier(sqlite_path, sqlite_max_entries, sqlite_ttl_seconds, sqlite_evict_every) if sqlite_path else None
+        self._stats = {"memory_hits": 0, "sqlite_hits": 0, "misses": 0, "bypassed": 0, "writes": 0}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(
+        stage: str,
+        model: str,
+        prompt: str,
+        scrubbed_transcript: str,
+        system_context: str,
+        language: str = "",
+        extra: str = ""
+    ) -> str:
+        """Content hash over every input that can change the LLM output for a stage."""
+        payload = json.dumps([stage, model, prompt, scrubbed_transcript, system_context, language, extra])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _count(self, stat: str, stage: str):
+        with self._lock:
+            self._stats[stat] += 1
+        metrics.incr(f"llm_cache.{stage}.{stat}")
+
+    async def get(self, key: str, stage: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("memory_hits", stage)
+            return value
+
+        if self.sqlite is not None:
+            try:
+                row = await asyncio.to_thread(self.sqlite.get, key)
+            except sqlite3.Error as e:
+                logger.warning(f"LLM cache SQLite read failed (treated as a miss): {e}")
+                row = None
+            if row is not None:
+                created_at, value = row
+                # Promote to the memory tier, preserving the original age for TTL purposes
+                self.memory.put(key, value, created_at=created_at)
+                self._count("sqlite_hits", stage)
+                return value
+
+        self._count("misses", stage)
+        return None
+
+    async def put(self, key: str, stage: str, value: str):
+        self.memory.put(key, value)
+        if self.sqlite is not None:
+            try:
+                await asyncio.to_thread(self.sqlite.put, key, stage, value)
+            except sqlite3.Error as e:
+                logger.warning(f"LLM cache SQLite write failed (memory tier still populated): {e}")
+        self._count("writes", stage)
+
+    def record_bypass(self, stage: str):
+        self._count("bypassed", stage)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["memory_hits"] + stats["sqlite_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["sqlite_hits"]) / lookups if lookups else 0.0
+        stats["memory_entries"] = len(self.memory)
+        stats["sqlite_entries"] = len(self.sqlite) if self.sqlite is not None else 0
+        return stats
+
+    def close(self):
+        if self.sqlite is not None:
+            self.sqlite.close()
@@ -7,6 +7,7 @@ logger = logging.getLogger(__name__)
 
 class ContentScrubber:
     def __init__(self):
+        self._warmed = False
         try:
             self.analyzer = AnalyzerEngine()
             self.anonymizer = AnonymizerEngine()
@@ -16,34 +17,74 @@ class ContentScrubber:
             self.analyzer = None
             self.anonymizer = None
 
-    def scrub(self, text: str) -> tuple[str, dict]:
+    def warm_up(self):
+        """
+        Runs one throwaway analysis so spaCy/recognizer lazy initialisation is paid while
+        transcription is still in flight rather than on the first real transcript. Idempotent.
+        """
+        if self._warmed or not self.analyzer:
+            return
+        try:
+            self.analyzer.analyze(text="Warm up for John Smith in Budapest on Monday.", entities=["PERSON", "LOCATION", "DATE_TIME"], language='en')
+        except Exception as e:
+            logger.warning(f"Presidio warm-up failed: {e}")
+        self._warmed = True
+
+    def scrub(self, text: str, token_map: dict | None = None) -> tuple[str, dict]:
+        """
+        Replaces PERSON / LOCATION / DATE_TIME entities with tokens. If `token_map` from an earlier
+        segment of the same transcript is given, originals it already holds keep their token and new
+        entities continue its numbering, so separately scrubbed segments concatenate consistently.
+        """
+        scrubbed_text, token_map, _ = self.scrub_with_spans(text, token_map)
+        return scrubbed_text, token_map
+
+    def scrub_with_spans(self, text: str, token_map: dict | None = None) -> tuple[str, dict, list[tuple[int, int, str]]]:
+        """scrub, also returning the replaced (start, end, token) spans of `text` in ascending order."""
+        token_map = dict(token_map or {})
         if not self.analyzer or not self.anonymizer:
             logger.warning("Scrubber offline. Returning unscrubbed.")
-            return text, {}
+            return text, token_map, []
 
         try:
             results = self.analyzer.analyze(text=text, entities=["PERSON", "LOCATION", "DATE_TIME"], language='en')
         except Exception as e:
             logger.error(f"Analyzer failed: {e}")
-            return text, {}
+            return text, token_map, []
 
         # Sort results by start index in reverse to replace from end to start without throwing off indices
         results.sort(key=lambda x: x.start, reverse=True)
         
         scrubbed_text = text
-        token_map = {}
         counters = {"PERSON": 0, "LOCATION": 0, "DATE_TIME": 0}
+        known = {}
+        for token, original in token_map.items():
+            entity_type, _, index = token.strip("[]").rpartition("_")
+            if entity_type in counters and index.isdigit():
+                counters[entity_type] = max(counters[entity_type], int(index))
+                known[(entity_type, original)] = token
 
+        spans = []
         for res in results:
             entity_type = res.entity_type
             if entity_type in counters:
-                counters[entity_type] += 1
-                token = f"[{entity_type}_{counters[entity_type]}]"
                 original_text = text[res.start:res.end]
-                token_map[token] = original_text
+                token = known.get((entity_type, original_text))
+                if token is None:
+                    counters[entity_type] += 1
+                    token = f"[{entity_type}_{counters[entity_type]}]"
+                    token_map[token] = original_text
                 scrubbed_text = scrubbed_text[:res.start] + token + scrubbed_text[res.end:]
-                
-        return scrubbed_text, token_map
+                spans.append((res.start, res.end, token))
+
+        return scrubbed_text, token_map, spans[::-1]
+
+    def hydrate_text(self, text: str, token_map: dict) -> str:
+        """Replace token substrings in a plain string (used for streamed fragments)."""
+        # Sort by length descending to avoid partial matches ([PERSON_10] vs [PERSON_1])
+        for token in sorted(token_map.keys(), key=len, reverse=True):
+            text = text.replace(token, token_map[token])
+        return text
 
     def hydrate_dict(self, data: dict, token_map: dict) -> dict:
         """Recursively search through dict and replace any token substrings with original values."""
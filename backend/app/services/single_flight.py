@@ -0,0 +1,73 @@
+"""
+Single-flight coalescing for expensive, idempotent request handlers.
+Concurrent calls with the same key (double-clicks, frontend retries) await one shared task
+instead of each transcribing and calling the LLM. Only in-flight work is shared; a call made
+after the task finished starts a new one (repeat results come from the LLM result cache).
+"""
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Any, Awaitable, Callable, TypeVar
+
+from app.core.metrics import metrics
+
+R = TypeVar("R")
+logger = logging.getLogger(__name__)
+
+def single_flight_key(*parts: Any) -> str:
+    return hashlib.sha256(json.dumps(parts, default=str).encode("utf-8")).hexdigest()
+
+def content_digest(data: bytes | str | None) -> str:
+    if data is None:
+        return ""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+class SingleFlight:
+    """
+    Per-process, per-event-loop registry of in-flight tasks. The shared task is shielded: a caller
+    that disconnects stops waiting, but the work continues for the callers still waiting on it.
+    Once the last waiter has gone, the shared task is cancelled so nobody pays for unread work.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._waiters: dict[asyncio.Task, int] = {}
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[R]]) -> R:
+        task = self._inflight.get(key)
+        if task is not None:
+            metrics.incr(f"single_flight.{self.name}.coalesced")
+            logger.info(f"Single-flight '{self.name}': joined in-flight request {key[:12]}")
+            return await self._wait(task)
+
+        metrics.incr(f"single_flight.{self.name}.executed")
+        task = asyncio.ensure_future(factory())
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._forget(key, t))
+        return await self._wait(task)
+
+    async def _wait(self, task: asyncio.Task) -> R:
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters[task] == 1 and not task.done():
+                metrics.incr(f"single_flight.{self.name}.abandoned")
+                task.cancel()
+            raise
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every waiter went away
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
@@ -0,0 +1,174 @@
+"""
+Incremental helpers for streaming LLM output to the client over Server-Sent Events.
+All classes are chunk-boundary safe: state is carried between `feed` calls so an escape
+sequence or a PII token split across two network chunks is still decoded/hydrated correctly.
+"""
+import json
+import re
+from typing import Any
+
+from app.services.scrubber import scrubber
+
+_JSON_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+class JsonStringFieldStreamer:
+    """
+    Extracts the decoded value of one top-level string field from a JSON document that
+    arrives in arbitrary fragments, e.g. `layman_explanation` from a PatientSummary stream.
+    """
+    def __init__(self, field: str):
+        self._key_pattern = re.compile(r'"%s"\s*:\s*"' % re.escape(field))
+        self._buffer = ""
+        self._state = "seeking"  # seeking -> inside -> done
+
+    @property
+    def done(self) -> bool:
+        return self._state == "done"
+
+    def feed(self, chunk: str) -> str:
+        """Consume raw JSON text; return the newly decoded characters of the field (possibly empty)."""
+        if self._state == "done":
+            return ""
+        self._buffer += chunk
+
+        if self._state == "seeking":
+            match = self._key_pattern.search(self._buffer)
+            if not match:
+                return ""
+            self._buffer = self._buffer[match.end():]
+            self._state = "inside"
+
+        out = []
+        buf = self._buffer
+        i = 0
+        while i < len(buf):
+            c = buf[i]
+            if c == '"':
+                self._state = "done"
+                self._buffer = ""
+                return "".join(out)
+            if c != "\\":
+                out.append(c)
+                i += 1
+                continue
+            # Escape sequence: wait for the rest of it if it was split across chunks
+            if i + 1 >= len(buf):
+                break
+            esc = buf[i + 1]
+            if esc != "u":
+                out.append(_JSON_ESCAPES.get(esc, esc))
+                i += 2
+                continue
+            if i + 6 > len(buf):
+                break
+            code = int(buf[i + 2:i + 6], 16)
+            if 0xD800 <= code < 0xDC00:
+                # High surrogate: needs its low half before it can be emitted
+                if i + 12 > len(buf):
+                    break
+                if buf[i + 6:i + 8] == "\\u":
+                    low = int(buf[i + 8:i + 12], 16)
+                    out.append(chr(0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)))
+                    i += 12
+                    continue
+            out.append(chr(code))
+            i += 6
+
+        self._buffer = buf[i:]
+        return "".join(out)
+
+class JsonArrayItemStreamer:
+    """
+    Emits every element of the named arrays (e.g. `chief_complaints`, at any depth) of a JSON
+    document that arrives in arbitrary fragments, as soon as the element's closing brace arrives.
+    Only new characters are scanned; text before the oldest unfinished element is dropped.
+    """
+    def __init__(self, fields):
+        self.fields = frozenset(fields)
+        self._text = ""
+        self._pos = 0
+        self._stack: list[tuple[str, str | None]] = []  # ("{" | "[", key the container is the value of)
+        self._key = None          # last object key read at the current level
+        self._expect_key = False
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._item_start = None   # offset in _text of the element being collected
+        self._item_depth = 0
+
+    def feed(self, chunk: str) -> list[tuple[str, Any]]:
+        """Consume raw JSON text; return the (array field, decoded element) pairs completed by it."""
+        self._text += chunk
+        text = self._text
+        items = []
+        i = self._pos
+        while i < len(text):
+            c = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._expect_key:
+                        self._key = json.loads(text[self._string_start:i + 1])
+                        self._expect_key = False
+            elif c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c in "{[":
+                parent = self._stack[-1] if self._stack else None
+                key = self._key if parent and parent[0] == "{" else None
+                if parent and parent[0] == "[" and parent[1] in self.fields and self._item_start is None:
+                    self._item_start, self._item_depth = i, len(self._stack)
+                self._stack.append((c, key))
+                self._key = None
+                self._expect_key = c == "{"
+            elif c in "}]":
+                self._stack.pop()
+                if self._item_start is not None and len(self._stack) == self._item_depth:
+                    items.append((self._stack[-1][1], json.loads(text[self._item_start:i + 1])))
+                    self._item_start = None
+            elif c == "," and self._stack and self._stack[-1][0] == "{":
+                self._expect_key = True
+            i += 1
+
+        # Keep only what a later chunk can still need: the open element, or the open string
+        keep = self._item_start if self._item_start is not None else (self._string_start if self._in_string else i)
+        self._text = text[keep:]
+        self._pos = i - keep
+        if self._item_start is not None:
+            self._item_start -= keep
+        self._string_start -= keep
+        return items
+
+class StreamingHydrator:
+    """
+    Restores PII tokens ([PERSON_1], [DATE_TIME_3], ...) in streamed text.
+    Holds back a trailing fragment that could still grow into a token so that a token split
+    across chunks ("[PERS" + "ON_1]") is replaced exactly once, never leaked half-scrubbed.
+    """
+    def __init__(self, token_map: dict):
+        self.token_map = token_map
+        self._max_token_len = max((len(t) for t in token_map), default=0)
+        self._pending = ""
+
+    def feed(self, text: str) -> str:
+        if not self.token_map:
+            return text
+        self._pending += text
+        cut = len(self._pending)
+        open_idx = self._pending.rfind("[")
+        if open_idx != -1 and "]" not in self._pending[open_idx:] and cut - open_idx < self._max_token_len:
+            cut = open_idx
+        ready, self._pending = self._pending[:cut], self._pending[cut:]
+        return scrubber.hydrate_text(ready, self.token_map)
+
+    def flush(self) -> str:
+        ready, self._pending = self._pending, ""
+        return scrubber.hydrate_text(ready, self.token_map)
+
+def sse_event(event: str, data: Any) -> str:
+    """Formats one Server-Sent Event frame with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
@@ -0,0 +1,73 @@
+"""
+Background patient summaries for progressive drafts (`defer_summary`): the clinical draft is returned
+as soon as extraction and the guardrail are done, and LLM Call 2 keeps running here under a draft id
+that the client polls (optionally long-polls) for the summary.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Optional
+
+from app.core.config import Config
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+class SummaryJobStore:
+    """Per-process registry of summary tasks keyed by draft id; entries expire DEFERRED_SUMMARY_TTL_SECONDS after submission."""
+    def __init__(self, max_entries: int = Config.DEFERRED_SUMMARY_MAX_ENTRIES, ttl_seconds: float = Config.DEFERRED_SUMMARY_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._jobs: OrderedDict[str, tuple[float, asyncio.Task]] = OrderedDict()
+
+    def submit(self, job: Awaitable[dict]) -> str:
+        """Starts `job` (resolving to the hydrated PatientSummary dict) and returns its draft id."""
+        draft_id = uuid.uuid4().hex
+        started = time.perf_counter()
+        task = asyncio.create_task(job)
+        task.add_done_callback(lambda t: self._finished(draft_id, t, time.perf_counter() - started))
+        self._jobs[draft_id] = (time.time(), task)
+        while len(self._jobs) > self.max_entries:
+            _, (_, evicted) = self._jobs.popitem(last=False)
+            evicted.cancel()
+        return draft_id
+
+    @staticmethod
+    def _finished(draft_id: str, task: asyncio.Task, seconds: float):
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            metrics.incr("draft.deferred_summary.failed")
+            logger.error(f"Deferred patient summary for draft {draft_id} failed: {task.exception()}")
+            return
+        metrics.incr("draft.deferred_summary.ready")
+        metrics.observe("draft.deferred_summary.seconds", seconds)
+
+    def get(self, draft_id: str) -> Optional[asyncio.Task]:
+        entry = self._jobs.get(draft_id)
+        if entry is None:
+            return None
+        submitted_at, task = entry
+        if time.time() - submitted_at > self.ttl_seconds:
+            del self._jobs[draft_id]
+            task.cancel()
+            return None
+        return task
+
+    async def wait(self, draft_id: str, timeout: float) -> Optional[asyncio.Task]:
+        """The job's task once it is done or `timeout` seconds have passed (None if unknown or expired)."""
+        task = self.get(draft_id)
+        if task is not None and not task.done() and timeout > 0:
+            # A client giving up on the long poll must not cancel the job itself
+            await asyncio.wait({task}, timeout=min(timeout, Config.DEFERRED_SUMMARY_MAX_WAIT_SECONDS))
+        return task
+
+    async def aclose(self):
+        """Cancels summaries still running (application shutdown)."""
+        tasks = [task for _, task in self._jobs.values() if not task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._jobs.clear()
@@ -8,9 +8,10 @@ try:
 except ImportError:
     pass  # env vars already loaded by server.py or set externally
 
-def transcribe_file_with_diarization(audio_file_path):
+def transcribe_file_with_diarization(audio_file_path, stop_event=None):
     """
     Transcribes an audio file and identifies distinct speakers (Diarization) using Azure Speech Services.
+    Setting `stop_event` (a threading.Event) stops the session early, e.g. when the request is cancelled.
     """
     speech_key = os.getenv("SPEECH_KEY")
     service_region = os.getenv("SERVICE_REGION")
@@ -71,6 +72,9 @@ def transcribe_file_with_diarization(audio_file_path):
     
     # Wait here while the background thread processes the file
     while not transcription_done:
+        if stop_event is not None and stop_event.is_set():
+            print('\n--- SESSION ABORTED (request cancelled) ---')
+            break
         time.sleep(0.5)
         
     # Clean up the transcriber
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Mesh Bulk Re-processing CLI
+Runs transcript corpora through the pipeline in-process (no HTTP server, no audio),
+e.g. after a prompt or schema change. Interrupted runs resume from the output file.
+
+Usage:
+    python batch_cli.py data/synthetic_transcripts/*.json --output runs/rerun.ndjson
+    python batch_cli.py corpus.ndjson --output runs/rerun.ndjson --concurrency 8 --no-cache
+    python batch_cli.py corpus.ndjson --output runs/rerun.ndjson --skip-failed
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+
+from app.core.config import Config
+from app.core.llm_client import create_llm_client
+from app.services.batch_runner import BatchRunner, iter_cases
+from app.services.pipeline import ZeroHallucinationPipeline
+from app.services.result_cache import LLMResultCache
+
+
+async def run(args) -> dict:
+    llm = create_llm_client()
+    cache = LLMResultCache() if Config.LLM_CACHE_ENABLED else None
+    pipeline = ZeroHallucinationPipeline(llm=llm, cache=cache)
+    runner = BatchRunner(
+        pipeline,
+        output_path=args.output,
+        concurrency=args.concurrency,
+        bypass_cache=args.no_cache,
+        retry_failed=not args.skip_failed,
+        mode=args.mode,
+    )
+    try:
+        return await runner.run(iter_cases(args.inputs, default_language=args.language))
+    finally:
+        await llm.aclose()
+        if cache is not None:
+            cache.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mesh bulk transcript re-processing")
+    parser.add_argument("inputs", nargs="+", help="JSON / NDJSON transcript files")
+    parser.add_argument("--output", "-o", required=True, help="NDJSON results file (also the resume checkpoint)")
+    parser.add_argument("--concurrency", "-c", type=int, default=Config.BATCH_CONCURRENCY)
+    parser.add_argument("--language", default="en", help="Default patient summary language")
+    parser.add_argument("--mode", choices=["two_call", "fused"], default=None, help="Pipeline mode (default: PIPELINE_MODE)")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the LLM result cache")
+    parser.add_argument("--skip-failed", action="store_true", help="On resume, do not retry cases that previously failed")
+    parser.add_argument("--verbose", "-v", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="%(asctime)s %(levelname)s %(message)s")
+    if os.path.dirname(args.output):
+        os.makedirs(os.path.dirname(args.output), exist_ok=True)
+
+    summary = asyncio.run(run(args))
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
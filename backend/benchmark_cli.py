@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Mesh Pipeline Benchmark CLI
+Compares pipeline variants in-process over a transcript corpus: latency per consultation and
+total LLM tokens (read from the metrics registry). Uses whichever LLM_BACKEND is configured;
+with LLM_BACKEND=fake it runs offline at the configured fake latency.
+
+Usage:
+    python benchmark_cli.py modes data/synthetic_transcripts/*.json
+    python benchmark_cli.py modes data/synthetic_transcripts/*.json --repeat 3 --json
+    python benchmark_cli.py schema data/synthetic_transcripts/*.json
+    python benchmark_cli.py formats --iterations 500
+    LLM_BACKEND=fake FAKE_LLM_LATENCY=fixed python benchmark_cli.py modes data/synthetic_transcripts/*.json
+    LLM_BACKEND=fake FAKE_LLM_SECONDS_PER_COMPLETION_TOKEN=0.01 python benchmark_cli.py schema data/synthetic_transcripts/*.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import statistics
+import time
+
+from app.core.llm_client import create_llm_client
+from app.core.metrics import metrics
+from app.core.response_formats import response_format_param, build_response_format_param
+from app.models.llm_schemas import RESPONSE_FORMATS
+from app.services.batch_runner import iter_cases
+from app.services.pipeline import EXTRACTION_SCHEMAS, PIPELINE_MODES, ZeroHallucinationPipeline
+
+BOLD = "\033[1m"
+DIM  = "\033[2m"
+RST  = "\033[0m"
+
+TOKEN_COUNTERS = ("calls", "prompt_tokens", "completion_tokens", "cached_prompt_tokens")
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+def llm_totals() -> dict:
+    """Sums the per-stage llm.{stage}.{counter} counters across all stages."""
+    counters = metrics.snapshot()["counters"]
+    totals = dict.fromkeys(TOKEN_COUNTERS, 0)
+    for name, value in counters.items():
+        parts = name.split(".")
+        if len(parts) == 3 and parts[0] == "llm" and parts[2] in totals:
+            totals[parts[2]] += value
+    return totals
+
+
+async def run_variant(label: str, cases: list, repeat: int, run) -> dict:
+    """`run(case)` executes one consultation; cache is always bypassed so every run hits the LLM."""
+    before = llm_totals()
+    latencies = []
+    for _ in range(repeat):
+        for case in cases:
+            started = time.perf_counter()
+            await run(case)
+            latencies.append((time.perf_counter() - started) * 1000)
+    after = llm_totals()
+    n = len(latencies)
+    return {
+        "variant": label,
+        "consultations": n,
+        "latency_ms": {
+            "mean": round(statistics.mean(latencies), 1) if n else 0.0,
+            "p50": round(percentile(latencies, 0.50), 1),
+            "p95": round(percentile(latencies, 0.95), 1),
+        },
+        **{f"{k}_per_consultation": round((after[k] - before[k]) / n, 1) if n else 0.0 for k in TOKEN_COUNTERS},
+    }
+
+
+async def cmd_modes(args) -> list[dict]:
+    cases = list(iter_cases(args.inputs))
+    llm = create_llm_client()
+    pipeline = ZeroHallucinationPipeline(llm=llm)
+    results = []
+    try:
+        for mode in PIPELINE_MODES:
+            async def run(case, mode=mode):
+                await pipeline.run_consultation(case.transcript, case.metadata, case.language, bypass_cache=True, mode=mode)
+            results.append(await run_variant(mode, cases, args.repeat, run))
+    finally:
+        await llm.aclose()
+    return results
+
+
+async def cmd_schema(args) -> list[dict]:
+    """Full vs lean clinical-extraction output schema (two-call mode; the summary call is identical)."""
+    cases = list(iter_cases(args.inputs))
+    llm = create_llm_client()
+    results = []
+    try:
+        for schema in EXTRACTION_SCHEMAS:
+            pipeline = ZeroHallucinationPipeline(llm=llm, extraction_schema=schema)
+            async def run(case, pipeline=pipeline):
+                await pipeline.run_consultation(case.transcript, case.metadata, case.language, bypass_cache=True, mode="two_call")
+            results.append(await run_variant(schema, cases, args.repeat, run))
+    finally:
+        await llm.aclose()
+    return results
+
+
+async def cmd_formats(args) -> list[dict]:
+    """CPU per call spent on the structured-output request parameter: SDK rebuild vs precomputed."""
+    def per_call_us(build, response_format) -> float:
+        started = time.process_time()
+        for _ in range(args.iterations):
+            build(response_format)
+        return round((time.process_time() - started) / args.iterations * 1e6, 1)
+
+    results = []
+    for response_format in RESPONSE_FORMATS:
+        response_format_param(response_format)
+        rebuilt = per_call_us(build_response_format_param, response_format)
+        cached = per_call_us(response_format_param, response_format)
+        results.append({"variant": response_format.__name__, "rebuilt_us": rebuilt, "cached_us": cached, "saved_us": round(rebuilt - cached, 1)})
+    return results
+
+
+COMMANDS = {"modes": cmd_modes, "schema": cmd_schema, "formats": cmd_formats}
+
+
+def print_table(results: list[dict]):
+    print(f"\n{BOLD}{'variant':<14}{'n':>4}{'mean ms':>11}{'p50 ms':>10}{'p95 ms':>10}{'calls':>8}{'prompt tok':>12}{'compl tok':>11}{'cached tok':>12}{RST}")
+    for r in results:
+        lat = r["latency_ms"]
+        print(
+            f"{r['variant']:<14}{r['consultations']:>4}{lat['mean']:>11}{lat['p50']:>10}{lat['p95']:>10}"
+            f"{r['calls_per_consultation']:>8}{r['prompt_tokens_per_consultation']:>12}"
+            f"{r['completion_tokens_per_consultation']:>11}{r['cached_prompt_tokens_per_consultation']:>12}"
+        )
+    print(f"{DIM}token and call columns are per consultation{RST}")
+    base = results[0]
+    for r in results[1:]:
+        print(
+            f"{r['variant']} vs {base['variant']}: "
+            f"p50 {_change(base['latency_ms']['p50'], r['latency_ms']['p50'])}, "
+            f"completion tokens {_change(base['completion_tokens_per_consultation'], r['completion_tokens_per_consultation'])}"
+        )
+    print()
+
+
+def print_formats_table(results: list[dict]):
+    print(f"\n{BOLD}{'response format':<34}{'rebuilt us':>12}{'cached us':>11}{'saved us':>10}{RST}")
+    for r in results:
+        print(f"{r['variant']:<34}{r['rebuilt_us']:>12}{r['cached_us']:>11}{r['saved_us']:>10}")
+    print(f"{DIM}CPU time per LLM call spent building the response_format request parameter{RST}\n")
+
+
+def _change(before: float, after: float) -> str:
+    return f"{(after - before) / before * 100:+.1f}%" if before else "n/a"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mesh pipeline benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    modes = sub.add_parser("modes", help="Two-call vs fused extraction + summary")
+    modes.add_argument("inputs", nargs="+", help="JSON / NDJSON transcript files")
+    modes.add_argument("--repeat", type=int, default=1)
+    modes.add_argument("--json", action="store_true", help="Print machine-readable results")
+
+    schema = sub.add_parser("schema", help="Full vs lean clinical extraction output schema")
+    schema.add_argument("inputs", nargs="+", help="JSON / NDJSON transcript files")
+    schema.add_argument("--repeat", type=int, default=1)
+    schema.add_argument("--json", action="store_true", help="Print machine-readable results")
+
+    formats = sub.add_parser("formats", help="Per-call CPU of rebuilt vs precomputed structured-output schemas")
+    formats.add_argument("--iterations", type=int, default=200)
+    formats.add_argument("--json", action="store_true", help="Print machine-readable results")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    results = asyncio.run(COMMANDS[args.command](args))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    elif args.command == "formats":
+        print_formats_table(results)
+    else:
+        print_table(results)
+
+
+if __name__ == "__main__":
+    main()
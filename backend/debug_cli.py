@@ -9,6 +9,7 @@ Usage:
     python debug_cli.py --patient P-10101 --db-context-only
     python debug_cli.py --run-all-tests
     python debug_cli.py --run-all-tests --verbose
+    python debug_cli.py --run-all-tests --no-cache
 """
 
 import argparse
@@ -103,6 +104,7 @@ def cmd_run_draft(
     skip_pii: bool = False,
     verbose: bool = False,
     encounter_date: Optional[str] = None,
+    bypass_cache: bool = False,
 ):
     date_str = encounter_date or datetime.utcnow().isoformat() + "Z"
     payload = {
@@ -112,6 +114,7 @@ def cmd_run_draft(
         "language": language,
         "transcript": transcript,
         "skip_pii_scrub": skip_pii,
+        "bypass_cache": bypass_cache,
     }
 
     H1("Pipeline Debug Run")
@@ -119,6 +122,7 @@ def cmd_run_draft(
     KV("Doctor", doctor_id)
     KV("Language", language)
     KV("Skip PII scrub", str(skip_pii))
+    KV("Bypass LLM cache", str(bypass_cache))
     print(f"  {DIM}Transcript ({len(transcript)} chars): {transcript[:100]}{'...' if len(transcript)>100 else ''}{RST}")
     SEP()
     print(f"  {DIM}Calling POST /api/v1/debug/run-draft ...{RST}", flush=True)
@@ -336,7 +340,7 @@ TEST_CASES = [
 ]
 
 
-def cmd_run_all_tests(base_url: str, doctor_id: str = "D-99", verbose: bool = False):
+def cmd_run_all_tests(base_url: str, doctor_id: str = "D-99", verbose: bool = False, bypass_cache: bool = False):
     H1("Automated Pipeline Test Suite")
     print(f"  {len(TEST_CASES)} test cases | backend: {base_url}")
     SEP()
@@ -364,6 +368,7 @@ def cmd_run_all_tests(base_url: str, doctor_id: str = "D-99", verbose: bool = Fa
                 "language": lang,
                 "transcript": transcript,
                 "skip_pii_scrub": False,
+                "bypass_cache": bypass_cache,
             }
             r = post_json(base_url, "/api/v1/debug/run-draft", payload)
 
@@ -451,6 +456,7 @@ def main():
     parser.add_argument("--file", help="Path to a .txt file containing the transcript")
     parser.add_argument("--skip-pii", action="store_true")
     parser.add_argument("--verbose", "-v", action="store_true")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the backend LLM result cache")
     parser.add_argument("--db-context-only", action="store_true")
     parser.add_argument("--run-all-tests", action="store_true")
 
@@ -458,7 +464,7 @@ def main():
     base_url = args.base_url.rstrip("/")
 
     if args.run_all_tests:
-        cmd_run_all_tests(base_url, doctor_id=args.doctor, verbose=args.verbose)
+        cmd_run_all_tests(base_url, doctor_id=args.doctor, verbose=args.verbose, bypass_cache=args.no_cache)
         return
 
     if args.db_context_only:
@@ -482,6 +488,7 @@ def main():
         language=args.language,
         skip_pii=args.skip_pii,
         verbose=args.verbose,
+        bypass_cache=args.no_cache,
     )
 
 
@@ -0,0 +1,53 @@
+import asyncio
+import time
+import pytest
+from app.services.pipeline import ZeroHallucinationPipeline
+from app.models.llm_schemas import ClinicalExtractionThoughtProcess, ClinicalReport, DiagnosticResult, PatientSummary
+
+class SlowAsyncLLM:
+    """Stand-in for AsyncLLMClient: every call costs `delay` seconds of awaited (non-blocking) I/O."""
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    async def parse_completion(self, messages, response_format, max_tokens=0, usage=None):
+        await asyncio.sleep(self.delay)
+        if response_format is ClinicalExtractionThoughtProcess:
+            return ClinicalExtractionThoughtProcess(
+                negation_check="None.",
+                attribution_check="Patient.",
+                final_validated_clinical_report=ClinicalReport(
+                    chief_complaints=[
+                        DiagnosticResult(
+                            finding="cough",
+                            condition_status="CONFIRMED",
+                            subject="PATIENT",
+                            exact_quote="dry cough",
+                            contextual_quote="I have a dry cough",
+                        )
+                    ],
+                    assessments=[],
+                    actionables=[]
+                )
+            )
+        return PatientSummary(layman_explanation="You have a cough.", actionables=[])
+
+@pytest.mark.asyncio
+async def test_concurrent_consultations_do_not_serialize():
+    """
+    Two LLM round-trips per consultation at 0.2s each: ten consultations in flight must
+    finish in roughly one consultation's wall-clock time, proving the pipeline never blocks the loop.
+    """
+    pipeline = ZeroHallucinationPipeline(llm=SlowAsyncLLM(delay=0.2))
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*[
+        pipeline.run_consultation("I have a dry cough.", metadata_context={}, language="en")
+        for _ in range(10)
+    ])
+    elapsed = time.perf_counter() - start
+
+    assert len(results) == 10
+    clinical, patient, _ = results[0]
+    assert clinical["chief_complaints"][0]["exact_quote"] == "dry cough"
+    assert patient["layman_explanation"] == "You have a cough."
+    assert elapsed < 2.0
@@ -0,0 +1,68 @@
+import asyncio
+import glob
+import json
+import os
+import pytest
+from app.services.batch_runner import BatchRunner, iter_cases
+
+CORPUS = sorted(glob.glob(os.path.join(os.path.dirname(__file__), "..", "data", "synthetic_transcripts", "*.json")))
+
+class CountingPipeline:
+    """Stand-in for ZeroHallucinationPipeline; fails the ids in `fail`, tracks peak concurrency."""
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.calls = []
+        self.in_flight = 0
+        self.peak = 0
+
+    async def run_consultation(self, raw_transcript, metadata_context, language="en", bypass_cache=False, timer=None, mode=None):
+        self.calls.append(metadata_context.get("patient_id"))
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.02)
+        self.in_flight -= 1
+        if metadata_context.get("patient_id") in self.fail:
+            raise RuntimeError("upstream 500")
+        return {"chief_complaints": []}, {"layman_explanation": raw_transcript[:10]}, {}
+
+def test_iter_cases_streams_json_and_ndjson(tmp_path):
+    ndjson = tmp_path / "extra.ndjson"
+    ndjson.write_text('{"id": "x1", "transcript": "a", "language": "hu"}\n\n{"transcript": "b"}\n')
+    cases = list(iter_cases(CORPUS + [str(ndjson)]))
+
+    assert [c.case_id for c in cases] == [os.path.splitext(os.path.basename(p))[0] for p in CORPUS] + ["x1", "extra#3"]
+    assert cases[0].metadata["patient_id"] == "P-10101"
+    assert cases[-2].language == "hu" and cases[-1].language == "en"
+
+@pytest.mark.asyncio
+async def test_interrupted_run_resumes_and_retries_failures(tmp_path):
+    output = tmp_path / "run.ndjson"
+    first = CountingPipeline(fail={"P-10101"})
+    summary = await BatchRunner(first, str(output), concurrency=2).run(iter_cases(CORPUS))
+
+    assert summary["processed"] == 3 and summary["failed"] == 1
+    assert first.peak <= 2
+    with open(output, "a") as f:
+        f.write('{"id": "torn')  # simulate a kill mid-write
+
+    second = CountingPipeline()
+    summary = await BatchRunner(second, str(output), concurrency=2).run(iter_cases(CORPUS))
+
+    assert second.calls == ["P-10101"]  # only the failed case is redone
+    assert summary["skipped"] == 2 and summary["succeeded"] == 1
+    assert summary["throughput_per_min"] > 0
+    records = [json.loads(line) for line in open(output) if line.strip().endswith("}")]
+    assert sorted(r["id"] for r in records if r["status"] == "ok") == sorted(os.path.splitext(os.path.basename(p))[0] for p in CORPUS)
+    assert all("timings" in r and "latency_ms" in r for r in records)
+
+@pytest.mark.asyncio
+async def test_malformed_input_lets_queued_cases_finish_then_raises(tmp_path):
+    corpus = tmp_path / "cases.ndjson"
+    corpus.write_text('{"id": "a", "transcript": "first"}\n{"id": "b", "transcript": "second"}\n{"id": "c", "transcr\n')
+    output = tmp_path / "run.ndjson"
+
+    with pytest.raises(json.JSONDecodeError):
+        await BatchRunner(CountingPipeline(), str(output), concurrency=2).run(iter_cases([str(corpus)]))
+
+    records = [json.loads(line) for line in open(output) if line.strip()]
+    assert sorted((r["id"], r["status"]) for r in records) == [("a", "ok"), ("b", "ok")]
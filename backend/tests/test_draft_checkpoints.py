@@ -0,0 +1,104 @@
+import pytest
+from unittest.mock import patch
+from app.core.metrics import StageTimer
+from app.models.llm_schemas import ClinicalExtractionThoughtProcess, ClinicalReport, PatientSummary
+from app.services.checkpoints import DraftCheckpointStore
+from app.services.orchestrator import OrchestratorService
+from app.services.pipeline import ZeroHallucinationPipeline
+
+class FlakySummaryLLM:
+    """Counts calls per response format; the patient summary fails `summary_failures` times."""
+    def __init__(self, summary_failures: int):
+        self.summary_failures = summary_failures
+        self.calls = {"extraction": 0, "summary": 0}
+
+    async def parse_completion(self, messages, response_format, max_tokens=0, usage=None):
+        if response_format is ClinicalExtractionThoughtProcess:
+            self.calls["extraction"] += 1
+            return ClinicalExtractionThoughtProcess(
+                negation_check="None.",
+                attribution_check="Patient.",
+                final_validated_clinical_report=ClinicalReport(chief_complaints=[], assessments=[], actionables=[])
+            )
+        self.calls["summary"] += 1
+        if self.summary_failures:
+            self.summary_failures -= 1
+            raise RuntimeError("summary deployment down")
+        return PatientSummary(layman_explanation="All good.", actionables=[])
+
+def _context(db, patient_id, doctor_id, encounter_date):
+    return {"patient_id": patient_id, "context_documents": [], "available_doctor_categories": []}
+
+async def _draft(orchestrator: OrchestratorService, transcriptions: list, draft_key: str = "draft-1"):
+    def transcribe(path, stop_event=None):
+        transcriptions.append(path)
+        return ["[Guest-1]: Feeling fine."]
+
+    with patch("app.services.orchestrator.transcribe_file_with_diarization", transcribe), \
+         patch.object(OrchestratorService, "load_encounter_context", staticmethod(_context)):
+        return await orchestrator.generate_draft(
+            audio_file_path="/tmp/none.wav", db=None, patient_id="P-001", doctor_id="D-99",
+            encounter_date="2026-02-28", timer=StageTimer(), checkpoint=orchestrator.draft_checkpoint(draft_key)
+        )
+
+@pytest.mark.asyncio
+async def test_retry_after_failed_summary_resumes_without_rerunning_earlier_stages():
+    llm = FlakySummaryLLM(summary_failures=1)
+    store = DraftCheckpointStore(path="")
+    orchestrator = OrchestratorService(pipeline=ZeroHallucinationPipeline(llm=llm), checkpoints=store)
+    transcriptions = []
+
+    with pytest.raises(RuntimeError):
+        await _draft(orchestrator, transcriptions)
+    assert store.get("draft-1", "transcript") == "[Guest-1]: Feeling fine."
+    assert store.get("draft-1", "extraction") is not None and store.get("draft-1", "validated") is not None
+
+    with patch("app.services.scrubber.scrubber.scrub", side_effect=AssertionError("scrub re-run")):
+        _, patient, _, _ = await _draft(orchestrator, transcriptions)
+
+    assert patient["layman_explanation"] == "All good."
+    assert len(transcriptions) == 1
+    assert llm.calls == {"extraction": 1, "summary": 2}
+    # A completed draft keeps nothing behind
+    assert store.get("draft-1", "transcript") is None
+
+def test_checkpoints_are_per_draft_and_expire():
+    store = DraftCheckpointStore(path="", ttl_seconds=60)
+    store.put("a", "transcript", "hello")
+    assert store.get("b", "transcript") is None
+    assert store.draft("a").load("transcript") == "hello"
+
+    store.ttl_seconds = 0
+    assert store.get("a", "transcript") is None
+    store.close()
+
+def test_expired_checkpoints_are_purged_on_read_and_on_startup(tmp_path):
+    path = str(tmp_path / "checkpoints.db")
+    store = DraftCheckpointStore(path=path, ttl_seconds=60)
+    store.put("a", "transcript", "hello")
+    store.put("b", "scrub", {"[PERSON_1]": "Smith"})
+    store._conn.execute("UPDATE draft_checkpoints SET created_at = created_at - 120 WHERE draft_id = 'a'")
+    store._conn.commit()
+
+    assert store.get("b", "scrub") == {"[PERSON_1]": "Smith"}
+    assert store._conn.execute("SELECT draft_id FROM draft_checkpoints").fetchall() == [("b",)]
+    store._conn.execute("UPDATE draft_checkpoints SET created_at = created_at - 120")
+    store._conn.commit()
+    store.close()
+
+    reopened = DraftCheckpointStore(path=path, ttl_seconds=60)
+    assert reopened._conn.execute("SELECT COUNT(*) FROM draft_checkpoints").fetchone() == (0,)
+    reopened.close()
+
+@pytest.mark.asyncio
+async def test_checkpointing_off_runs_every_stage_again():
+    llm = FlakySummaryLLM(summary_failures=1)
+    orchestrator = OrchestratorService(pipeline=ZeroHallucinationPipeline(llm=llm))
+    transcriptions = []
+
+    with pytest.raises(RuntimeError):
+        await _draft(orchestrator, transcriptions)
+    await _draft(orchestrator, transcriptions)
+
+    assert len(transcriptions) == 2
+    assert llm.calls == {"extraction": 2, "summary": 2}
@@ -0,0 +1,86 @@
+import time
+import pytest
+from unittest.mock import patch
+from app.services.orchestrator import OrchestratorService
+from app.services.pipeline import ZeroHallucinationPipeline
+from app.core.metrics import StageTimer
+from app.models.llm_schemas import ClinicalExtractionThoughtProcess, ClinicalReport, PatientSummary
+
+class InstantLLM:
+    async def parse_completion(self, messages, response_format, max_tokens=0, usage=None):
+        if response_format is ClinicalExtractionThoughtProcess:
+            return ClinicalExtractionThoughtProcess(
+                negation_check="None.",
+                attribution_check="Patient.",
+                final_validated_clinical_report=ClinicalReport(chief_complaints=[], assessments=[], actionables=[])
+            )
+        return PatientSummary(layman_explanation="All good.", actionables=[])
+
+def _slow_transcription(path, stop_event=None):
+    time.sleep(0.3)
+    return ["[Guest-1]: Feeling fine."]
+
+def _slow_context(db, patient_id, doctor_id, encounter_date):
+    time.sleep(0.3)
+    return {"patient_id": patient_id, "context_documents": [], "available_doctor_categories": []}
+
+@pytest.mark.asyncio
+async def test_db_context_and_transcription_overlap():
+    """Two 0.3s independent stages must cost ~0.3s of wall clock, and every stage must be reported."""
+    orchestrator = OrchestratorService(pipeline=ZeroHallucinationPipeline(llm=InstantLLM()))
+    timer = StageTimer()
+
+    with patch("app.services.orchestrator.transcribe_file_with_diarization", _slow_transcription), \
+         patch.object(OrchestratorService, "load_encounter_context", staticmethod(_slow_context)):
+        start = time.perf_counter()
+        clinical, patient, _, meta = await orchestrator.generate_draft(
+            audio_file_path="/tmp/none.wav", db=None, patient_id="P-001", doctor_id="D-99",
+            encounter_date="2026-02-28", timer=timer
+        )
+        elapsed = time.perf_counter() - start
+
+    assert patient["layman_explanation"] == "All good."
+    assert elapsed < 0.55
+    report = timer.report()
+    for stage in ("db_context", "transcription", "scrubber_warmup", "scrub", "clinical_extraction", "patient_summary"):
+        assert stage in report["stage_timings_ms"]
+    assert report["overlap_saved_ms"] > 100
+
+@pytest.mark.asyncio
+async def test_failed_transcription_waits_for_the_db_load():
+    """The request-scoped Session must not be closed while the context load is still using it."""
+    orchestrator = OrchestratorService(pipeline=ZeroHallucinationPipeline(llm=InstantLLM()))
+    loaded = []
+
+    def failing_transcription(path, stop_event=None):
+        raise RuntimeError("speech service down")
+
+    def context(db, patient_id, doctor_id, encounter_date):
+        time.sleep(0.2)
+        loaded.append(patient_id)
+        return {"patient_id": patient_id, "context_documents": [], "available_doctor_categories": []}
+
+    with patch("app.services.orchestrator.transcribe_file_with_diarization", failing_transcription), \
+         patch.object(OrchestratorService, "load_encounter_context", staticmethod(context)):
+        with pytest.raises(ValueError):
+            await orchestrator.generate_draft(
+                audio_file_path="/tmp/none.wav", db=None, patient_id="P-001", doctor_id="D-99",
+                encounter_date="2026-02-28", timer=StageTimer()
+            )
+        assert loaded == ["P-001"]
+
+@pytest.mark.asyncio
+async def test_stream_draft_awaits_warmup_when_transcription_fails(monkeypatch):
+    orchestrator = OrchestratorService(pipeline=ZeroHallucinationPipeline(llm=InstantLLM()))
+    warmed = []
+    monkeypatch.setattr("app.services.orchestrator.scrubber.warm_up", lambda: time.sleep(0.1) or warmed.append(True))
+
+    def failing_transcription(path, stop_event=None):
+        raise RuntimeError("speech service down")
+
+    with patch("app.services.orchestrator.transcribe_file_with_diarization", failing_transcription):
+        events = orchestrator.stream_draft("/tmp/none.wav", {"patient_id": "P-001"})
+        assert (await anext(events))[0] == "metadata"
+        with pytest.raises(ValueError):
+            await anext(events)
+        assert warmed == [True]
@@ -0,0 +1,60 @@
+import glob
+import json
+import os
+import pytest
+from openai import InternalServerError
+from app.core.config import Config
+from app.core.fake_llm import FakeLLMClient, LatencyModel, fake_clinical_extraction
+from app.services.pipeline import ZeroHallucinationPipeline
+
+CORPUS = sorted(glob.glob(os.path.join(os.path.dirname(__file__), "..", "data", "synthetic_transcripts", "*.json")))
+
+def _case(path):
+    with open(path) as f:
+        return json.load(f)
+
+@pytest.mark.parametrize("path", CORPUS, ids=os.path.basename)
+def test_fake_extraction_quotes_survive_guardrail(path):
+    transcript = _case(path)["transcript"]
+    report = fake_clinical_extraction(transcript)
+    items = report.final_validated_clinical_report.model_dump()
+
+    validated = ZeroHallucinationPipeline(llm=None).validate_quotes(report, transcript)
+
+    assert items["chief_complaints"] and items["actionables"]
+    assert validated == items  # nothing stripped: every quote is a real substring
+    for item in items["chief_complaints"] + items["assessments"] + items["actionables"]:
+        assert item["exact_quote"] in item["contextual_quote"]
+
+@pytest.mark.asyncio
+async def test_fake_backend_runs_full_consultation():
+    case = _case(CORPUS[0])
+    llm = FakeLLMClient(latency=LatencyModel(kind="fixed", seconds=0.01))
+    pipeline = ZeroHallucinationPipeline(llm=llm)
+
+    clinical, patient, _ = await pipeline.run_consultation(case["transcript"], case["metadata"])
+
+    assert clinical["actionables"]
+    assert patient["actionables"] == clinical["actionables"]
+    assert patient["layman_explanation"].startswith("During your visit")
+
+def test_latency_models_are_deterministic(tmp_path):
+    first, second = LatencyModel(kind="lognormal", seconds=2.0, seed=7), LatencyModel(kind="lognormal", seconds=2.0, seed=7)
+    samples = [first.sample() for _ in range(5)]
+    assert samples == [second.sample() for _ in range(5)]
+    assert all(s > 0 for s in samples) and len(set(samples)) == 5
+
+    replay = tmp_path / "latencies.txt"
+    replay.write_text("0.5\n1.5\n\n")
+    model = LatencyModel(kind="replay", replay_file=str(replay))
+    assert [model.sample() for _ in range(3)] == [0.5, 1.5, 0.5]
+
+@pytest.mark.asyncio
+async def test_injected_errors_go_through_retries(monkeypatch):
+    monkeypatch.setattr(Config, "LLM_RETRY_MAX_ATTEMPTS", 2)
+    monkeypatch.setattr(Config, "LLM_RETRY_BASE_DELAY_SECONDS", 0.0)
+    llm = FakeLLMClient(latency=LatencyModel(kind="fixed", seconds=0.0), error_rate=1.0)
+    pipeline = ZeroHallucinationPipeline(llm=llm)
+
+    with pytest.raises(InternalServerError):
+        await pipeline.run_consultation("Patient: I have a cough.", {})
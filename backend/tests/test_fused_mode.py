@@ -0,0 +1,65 @@
+import pytest
+from app.core.fake_llm import FakeLLMClient, LatencyModel
+from app.models.llm_schemas import ActionableItem, ClinicalReport, FusedConsultation, PatientSummary
+from app.services.guardrail import QuoteGuardrail
+from app.services.pipeline import ZeroHallucinationPipeline
+
+TRANSCRIPT = (
+    "Patient: My knee has been swelling after runs and there is a sharp pain.\n\n"
+    "Doctor: I'm prescribing Naproxen 500 mg twice daily. Please schedule a follow-up in two weeks."
+)
+
+class CountingFake(FakeLLMClient):
+    def __init__(self):
+        super().__init__(latency=LatencyModel(kind="fixed", seconds=0.0))
+        self.calls = 0
+
+    async def parse_completion(self, *args, **kwargs):
+        self.calls += 1
+        return await super().parse_completion(*args, **kwargs)
+
+@pytest.mark.asyncio
+async def test_fused_mode_matches_two_call_report_in_one_call():
+    two_call_llm, fused_llm = CountingFake(), CountingFake()
+    two_call = await ZeroHallucinationPipeline(llm=two_call_llm).run_consultation(TRANSCRIPT, {}, mode="two_call")
+    fused = await ZeroHallucinationPipeline(llm=fused_llm).run_consultation(TRANSCRIPT, {}, mode="fused")
+
+    assert (two_call_llm.calls, fused_llm.calls) == (2, 1)
+    assert fused[0] == two_call[0]
+    assert fused[1]["actionables"] == fused[0]["actionables"]
+
+def test_fused_guardrail_strips_summary_actionables_without_validated_source():
+    real = ActionableItem(action_type="FOLLOW_UP_APPT", description="Follow-up", exact_quote="schedule a follow-up", contextual_quote="Please schedule a follow-up in two weeks.")
+    invented = ActionableItem(action_type="LAB_TEST", description="MRI", exact_quote="order an MRI", contextual_quote="order an MRI")
+    fused = FusedConsultation(
+        negation_check="None.",
+        attribution_check="Patient.",
+        final_validated_clinical_report=ClinicalReport(chief_complaints=[], assessments=[], actionables=[real, invented]),
+        patient_summary=PatientSummary(layman_explanation="See you in two weeks.", actionables=[real, invented])
+    )
+
+    clinical, summary = ZeroHallucinationPipeline(llm=None).validate_fused(fused, TRANSCRIPT)
+
+    assert [a["exact_quote"] for a in clinical["actionables"]] == ["schedule a follow-up"]
+    assert [a["exact_quote"] for a in summary["actionables"]] == ["schedule a follow-up"]
+
+def test_fused_summary_keeps_actionables_whose_quote_the_guardrail_rewrote():
+    written = ActionableItem(action_type="PHARMACY_PICKUP", description="Naproxen", exact_quote="prescribing naproxen 500 mg  twice daily", contextual_quote="x")
+    fused = FusedConsultation(
+        negation_check="None.",
+        attribution_check="Patient.",
+        final_validated_clinical_report=ClinicalReport(chief_complaints=[], assessments=[], actionables=[written]),
+        patient_summary=PatientSummary(layman_explanation="Take Naproxen.", actionables=[written])
+    )
+    pipeline = ZeroHallucinationPipeline(llm=None)
+    pipeline.guardrail = QuoteGuardrail(normalize=True, fuzzy=False)
+
+    clinical, summary = pipeline.validate_fused(fused, TRANSCRIPT)
+
+    assert [a["exact_quote"] for a in clinical["actionables"]] == ["prescribing Naproxen 500 mg twice daily"]
+    assert [a["exact_quote"] for a in summary["actionables"]] == ["prescribing Naproxen 500 mg twice daily"]
+
+@pytest.mark.asyncio
+async def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        await ZeroHallucinationPipeline(llm=None).run_consultation(TRANSCRIPT, {}, mode="triple")
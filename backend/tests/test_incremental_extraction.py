@@ -0,0 +1,122 @@
+import asyncio
+import re
+from types import SimpleNamespace
+from unittest.mock import patch
+import pytest
+from app.core.config import Config
+from app.core.fake_llm import FakeLLMClient, LatencyModel
+from app.services.chunking import last_turn_start
+from app.services.incremental import merge_incremental
+from app.services.orchestrator import OrchestratorService
+from app.services.pipeline import ZeroHallucinationPipeline
+from app.services.scrubber import ContentScrubber
+
+PART_1 = "Doctor: What brings you in?\n\nPatient: I have had a dry cough for a week"
+PART_2 = " and a mild fever since Sunday.\n\nDoctor: I'm prescribing Amoxicillin 500 mg three times daily."
+
+class RecordingFake(FakeLLMClient):
+    def __init__(self):
+        super().__init__(latency=LatencyModel(kind="fixed", seconds=0.0))
+        self.transcripts = []
+
+    async def parse_completion(self, messages, response_format, max_tokens=0, usage=None):
+        self.transcripts.append(messages[-1]["content"])
+        return await super().parse_completion(messages, response_format, max_tokens=max_tokens, usage=usage)
+
+@pytest.mark.asyncio
+async def test_appended_text_is_extracted_incrementally_and_merged():
+    llm = RecordingFake()
+    pipeline = ZeroHallucinationPipeline(llm=llm)
+
+    first = await pipeline.extract_incremental(PART_1, system_context="{}")
+    second = await pipeline.extract_incremental(PART_1 + PART_2, system_context="{}", state=first)
+
+    assert (first.last_update, second.last_update) == ("full", "incremental")
+    # Only the unfinished patient turn and the new doctor turn are re-sent.
+    assert llm.transcripts[1] == "Transcript: " + "Patient: I have had a dry cough for a week" + PART_2
+    assert [c["finding"] for c in second.report["chief_complaints"]] == ["cough"]
+    assert [a["action_type"] for a in second.report["actionables"]] == ["PHARMACY_PICKUP"]
+    for item in second.report["chief_complaints"] + second.report["actionables"]:
+        assert item["exact_quote"] in second.scrubbed_transcript
+
+    unchanged = await pipeline.extract_incremental(PART_1 + PART_2, system_context="{}", state=second)
+    assert unchanged.last_update == "unchanged" and len(llm.transcripts) == 2
+
+@pytest.mark.asyncio
+async def test_edited_prefix_falls_back_to_full_extraction():
+    pipeline = ZeroHallucinationPipeline(llm=RecordingFake())
+    first = await pipeline.extract_incremental(PART_1, system_context="{}")
+    edited = await pipeline.extract_incremental(PART_1.replace("dry", "wet") + PART_2, system_context="{}", state=first)
+    assert edited.last_update == "full"
+
+def test_newer_status_supersedes_prior_finding():
+    prior = {"chief_complaints": [{"finding": "Chest pain", "condition_status": "CONFIRMED", "subject": "PATIENT", "exact_quote": "chest pain"},
+                                  {"finding": "cough", "condition_status": "CONFIRMED", "subject": "PATIENT", "exact_quote": "cough"}],
+             "assessments": [], "actionables": []}
+    new = {"chief_complaints": [{"finding": "chest pain", "condition_status": "NEGATED", "subject": "PATIENT", "exact_quote": "no chest pain"}],
+           "assessments": [], "actionables": []}
+    merged = merge_incremental(prior, new)
+    assert [(c["finding"], c["condition_status"]) for c in merged["chief_complaints"]] == [("cough", "CONFIRMED"), ("chest pain", "NEGATED")]
+
+class NameAnalyzer:
+    """Presidio stand-in: capitalised words after 'Dr.' or 'Mr.' are PERSON entities."""
+    def analyze(self, text, entities, language):
+        return [SimpleNamespace(start=m.start(1), end=m.end(1), entity_type="PERSON") for m in re.finditer(r"(?:Dr\.|Mr\.) ([A-Z]\w+)", text)]
+
+def test_scrub_continues_an_existing_token_map():
+    s = ContentScrubber.__new__(ContentScrubber)
+    s.analyzer, s.anonymizer = NameAnalyzer(), object()
+
+    first, token_map = s.scrub("Mr. Smith saw Dr. Jones.")
+    second, token_map = s.scrub(" Dr. Jones then called Mr. Brown.", token_map)
+
+    assert second == f" Dr. {[t for t, v in token_map.items() if v == 'Jones'][0]} then called Mr. [PERSON_3]."
+    assert token_map["[PERSON_3]"] == "Brown" and len(token_map) == 3
+
+@pytest.mark.asyncio
+async def test_unlabeled_transcript_resends_only_a_bounded_overlap(monkeypatch):
+    monkeypatch.setattr(Config, "INCREMENTAL_OVERLAP_CHARS", 100)
+    llm = RecordingFake()
+    pipeline = ZeroHallucinationPipeline(llm=llm)
+    dictation = " ".join(f"I have had a dry cough for {i} days." for i in range(40))
+    appended = " I also have a mild fever since Sunday."
+
+    first = await pipeline.extract_incremental(dictation, system_context="{}")
+    second = await pipeline.extract_incremental(dictation + appended, system_context="{}", state=first)
+
+    assert second.last_update == "incremental"
+    segment = llm.transcripts[1].removeprefix("Transcript: ")
+    assert segment.endswith(appended) and len(segment) < 100 + len(appended) + 40
+    assert second.scrubbed_transcript.endswith(segment)
+
+def test_prose_with_colons_is_not_a_speaker_turn():
+    assert last_turn_start("so I said: it hurts. The plan is: rest.") is None
+    assert last_turn_start("Doctor: Hi.\n\nDr. Sarah Miller: So I said: rest.") == len("Doctor: Hi.\n\n")
+
+@pytest.mark.asyncio
+async def test_name_split_across_appends_is_scrubbed_whole(monkeypatch):
+    s = ContentScrubber.__new__(ContentScrubber)
+    s.analyzer, s.anonymizer = NameAnalyzer(), object()
+    monkeypatch.setattr("app.services.pipeline.scrubber", s)
+    llm = RecordingFake()
+    pipeline = ZeroHallucinationPipeline(llm=llm)
+
+    first = await pipeline.extract_incremental("Patient: I was referred by Mr. Smi", system_context="{}")
+    second = await pipeline.extract_incremental("Patient: I was referred by Mr. Smith yesterday.", system_context="{}", state=first)
+
+    assert "Smith" not in second.scrubbed_transcript and "th yesterday" not in llm.transcripts[1]
+    assert second.token_map[second.scrubbed_transcript.split("Mr. ")[1].split(" ")[0]] == "Smith"
+
+@pytest.mark.asyncio
+async def test_concurrent_appends_to_one_session_are_serialized():
+    orchestrator = OrchestratorService(pipeline=ZeroHallucinationPipeline(llm=FakeLLMClient(latency=LatencyModel(kind="fixed", seconds=0.05))))
+    context = {"patient_id": "P-001", "context_documents": [], "available_doctor_categories": []}
+
+    with patch.object(OrchestratorService, "load_encounter_context", staticmethod(lambda *args: context)):
+        results = await asyncio.gather(*[
+            orchestrator.generate_incremental_draft("s-1", None, "P-001", "D-99", "2026-02-28", transcript)
+            for transcript in (PART_1, PART_1 + PART_2)
+        ])
+
+    assert [state.last_update for _, _, state, _ in results] == ["full", "incremental"]
+    assert not orchestrator.incremental_sessions._session_locks
@@ -0,0 +1,47 @@
+import glob
+import json
+import os
+import pytest
+from app.core.fake_llm import FakeLLMClient, LatencyModel, fake_clinical_extraction, fake_lean_extraction
+from app.core.metrics import metrics
+from app.services.guardrail import contextual_window
+from app.services.pipeline import ZeroHallucinationPipeline
+
+CORPUS = sorted(glob.glob(os.path.join(os.path.dirname(__file__), "..", "data", "synthetic_transcripts", "*.json")))
+
+def _without_context(items):
+    return [{k: v for k, v in item.items() if k != "contextual_quote"} for item in items]
+
+def _transcript(path):
+    with open(path) as f:
+        return json.load(f)["transcript"]
+
+@pytest.mark.parametrize("path", CORPUS, ids=os.path.basename)
+def test_lean_output_expands_to_the_same_report(path):
+    transcript = _transcript(path)
+    full = fake_clinical_extraction(transcript).final_validated_clinical_report.model_dump()
+    lean = fake_lean_extraction(transcript)
+
+    expanded = lean.expand(lambda quote: contextual_window(transcript, quote)).final_validated_clinical_report.model_dump()
+
+    for section in ("chief_complaints", "assessments", "actionables"):
+        assert _without_context(expanded[section]) == _without_context(full[section])
+        for item in expanded[section]:
+            assert item["exact_quote"] in item["contextual_quote"] and item["contextual_quote"] in transcript
+    assert len(lean.model_dump_json()) < len(fake_clinical_extraction(transcript).model_dump_json())
+
+@pytest.mark.asyncio
+async def test_lean_schema_pipeline_returns_full_report():
+    llm = FakeLLMClient(latency=LatencyModel(kind="fixed", seconds=0.0))
+    pipeline = ZeroHallucinationPipeline(llm=llm, extraction_schema="lean")
+    calls_before = metrics.counter("llm.clinical_extraction_lean.calls")
+
+    clinical, patient, _ = await pipeline.run_consultation(_transcript(CORPUS[0]), {}, mode="two_call")
+
+    assert clinical["chief_complaints"] and all(c["contextual_quote"] for c in clinical["chief_complaints"])
+    assert patient["layman_explanation"]
+    assert metrics.counter("llm.clinical_extraction_lean.calls") == calls_before + 1
+
+def test_unknown_extraction_schema_is_rejected():
+    with pytest.raises(ValueError):
+        ZeroHallucinationPipeline(llm=None, extraction_schema="tiny")
@@ -0,0 +1,298 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from pydantic import BaseModel
+
+from app.core import response_formats
+from app.core.config import Config
+from app.core.endpoint_pool import EndpointPool, PoolEndpoint
+from app.core.llm_client import AsyncLLMClient
+from app.core.rate_limiter import RateLimitExceededError
+from app.core.resilience import CircuitOpenError, ResilientCaller
+from app.models.llm_schemas import RESPONSE_FORMATS
+
+class Echo(BaseModel):
+    text: str
+
+def _completion(text: str) -> bytes:
+    return json.dumps({
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "gpt-4o",
+        "choices": [{
+            "index": 0,
+            "finish_reason": "stop",
+            "message": {"role": "assistant", "content": json.dumps({"text": text})}
+        }],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}
+    }).encode()
+
+class StubEndpoint:
+    """Local Azure OpenAI stand-in. Each request consumes the next scripted (status, headers, delay) step."""
+    def __init__(self, script):
+        self.script = list(script)
+        self.requests = 0
+        lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with lock:
+                    n = stub.requests
+                    stub.requests += 1
+                status, headers, delay = stub.script[min(n, len(stub.script) - 1)]
+                time.sleep(delay)
+                body = _completion(f"reply-{n}") if status == 200 else b'{"error": {"message": "stub failure"}}'
+                try:
+                    self.send_response(status)
+                    for k, v in {"Content-Type": "application/json", **headers}.items():
+                        self.send_header(k, v)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            request_queue_size = 64  # concurrent pool tests connect in bursts
+
+        self.server = Server(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+@pytest.fixture
+def fast_resilience(monkeypatch):
+    monkeypatch.setattr(Config, "KEY", "stub-key")
+    monkeypatch.setattr(Config, "LLM_RETRY_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(Config, "LLM_RETRY_BASE_DELAY_SECONDS", 0.01)
+    monkeypatch.setattr(Config, "LLM_RETRY_MAX_DELAY_SECONDS", 1.0)
+    monkeypatch.setattr(Config, "LLM_CIRCUIT_FAILURE_THRESHOLD", 3)
+    monkeypatch.setattr(Config, "LLM_CIRCUIT_RESET_SECONDS", 60)
+    monkeypatch.setattr(Config, "LLM_HEDGE_ENABLED", False)
+
+def _client(monkeypatch, stub: StubEndpoint) -> AsyncLLMClient:
+    monkeypatch.setattr(Config, "ENDPOINT", stub.url)
+    return AsyncLLMClient()
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+@pytest.mark.asyncio
+async def test_retries_transient_errors_and_honours_retry_after(monkeypatch, fast_resilience):
+    script = [(429, {"retry-after": "0.3"}, 0), (503, {}, 0), (200, {}, 0)]
+    with StubEndpoint(script) as stub:
+        llm = _client(monkeypatch, stub)
+        start = time.perf_counter()
+        result = await llm.parse_completion(MESSAGES, Echo)
+        elapsed = time.perf_counter() - start
+        await llm.aclose()
+
+    assert result.text == "reply-2"
+    assert stub.requests == 3
+    assert elapsed >= 0.3
+
+@pytest.mark.asyncio
+async def test_non_transient_errors_are_not_retried(monkeypatch, fast_resilience):
+    with StubEndpoint([(400, {}, 0)]) as stub:
+        llm = _client(monkeypatch, stub)
+        with pytest.raises(Exception):
+            await llm.parse_completion(MESSAGES, Echo)
+        await llm.aclose()
+    assert stub.requests == 1
+    assert llm.resilience.breaker.state == "closed"
+
+@pytest.mark.asyncio
+async def test_circuit_opens_and_fails_fast(monkeypatch, fast_resilience):
+    with StubEndpoint([(500, {}, 0)]) as stub:
+        llm = _client(monkeypatch, stub)
+        with pytest.raises(Exception):
+            await llm.parse_completion(MESSAGES, Echo)
+        assert llm.resilience.breaker.state == "open"
+
+        with pytest.raises(CircuitOpenError):
+            await llm.parse_completion(MESSAGES, Echo)
+        await llm.aclose()
+    assert stub.requests == 3  # the rejected call never reached the endpoint
+
+@pytest.mark.asyncio
+async def test_half_open_probe_closes_circuit(monkeypatch, fast_resilience):
+    monkeypatch.setattr(Config, "LLM_RETRY_MAX_ATTEMPTS", 1)
+    monkeypatch.setattr(Config, "LLM_CIRCUIT_FAILURE_THRESHOLD", 1)
+    monkeypatch.setattr(Config, "LLM_CIRCUIT_RESET_SECONDS", 0.1)
+    with StubEndpoint([(500, {}, 0), (200, {}, 0)]) as stub:
+        llm = _client(monkeypatch, stub)
+        with pytest.raises(Exception):
+            await llm.parse_completion(MESSAGES, Echo)
+        time.sleep(0.15)
+        result = await llm.parse_completion(MESSAGES, Echo)
+        await llm.aclose()
+    assert result.text == "reply-1"
+    assert llm.resilience.breaker.state == "closed"
+
+@pytest.mark.asyncio
+async def test_cancelled_half_open_probe_is_released(monkeypatch, fast_resilience):
+    monkeypatch.setattr(Config, "LLM_RETRY_MAX_ATTEMPTS", 1)
+    monkeypatch.setattr(Config, "LLM_CIRCUIT_FAILURE_THRESHOLD", 1)
+    monkeypatch.setattr(Config, "LLM_CIRCUIT_RESET_SECONDS", 0.1)
+    with StubEndpoint([(500, {}, 0), (200, {}, 2.0), (200, {}, 0)]) as stub:
+        llm = _client(monkeypatch, stub)
+        with pytest.raises(Exception):
+            await llm.parse_completion(MESSAGES, Echo)
+        time.sleep(0.15)
+        # The probe is abandoned mid-flight (client disconnect / deadline)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(llm.parse_completion(MESSAGES, Echo), timeout=0.2)
+        result = await llm.parse_completion(MESSAGES, Echo)
+        await llm.aclose()
+    assert result.text == "reply-2"
+    assert llm.resilience.breaker.state == "closed"
+
+@pytest.mark.asyncio
+async def test_non_retryable_error_of_ordinary_call_keeps_the_probe(monkeypatch, fast_resilience):
+    monkeypatch.setattr(Config, "LLM_CIRCUIT_FAILURE_THRESHOLD", 1)
+    monkeypatch.setattr(Config, "LLM_CIRCUIT_RESET_SECONDS", 0.05)
+    caller = ResilientCaller("test")
+    admitted, fail = asyncio.Event(), asyncio.Event()
+
+    async def bad_request():
+        admitted.set()
+        await fail.wait()
+        raise ValueError("400")
+
+    ordinary = asyncio.create_task(caller.call("k", bad_request, hedge=False))
+    await admitted.wait()  # admitted while closed
+    caller.breaker.record_failure()
+    time.sleep(0.06)
+    assert caller.breaker.before_call() is True  # another request now holds the half-open probe
+    fail.set()
+    with pytest.raises(ValueError):
+        await ordinary
+    with pytest.raises(CircuitOpenError):
+        caller.breaker.before_call()
+
+@pytest.mark.asyncio
+async def test_cancelled_hedged_call_cancels_primary(monkeypatch, fast_resilience):
+    monkeypatch.setattr(Config, "LLM_HEDGE_ENABLED", True)
+    monkeypatch.setattr(Config, "LLM_HEDGE_MIN_SAMPLES", 3)
+    monkeypatch.setattr(Config, "LLM_HEDGE_MIN_DELAY_SECONDS", 0.5)
+    caller = ResilientCaller("test")
+    for _ in range(3):
+        caller.latencies.observe("k", 0.5)
+    started, cancelled = asyncio.Event(), asyncio.Event()
+
+    async def slow():
+        started.set()
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    call = asyncio.create_task(caller.call("k", slow))
+    await started.wait()
+    call.cancel()  # still waiting for the hedge threshold
+    with pytest.raises(asyncio.CancelledError):
+        await call
+    await asyncio.wait_for(cancelled.wait(), timeout=1.0)
+
+@pytest.mark.asyncio
+async def test_hedged_request_beats_slow_primary(monkeypatch, fast_resilience):
+    monkeypatch.setattr(Config, "LLM_HEDGE_ENABLED", True)
+    monkeypatch.setattr(Config, "LLM_HEDGE_MIN_SAMPLES", 3)
+    monkeypatch.setattr(Config, "LLM_HEDGE_MIN_DELAY_SECONDS", 0.05)
+    # Three fast calls establish the p95; the fourth stalls and the hedge (fifth request) wins.
+    script = [(200, {}, 0.01)] * 3 + [(200, {}, 2.0), (200, {}, 0.01)]
+    with StubEndpoint(script) as stub:
+        llm = _client(monkeypatch, stub)
+        for _ in range(3):
+            await llm.parse_completion(MESSAGES, Echo)
+        start = time.perf_counter()
+        result = await llm.parse_completion(MESSAGES, Echo)
+        elapsed = time.perf_counter() - start
+        await llm.aclose()
+    assert result.text == "reply-4"
+    assert elapsed < 1.0
+
+def _pool_client(monkeypatch, *stubs: StubEndpoint) -> AsyncLLMClient:
+    monkeypatch.setattr(Config, "LLM_ENDPOINT_POOL", json.dumps([{"endpoint": s.url} for s in stubs]))
+    return AsyncLLMClient()
+
+@pytest.mark.asyncio
+async def test_pool_ejects_throttled_endpoint_and_readmits_it(monkeypatch, fast_resilience):
+    monkeypatch.setattr(Config, "LLM_POOL_EJECT_SECONDS", 0.2)
+    with StubEndpoint([(429, {}, 0), (200, {}, 0)]) as throttled, StubEndpoint([(200, {}, 0)]) as healthy:
+        llm = _pool_client(monkeypatch, throttled, healthy)
+        for _ in range(4):
+            await llm.parse_completion(MESSAGES, Echo)
+        assert throttled.requests == 1  # the 429 ejected it; the retry and later calls went to the healthy one
+
+        time.sleep(0.25)  # re-admitted, and still unmeasured, so it is tried first
+        await llm.parse_completion(MESSAGES, Echo)
+        await llm.aclose()
+    assert throttled.requests == 2
+    assert llm.resilience.breaker.state == "closed"
+
+@pytest.mark.asyncio
+async def test_pool_prefers_fast_endpoint_and_spreads_concurrent_load(monkeypatch, fast_resilience):
+    with StubEndpoint([(200, {}, 0.1)]) as slow, StubEndpoint([(200, {}, 0.01)]) as fast:
+        llm = _pool_client(monkeypatch, slow, fast)
+        for _ in range(2):  # one measured call each
+            await llm.parse_completion(MESSAGES, Echo)
+        for _ in range(5):
+            await llm.parse_completion(MESSAGES, Echo)
+        assert (slow.requests, fast.requests) == (1, 6)
+
+        await asyncio.gather(*(llm.parse_completion(MESSAGES, Echo) for _ in range(16)))
+        await llm.aclose()
+    # Queueing on the fast endpoint eventually costs more than the slow one's latency
+    assert 1 < slow.requests < fast.requests
+
+@pytest.mark.asyncio
+async def test_pool_latency_excludes_quota_wait():
+    pool = EndpointPool([PoolEndpoint(endpoint="https://a.example", api_key="k", api_version="v")])
+    endpoint = pool.endpoints[0]
+
+    async with pool.lease(lambda e: asyncio.sleep(0.2)):
+        assert endpoint.in_flight == 1
+    assert endpoint.ewma_seconds < 0.1
+
+    async def no_quota(e):
+        raise RateLimitExceededError(retry_in=1.0)
+
+    with pytest.raises(RateLimitExceededError):
+        async with pool.lease(no_quota):
+            pass
+    assert (endpoint.in_flight, endpoint.ejected_until, endpoint.ewma_seconds < 0.1) == (0, 0.0, True)
+
+@pytest.mark.asyncio
+async def test_response_format_schema_is_built_once(monkeypatch, fast_resilience):
+    builds = []
+    build = response_formats.build_response_format_param
+    monkeypatch.setattr(response_formats, "_params", {})
+    monkeypatch.setattr(response_formats, "build_response_format_param", lambda rf: builds.append(rf) or build(rf))
+    with StubEndpoint([(200, {}, 0)]) as stub:
+        llm = _client(monkeypatch, stub)
+        assert set(builds) == set(RESPONSE_FORMATS)  # precomputed at start-up
+        results = [await llm.parse_completion(MESSAGES, Echo) for _ in range(3)]
+        await llm.aclose()
+    assert [r.text for r in results] == ["reply-0", "reply-1", "reply-2"]
+    assert builds.count(Echo) == 1
@@ -0,0 +1,73 @@
+import glob
+import json
+import os
+import pytest
+import time
+from app.core import model_router
+from app.core.config import Config
+from app.core.fake_llm import FakeLLMClient, LatencyModel
+from app.core.metrics import metrics
+from app.core.model_router import ModelRouter, StageRoute, parse_stage_routes
+from app.core.resilience import CircuitOpenError
+from app.services.pipeline import ZeroHallucinationPipeline
+
+CORPUS = sorted(glob.glob(os.path.join(os.path.dirname(__file__), "..", "data", "synthetic_transcripts", "*.json")))
+
+ROUTES = {"patient_summary": StageRoute(primary="big", fallback="mini", latency_budget_seconds=1.0)}
+
+def test_parse_stage_routes():
+    routes = parse_stage_routes(json.dumps({
+        "clinical_extraction": "gpt-4o",
+        "patient_summary": {"primary": "gpt-4o", "fallback": "gpt-4o-mini", "latency_budget_seconds": 4},
+    }))
+
+    assert routes["clinical_extraction"] == StageRoute(primary="gpt-4o")
+    assert routes["patient_summary"] == StageRoute(primary="gpt-4o", fallback="gpt-4o-mini", latency_budget_seconds=4)
+    with pytest.raises(ValueError):
+        parse_stage_routes("[]")
+
+def test_slow_primary_switches_to_fallback_until_cooldown(monkeypatch):
+    monkeypatch.setattr(Config, "LLM_ROUTE_MIN_SAMPLES", 3)
+    router = ModelRouter(routes=ROUTES, default_model="default")
+
+    assert router.choose("clinical_extraction").reason == "default"
+    for seconds in (0.5, 1.5, 2.0):
+        decision = router.choose("patient_summary")
+        assert decision.model == "big"
+        router.observe(decision, seconds)
+
+    assert router.choose("patient_summary").reason == "fallback:latency"
+
+    assert router.fail_over(router.choose("patient_summary")) is None  # a failed fallback call has nowhere to go
+
+    now = time.monotonic()
+    monkeypatch.setattr(model_router.time, "monotonic", lambda: now + Config.LLM_ROUTE_COOLDOWN_SECONDS + 1)
+    decision = router.choose("patient_summary")
+    assert (decision.model, decision.reason) == ("big", "primary")
+    router.observe(decision, 5.0)  # fresh window: one slow sample is not enough
+    assert router.choose("patient_summary").model == "big"
+
+class _FlakyPrimary(FakeLLMClient):
+    async def parse_completion(self, *args, model=None, **kwargs):
+        if model == "big":
+            raise CircuitOpenError(retry_in=30.0)
+        return await super().parse_completion(*args, model=model, **kwargs)
+
+@pytest.mark.asyncio
+async def test_failed_primary_is_retried_on_fallback_and_traced():
+    llm = _FlakyPrimary(latency=LatencyModel(kind="fixed", seconds=0.0))
+    routes = {"clinical_extraction": StageRoute(primary="big", fallback="mini")}
+    pipeline = ZeroHallucinationPipeline(llm=llm, router=ModelRouter(routes=routes))
+    switched_before = metrics.counter("llm.route.clinical_extraction.switched")
+    with open(CORPUS[0]) as f:
+        transcript = json.load(f)["transcript"]
+
+    with ModelRouter.trace() as routing:
+        clinical, _, _ = await pipeline.run_consultation(transcript, {}, mode="two_call")
+
+    assert clinical["chief_complaints"]
+    assert [(d["stage"], d["model"], d["reason"]) for d in routing if d["stage"] == "clinical_extraction"] == [
+        ("clinical_extraction", "big", "primary"), ("clinical_extraction", "mini", "fallback:error")
+    ]
+    assert {"stage": "patient_summary", "model": Config.MODEL, "reason": "default"} in routing
+    assert metrics.counter("llm.route.clinical_extraction.switched") == switched_before + 1
@@ -0,0 +1,85 @@
+import asyncio
+import time
+import pytest
+from fastapi import HTTPException
+from unittest.mock import patch
+from app import main
+from app.core.metrics import StageTimer
+from app.models.llm_schemas import ClinicalExtractionThoughtProcess, ClinicalReport, PatientSummary
+from app.services.orchestrator import OrchestratorService
+from app.services.pipeline import ZeroHallucinationPipeline
+from app.services.summary_jobs import SummaryJobStore
+
+class SlowSummaryLLM:
+    """Instant extraction, `summary_delay` seconds for the patient summary (or a failure)."""
+    def __init__(self, summary_delay: float, fail: bool = False):
+        self.summary_delay = summary_delay
+        self.fail = fail
+
+    async def parse_completion(self, messages, response_format, max_tokens=0, usage=None):
+        if response_format is ClinicalExtractionThoughtProcess:
+            return ClinicalExtractionThoughtProcess(
+                negation_check="None.",
+                attribution_check="Patient.",
+                final_validated_clinical_report=ClinicalReport(chief_complaints=[], assessments=[], actionables=[])
+            )
+        await asyncio.sleep(self.summary_delay)
+        if self.fail:
+            raise RuntimeError("summary deployment down")
+        return PatientSummary(layman_explanation="All good.", actionables=[])
+
+def _context(db, patient_id, doctor_id, encounter_date):
+    return {"patient_id": patient_id, "context_documents": [], "available_doctor_categories": []}
+
+async def _progressive_draft(orchestrator: OrchestratorService, timer: StageTimer):
+    with patch("app.services.orchestrator.transcribe_file_with_diarization", lambda path, stop_event=None: ["[Guest-1]: Feeling fine."]), \
+         patch.object(OrchestratorService, "load_encounter_context", staticmethod(_context)):
+        return await orchestrator.generate_progressive_draft(
+            audio_file_path="/tmp/none.wav", db=None, patient_id="P-001", doctor_id="D-99",
+            encounter_date="2026-02-28", timer=timer
+        )
+
+@pytest.mark.asyncio
+async def test_draft_returns_before_the_summary_which_is_fetched_later(monkeypatch):
+    orchestrator = OrchestratorService(pipeline=ZeroHallucinationPipeline(llm=SlowSummaryLLM(summary_delay=0.4)))
+    monkeypatch.setattr(main.state, "orchestrator", orchestrator)
+    timer = StageTimer()
+
+    start = time.perf_counter()
+    clinical, _, meta, draft_id = await _progressive_draft(orchestrator, timer)
+    assert time.perf_counter() - start < 0.3
+    assert clinical["chief_complaints"] == [] and meta["patient_id"] == "P-001"
+    assert "patient_summary" not in timer.report()["stage_timings_ms"]
+
+    assert (await main.get_deferred_patient_summary(draft_id)).status == "pending"
+    ready = await main.get_deferred_patient_summary(draft_id, wait_seconds=2)
+    assert ready.status == "ready" and ready.patient_summary_md == "All good."
+
+    with pytest.raises(HTTPException) as unknown:
+        await main.get_deferred_patient_summary("nope")
+    assert unknown.value.status_code == 404
+    await orchestrator.summary_jobs.aclose()
+
+@pytest.mark.asyncio
+async def test_failed_summary_is_reported(monkeypatch):
+    orchestrator = OrchestratorService(pipeline=ZeroHallucinationPipeline(llm=SlowSummaryLLM(summary_delay=0, fail=True)))
+    monkeypatch.setattr(main.state, "orchestrator", orchestrator)
+
+    _, _, _, draft_id = await _progressive_draft(orchestrator, StageTimer())
+    failed = await main.get_deferred_patient_summary(draft_id, wait_seconds=1)
+
+    assert failed.status == "failed" and "summary deployment down" in failed.detail
+
+@pytest.mark.asyncio
+async def test_evicted_and_expired_jobs_are_cancelled():
+    store = SummaryJobStore(max_entries=1, ttl_seconds=0.05)
+    first = store.submit(asyncio.sleep(10))
+    second = store.submit(asyncio.sleep(10, result={}))
+    await asyncio.sleep(0)
+
+    assert store.get(first) is None
+    task = store._jobs[second][1]
+    await asyncio.sleep(0.06)
+    assert store.get(second) is None
+    await asyncio.sleep(0)
+    assert task.cancelled()
@@ -0,0 +1,17 @@
+from app.core.prompts import build_clinical_extraction_messages, build_patient_summary_messages
+from app.services.pipeline import ZeroHallucinationPipeline
+
+def test_instruction_prefix_is_byte_identical_across_patients():
+    """Provider prompt caching only hits if nothing patient-specific precedes the instruction block."""
+    ctx_a = ZeroHallucinationPipeline.build_system_context({"context_documents": [{"system_doc_id": "DOC-A"}]})
+    ctx_b = ZeroHallucinationPipeline.build_system_context({"context_documents": [{"system_doc_id": "DOC-B"}]})
+
+    a = build_clinical_extraction_messages(ctx_a, "Transcript A")
+    b = build_clinical_extraction_messages(ctx_b, "Transcript B")
+    assert a[0] == b[0]
+    assert "DOC-A" not in a[0]["content"] and "DOC-A" in a[1]["content"]
+
+    a = build_patient_summary_messages(ctx_a, "en", "{}", "Transcript A")
+    b = build_patient_summary_messages(ctx_b, "hu", "{}", "Transcript B")
+    assert a[0] == b[0]
+    assert "hu" in b[1]["content"]
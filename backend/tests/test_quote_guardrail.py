@@ -0,0 +1,108 @@
+import pytest
+import random
+from app.services import guardrail
+from app.services.guardrail import QuoteAutomaton, QuoteGuardrail, normalize_with_offsets
+
+def _item(exact, contextual, finding="cough"):
+    return {"finding": finding, "condition_status": "CONFIRMED", "subject": "PATIENT",
+            "exact_quote": exact, "contextual_quote": contextual, "system_reference_id": None}
+
+@pytest.mark.parametrize("use_automaton", [True, False])
+def test_automaton_matches_brute_force_including_overlaps(monkeypatch, use_automaton):
+    if not use_automaton:
+        monkeypatch.setattr(guardrail, "ahocorasick", None)
+    rng = random.Random(3)
+    text = "".join(rng.choice("ab ") for _ in range(400))
+    patterns = ["a", "ab", "bab", "a b", "abab", "b a", "zzz"]
+
+    automaton = QuoteAutomaton(patterns)
+    assert (automaton._automaton is not None) == use_automaton
+    found = automaton.search(text)
+
+    for pattern in patterns:
+        expected = [(i, i + len(pattern)) for i in range(len(text)) if text.startswith(pattern, i)]
+        assert found[pattern] == expected
+
+def test_strict_mode_keeps_verbatim_semantics_and_returns_spans():
+    transcript = "Doctor: Any cough? Patient: Yes, I have a cough since Monday. I have a cough at night too."
+    report = {
+        "chief_complaints": [
+            _item("I have a cough", "I have a cough at night too"),
+            _item("i have a cough", "yes, i have a cough"),  # case differs: not verbatim
+        ],
+        "assessments": [],
+        "actionables": [],
+    }
+
+    result = QuoteGuardrail(normalize=False).check(report, transcript)
+
+    assert [c["exact_quote"] for c in result.report["chief_complaints"]] == ["I have a cough"]
+    assert result.stripped == ["i have a cough"]
+    spans = result.spans["chief_complaints"][0]
+    # The exact occurrence inside the contextual quote wins over the first occurrence
+    assert transcript[slice(*spans["contextual_quote"])] == "I have a cough at night too"
+    assert spans["exact_quote"][0] == spans["contextual_quote"][0]
+    assert result.span_payload()["chief_complaints"][0]["exact_quote"] == list(spans["exact_quote"])
+
+def test_normalized_mode_maps_spans_back_and_rewrites_quotes():
+    transcript = "Patient: My  CHEST\nhurts when I climb stairs."
+    report = {"chief_complaints": [_item("my chest hurts", "My chest hurts when i climb")], "assessments": [], "actionables": []}
+
+    result = QuoteGuardrail(normalize=True).check(report, transcript)
+
+    item = result.report["chief_complaints"][0]
+    assert item["exact_quote"] == "My  CHEST\nhurts"
+    assert transcript.find(item["exact_quote"]) == result.spans["chief_complaints"][0]["exact_quote"][0]
+    assert item["contextual_quote"] == "My  CHEST\nhurts when I climb"
+    assert not result.stripped
+
+def test_normalize_offsets_cover_collapsed_whitespace():
+    normalized, offsets = normalize_with_offsets("A \t B\n")
+    assert normalized == "a b "
+    assert offsets == [0, 1, 4, 5, 6]
+
+def test_near_miss_quotes_are_snapped_to_the_verbatim_span():
+    transcript = ("Doctor: How long? Patient: I've had a dry cough for about three weeks, worse at night. "
+                  "[PERSON_1]: No fever at all. Doctor: Take ibuprofen 400 mg twice daily with food.")
+    report = {
+        "chief_complaints": [
+            _item("Ive had a dry cough, for about three weeks", "dry cough for about three weeks, worse at night"),
+            _item("[PERSON_2]: No fever at all", "[PERSON_2]: No fever at all."),
+        ],
+        "assessments": [],
+        "actionables": [_item("Take ibuprofen 400mg twice daily", "Take ibuprofen 400mg twice daily with food")],
+    }
+
+    result = QuoteGuardrail(normalize=False, fuzzy=True).check(report, transcript)
+
+    quotes = [item["exact_quote"] for section in ("chief_complaints", "actionables") for item in result.report[section]]
+    assert quotes == ["I've had a dry cough for about three weeks", "Take ibuprofen 400 mg twice daily"]
+    assert all(transcript[slice(*spans["exact_quote"])] == item["exact_quote"]
+               for section in ("chief_complaints", "actionables")
+               for item, spans in zip(result.report[section], result.spans[section]))
+    assert {(r["section"], r["index"], r["field"]) for r in result.recovered if r["field"] == "exact_quote"} == {
+        ("chief_complaints", 0, "exact_quote"), ("actionables", 0, "exact_quote")
+    }
+    assert result.rewritten["Ive had a dry cough, for about three weeks"] == "I've had a dry cough for about three weeks"
+    # One edit away, but a different person: never re-attributed
+    assert result.stripped == ["[PERSON_2]: No fever at all"]
+
+def test_fuzzy_recovery_is_bounded():
+    transcript = "Patient: I don't have a history of heart disease. Doctor: Good, and any allergies at all?"
+    report = {
+        "chief_complaints": [
+            _item("I do have a history of heart disease", "x"),  # within the edit budget, but flips a negation
+            _item("allergic to penicillin since childhood", "x"),  # no nearby span
+            _item("any allergys", "x"),  # too short to recover
+        ],
+        "assessments": [],
+        "actionables": [],
+    }
+
+    result = QuoteGuardrail(normalize=False, fuzzy=True).check(report, transcript)
+    assert result.report["chief_complaints"] == [] and not result.recovered
+    assert len(result.stripped) == 3
+
+    assert QuoteGuardrail(normalize=False, fuzzy=False).check(
+        {"chief_complaints": [_item("I dont have a history of heart disease", "x")], "assessments": [], "actionables": []}, transcript
+    ).stripped == ["I dont have a history of heart disease"]
@@ -0,0 +1,65 @@
+import pytest
+from app.core.config import Config
+from app.core.fake_llm import FakeLLMClient, LatencyModel
+from app.core.metrics import metrics
+from app.models.llm_schemas import ClinicalExtractionThoughtProcess, ClinicalReport, DiagnosticResult
+from app.services.guardrail import repair_excerpt
+from app.services.pipeline import ZeroHallucinationPipeline
+
+FILLER = " ".join(f"Doctor: Question {i} about the weather? Patient: It was sunny on day {i}." for i in range(40))
+TRANSCRIPT = (
+    FILLER
+    + " Patient: The headache gets much worse every evening after work."
+    + " " + FILLER
+)
+
+def _report(*items):
+    return ClinicalExtractionThoughtProcess(
+        negation_check="None.", attribution_check="Patient.",
+        final_validated_clinical_report=ClinicalReport(chief_complaints=list(items), assessments=[], actionables=[])
+    )
+
+def _complaint(finding, exact, contextual):
+    return DiagnosticResult(finding=finding, condition_status="CONFIRMED", subject="PATIENT",
+                            exact_quote=exact, contextual_quote=contextual)
+
+def test_repair_excerpt_is_a_small_verbatim_neighbourhood():
+    item = _complaint("headache", "headaches get worse in the evenings", "my headaches get worse in the evenings").model_dump()
+
+    excerpt, anchored = repair_excerpt(TRANSCRIPT, [item], radius=60)
+
+    assert anchored == [0]
+    assert "headache gets much worse" in excerpt and excerpt in TRANSCRIPT
+    assert len(excerpt) < len(TRANSCRIPT) / 10
+
+@pytest.mark.asyncio
+async def test_stripped_item_is_repaired_with_a_verbatim_quote(monkeypatch):
+    monkeypatch.setattr(Config, "GUARDRAIL_REPAIR_ENABLED", True)
+    pipeline = ZeroHallucinationPipeline(llm=FakeLLMClient(latency=LatencyModel(kind="fixed", seconds=0.0)))
+    report = _report(
+        _complaint("headache", "headaches get worse in the evenings", "my headaches get worse in the evenings"),
+        _complaint("chest pain", "crushing chest pain radiating", "I have crushing chest pain radiating to my arm"),
+    )
+    calls_before = metrics.counter("llm.quote_repair.calls")
+
+    checked = await pipeline.check_and_repair_quotes(report, TRANSCRIPT)
+
+    assert [c["finding"] for c in checked.report["chief_complaints"]] == ["headache"]
+    repaired = checked.report["chief_complaints"][0]
+    assert repaired["exact_quote"] in TRANSCRIPT and repaired["condition_status"] == "CONFIRMED"
+    assert checked.repaired == [{"section": "chief_complaints", "index": 0,
+                                 "llm_quote": "headaches get worse in the evenings", "quote": repaired["exact_quote"]}]
+    assert checked.stripped == ["crushing chest pain radiating"]
+    assert TRANSCRIPT[slice(*checked.spans["chief_complaints"][0]["exact_quote"])] == repaired["exact_quote"]
+    assert metrics.counter("llm.quote_repair.calls") == calls_before + 1
+
+@pytest.mark.asyncio
+async def test_unanchored_items_skip_the_repair_call(monkeypatch):
+    monkeypatch.setattr(Config, "GUARDRAIL_REPAIR_ENABLED", True)
+    pipeline = ZeroHallucinationPipeline(llm=FakeLLMClient(latency=LatencyModel(kind="fixed", seconds=0.0)))
+    calls_before = metrics.counter("llm.quote_repair.calls")
+
+    checked = await pipeline.check_and_repair_quotes(_report(_complaint("xq", "zzqx vvkj", "zzqx vvkj wwp")), TRANSCRIPT)
+
+    assert checked.report["chief_complaints"] == [] and checked.stripped == ["zzqx vvkj"]
+    assert metrics.counter("llm.quote_repair.calls") == calls_before
@@ -0,0 +1,41 @@
+import asyncio
+import pytest
+from app.core.config import Config
+from app.core.metrics import metrics
+from app.core.rate_limiter import RateLimitExceededError, SQLiteRateLimiter
+
+def test_buckets_are_shared_between_limiter_instances(tmp_path):
+    """Two instances on one database file behave like two worker processes sharing a quota."""
+    path = str(tmp_path / "rl.db")
+    worker_a = SQLiteRateLimiter("deployment", rpm=2, tpm=0, path=path)
+    worker_b = SQLiteRateLimiter("deployment", rpm=2, tpm=0, path=path)
+    other = SQLiteRateLimiter("other-deployment", rpm=2, tpm=0, path=path)
+
+    assert worker_a.try_acquire(0) == 0
+    assert worker_b.try_acquire(0) == 0
+    assert worker_a.try_acquire(0) == pytest.approx(30, abs=0.5)  # 2 RPM -> one request per 30s
+    assert other.try_acquire(0) == 0
+
+def test_token_bucket_accounts_tokens(tmp_path):
+    limiter = SQLiteRateLimiter("d", rpm=0, tpm=6000, path=str(tmp_path / "rl.db"))
+    assert limiter.try_acquire(5000) == 0
+    assert limiter.try_acquire(2000) == pytest.approx(10, abs=0.5)  # 1000 short at 100 tokens/s
+
+@pytest.mark.asyncio
+async def test_callers_queue_then_proceed(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "LLM_RATE_LIMIT_MAX_WAIT_SECONDS", 5)
+    limiter = SQLiteRateLimiter("d", rpm=0, tpm=6000, path=str(tmp_path / "rl.db"))
+    limiter.try_acquire(6000)  # drain the bucket
+
+    before = metrics.counter("llm.rate_limit.throttled")
+    waited = await limiter.acquire(20)  # 0.2s of refill
+    assert 0.15 < waited < 1.0
+    assert metrics.counter("llm.rate_limit.throttled") == before + 1
+
+@pytest.mark.asyncio
+async def test_wait_beyond_limit_fails_fast(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "LLM_RATE_LIMIT_MAX_WAIT_SECONDS", 1)
+    limiter = SQLiteRateLimiter("d", rpm=1, tpm=0, path=str(tmp_path / "rl.db"))
+    await limiter.acquire(0)
+    with pytest.raises(RateLimitExceededError):
+        await asyncio.wait_for(limiter.acquire(0), timeout=2)
@@ -0,0 +1,62 @@
+import asyncio
+import threading
+import time
+import pytest
+from unittest.mock import patch
+from app.core.config import Config
+from app.core.metrics import metrics
+from app.models.llm_schemas import PatientSummary
+from app.services.cancellation import RequestCancelled, request_timeout, run_cancellable
+from app.services.orchestrator import OrchestratorService
+from app.services.pipeline import ZeroHallucinationPipeline
+
+class HangingLLM:
+    async def parse_completion(self, messages, response_format, max_tokens=0, usage=None):
+        await asyncio.sleep(30)
+        return PatientSummary(layman_explanation="never read", actionables=[])
+
+async def _connected():
+    return False
+
+def test_request_timeout_header(monkeypatch):
+    monkeypatch.setattr(Config, "REQUEST_DEADLINE_SECONDS", 0)
+    assert request_timeout("2.5") == 2.5
+    assert request_timeout(None) is None and request_timeout("soon") is None and request_timeout("0") is None
+    monkeypatch.setattr(Config, "REQUEST_DEADLINE_SECONDS", 60)
+    assert request_timeout(None) == 60
+
+@pytest.mark.asyncio
+async def test_deadline_aborts_pending_llm_call():
+    pipeline = ZeroHallucinationPipeline(llm=HangingLLM())
+    cancelled_before = metrics.counter("llm.clinical_extraction.cancelled")
+
+    start = time.perf_counter()
+    with pytest.raises(RequestCancelled) as cancelled:
+        await run_cancellable(pipeline.run_consultation("I have a cough.", {}), _connected, timeout=0.2)
+
+    assert cancelled.value.reason == "deadline"
+    assert time.perf_counter() - start < 1.0
+    assert metrics.counter("llm.clinical_extraction.cancelled") == cancelled_before + 1
+
+@pytest.mark.asyncio
+async def test_disconnect_stops_the_transcription_session(monkeypatch):
+    monkeypatch.setattr(Config, "REQUEST_DISCONNECT_POLL_SECONDS", 0.05)
+    stopped = threading.Event()
+
+    def transcriber(path, stop_event=None):
+        stop_event.wait(5)
+        stopped.set()
+        return ["[Guest-1]: partial"]
+
+    polls = 0
+    async def disconnected():
+        nonlocal polls
+        polls += 1
+        return polls >= 2
+
+    with patch("app.services.orchestrator.transcribe_file_with_diarization", transcriber):
+        with pytest.raises(RequestCancelled) as cancelled:
+            await run_cancellable(OrchestratorService.transcribe_audio("/tmp/none.wav"), disconnected)
+
+    assert cancelled.value.reason == "disconnect"
+    assert await asyncio.to_thread(stopped.wait, 1)
@@ -0,0 +1,103 @@
+import time
+import pytest
+from app.core.model_router import ModelRouter, StageRoute
+from app.core.prompts import CLINICAL_EXTRACTION_CONTEXT_PROMPT, LEAN_CLINICAL_EXTRACTION_SYSTEM_PROMPT
+from app.core.resilience import CircuitOpenError
+from app.services.result_cache import LLMResultCache
+from app.services.pipeline import ZeroHallucinationPipeline
+from app.models.llm_schemas import ClinicalExtractionThoughtProcess, ClinicalReport
+
+class CountingLLM:
+    model = "test-deployment"
+
+    def __init__(self):
+        self.calls = 0
+
+    async def parse_completion(self, messages, response_format, max_tokens=0, usage=None):
+        self.calls += 1
+        return ClinicalExtractionThoughtProcess(
+            negation_check="None.",
+            attribution_check="Patient.",
+            final_validated_clinical_report=ClinicalReport(chief_complaints=[], assessments=[], actionables=[])
+        )
+
+@pytest.mark.asyncio
+async def test_sqlite_tier_survives_new_instance(tmp_path):
+    """A fresh process (new memory tier) must still hit the persistent tier and promote the entry."""
+    db_path = str(tmp_path / "cache.db")
+    key = LLMResultCache.make_key("clinical_extraction", "gpt-4o", "prompt", "transcript", "{}")
+
+    first = LLMResultCache(sqlite_path=db_path)
+    await first.put(key, "clinical_extraction", '{"a": 1}')
+    first.close()
+
+    second = LLMResultCache(sqlite_path=db_path)
+    assert await second.get(key, "clinical_extraction") == '{"a": 1}'
+    assert await second.get(key, "clinical_extraction") == '{"a": 1}'
+    stats = second.stats()
+    assert stats["sqlite_hits"] == 1
+    assert stats["memory_hits"] == 1
+
+@pytest.mark.asyncio
+async def test_ttl_and_lru_eviction(tmp_path):
+    cache = LLMResultCache(sqlite_path=None, memory_max_entries=2, memory_ttl_seconds=0.05)
+    await cache.put("k1", "s", "v1")
+    await cache.put("k2", "s", "v2")
+    await cache.get("k1", "s")           # k1 becomes most recently used
+    await cache.put("k3", "s", "v3")     # evicts k2
+    assert await cache.get("k2", "s") is None
+    assert await cache.get("k1", "s") == "v1"
+    time.sleep(0.06)
+    assert await cache.get("k3", "s") is None
+
+@pytest.mark.asyncio
+async def test_sqlite_tier_batches_access_updates_and_eviction(tmp_path):
+    cache = LLMResultCache(sqlite_path=str(tmp_path / "cache.db"), memory_max_entries=0, sqlite_max_entries=2, sqlite_evict_every=3)
+    for i in range(3):
+        await cache.put(f"k{i}", "s", f"v{i}")
+    assert len(cache.sqlite) == 2  # third put ran the size sweep
+
+    await cache.put("k3", "s", "v3")
+    assert len(cache.sqlite) == 3  # no sweep until the next batch
+    before = cache.sqlite._conn.total_changes
+    assert await cache.get("k3", "s") == "v3"
+    assert cache.sqlite._conn.total_changes == before  # a fresh last_access is not rewritten
+    cache.close()
+
+@pytest.mark.asyncio
+async def test_pipeline_cache_hit_and_bypass():
+    llm = CountingLLM()
+    pipeline = ZeroHallucinationPipeline(llm=llm, cache=LLMResultCache(sqlite_path=None))
+
+    await pipeline.generate_clinical_report("I have a cough.", "{}")
+    await pipeline.generate_clinical_report("I have a cough.", "{}")
+    assert llm.calls == 1
+
+    await pipeline.generate_clinical_report("I have a cough.", "{}", bypass_cache=True)
+    assert llm.calls == 2
+    assert pipeline.cache.stats()["bypassed"] == 1
+
+class FallbackOnlyLLM(CountingLLM):
+    async def parse_completion(self, messages, response_format, max_tokens=0, usage=None, model=None):
+        if model == "big":
+            raise CircuitOpenError(retry_in=30.0)
+        return await super().parse_completion(messages, response_format, max_tokens=max_tokens, usage=usage)
+
+@pytest.mark.asyncio
+async def test_fallback_served_results_are_not_cached_under_the_primary_key():
+    llm = FallbackOnlyLLM()
+    router = ModelRouter(routes={"clinical_extraction": StageRoute(primary="big", fallback="mini")})
+    pipeline = ZeroHallucinationPipeline(llm=llm, cache=LLMResultCache(sqlite_path=None), router=router)
+
+    await pipeline.generate_clinical_report("I have a cough.", "{}")
+    await pipeline.generate_clinical_report("I have a cough.", "{}")
+    assert llm.calls == 2
+    assert pipeline.cache.stats()["writes"] == 0
+
+def test_lean_extraction_is_keyed_on_its_routed_stage():
+    routes = {"clinical_extraction": StageRoute(primary="big"), "clinical_extraction_lean": StageRoute(primary="mini")}
+    pipeline = ZeroHallucinationPipeline(llm=CountingLLM(), cache=LLMResultCache(sqlite_path=None), extraction_schema="lean",
+                                         router=ModelRouter(routes=routes))
+    _, _, _, cache_key = pipeline._clinical_extraction_request("I have a cough.", "{}")
+    prompt = LEAN_CLINICAL_EXTRACTION_SYSTEM_PROMPT + CLINICAL_EXTRACTION_CONTEXT_PROMPT
+    assert cache_key == LLMResultCache.make_key("clinical_extraction_lean", "mini", prompt, "I have a cough.", "{}")
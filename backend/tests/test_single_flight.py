@@ -0,0 +1,125 @@
+import asyncio
+import io
+import pytest
+from fastapi import UploadFile
+from app import main
+from app.core.metrics import metrics
+from app.services.single_flight import SingleFlight, single_flight_key
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_share_one_execution():
+    flights = SingleFlight("test_share")
+    runs = 0
+
+    async def pipeline():
+        nonlocal runs
+        runs += 1
+        await asyncio.sleep(0.05)
+        return {"draft": runs}
+
+    key = single_flight_key("P-1", "D-1", "en", "audio-digest")
+    results = await asyncio.gather(*[flights.do(key, pipeline) for _ in range(5)])
+    other = await flights.do(single_flight_key("P-2", "D-1", "en", "audio-digest"), pipeline)
+
+    assert runs == 2
+    assert results == [{"draft": 1}] * 5 and other == {"draft": 2}
+    assert metrics.counter("single_flight.test_share.coalesced") == 4
+    assert flights.in_flight() == 0
+
+@pytest.mark.asyncio
+async def test_failure_reaches_every_waiter():
+    flights = SingleFlight("test_fail")
+
+    async def failing():
+        await asyncio.sleep(0.02)
+        raise RuntimeError("transcription failed")
+
+    results = await asyncio.gather(*[flights.do("k", failing) for _ in range(3)], return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+@pytest.mark.asyncio
+async def test_disconnected_leader_does_not_cancel_followers():
+    flights = SingleFlight("test_cancel")
+
+    async def pipeline():
+        await asyncio.sleep(0.05)
+        return "draft"
+
+    leader = asyncio.create_task(flights.do("k", pipeline))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flights.do("k", pipeline))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await follower == "draft"
+
+@pytest.mark.asyncio
+async def test_work_is_cancelled_once_every_waiter_has_gone():
+    flights = SingleFlight("test_abandon")
+    cancelled = asyncio.Event()
+
+    async def pipeline():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    waiters = [asyncio.create_task(flights.do("k", pipeline)) for _ in range(2)]
+    await asyncio.sleep(0)
+    waiters[0].cancel()
+    await asyncio.sleep(0.01)
+    assert not cancelled.is_set()
+
+    waiters[1].cancel()
+    await asyncio.wait_for(cancelled.wait(), 1)
+    assert metrics.counter("single_flight.test_abandon.abandoned") == 1
+
+class _Request:
+    headers = {}
+
+    async def is_disconnected(self):
+        return False
+
+class _Session:
+    def __init__(self, opened: list):
+        self.closed = False
+        opened.append(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.closed = True
+
+@pytest.mark.asyncio
+async def test_identical_draft_requests_share_one_run_with_its_own_session(monkeypatch):
+    runs, sessions = [], []
+
+    class Orchestrator:
+        def draft_checkpoint(self, key):
+            return None
+
+        async def generate_draft(self, db, **kwargs):
+            runs.append(db)
+            await asyncio.sleep(0.05)
+            assert not db.closed
+            return {"chief_complaints": []}, {"layman_explanation": "ok"}, {}, {"patient_id": "P-1"}
+
+    async def normalized(audio_bytes, patient_id, checkpoint):
+        return "/tmp/none.wav"
+
+    monkeypatch.setattr(main.state, "orchestrator", Orchestrator())
+    monkeypatch.setattr(main, "_checkpointed_audio", normalized)
+    monkeypatch.setattr(main, "SessionLocal", lambda: _Session(sessions))
+
+    def request():
+        return main.generate_draft(
+            _Request(), patient_id="P-1", doctor_id="D-1", encounter_date="2026-02-28", language="en",
+            transcript=None, pipeline_mode=None, defer_summary=False, audio=UploadFile(io.BytesIO(b"same audio"))
+        )
+
+    responses = await asyncio.gather(request(), request())
+
+    assert len(runs) == 1 and [r.patient_summary_md for r in responses] == ["ok", "ok"]
+    assert len(sessions) == 1 and sessions[0].closed
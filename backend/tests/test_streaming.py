@@ -0,0 +1,175 @@
+import glob
+import io
+import json
+import os
+import threading
+import pytest
+from fastapi import UploadFile
+from openai import LengthFinishReasonError
+from openai.types import CompletionUsage
+from openai.types.chat import ChatCompletion, ChatCompletionMessage
+from openai.types.chat.chat_completion import Choice
+from app.core.config import Config
+from app.core.fake_llm import FakeLLMClient, LatencyModel
+from app.services.streaming import JsonArrayItemStreamer, JsonStringFieldStreamer, StreamingHydrator
+from app.services.pipeline import ZeroHallucinationPipeline
+from app.models.llm_schemas import ClinicalExtractionThoughtProcess, ClinicalReport, DiagnosticResult, PatientSummary
+
+CORPUS = sorted(glob.glob(os.path.join(os.path.dirname(__file__), "..", "data", "synthetic_transcripts", "*.json")))
+
+def _chunks(text: str, size: int):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+def test_field_streamer_decodes_escapes_split_across_chunks():
+    explanation = 'Dr. "House" said:\nrest é \U0001F600 [PERSON_1].'
+    raw = json.dumps({"layman_explanation": explanation, "actionables": []})
+    for size in (1, 2, 3, 7):
+        streamer = JsonStringFieldStreamer("layman_explanation")
+        decoded = "".join(streamer.feed(c) for c in _chunks(raw, size))
+        assert decoded == explanation
+        assert streamer.done
+
+def test_hydrator_never_leaks_split_tokens():
+    token_map = {"[PERSON_1]": "Jane Doe", "[PERSON_10]": "John Roe"}
+    text = "Hello [PERSON_1], see [PERSON_10] and [[DOC-RAD-202]]."
+    for size in (1, 2, 4):
+        hydrator = StreamingHydrator(token_map)
+        pieces = [hydrator.feed(c) for c in _chunks(text, size)] + [hydrator.flush()]
+        assert "".join(pieces) == "Hello Jane Doe, see John Roe and [[DOC-RAD-202]]."
+        assert not any("PERSON" in p for p in pieces)
+
+def test_array_item_streamer_emits_each_element_once_complete():
+    doc = {
+        "negation_check": 'braces "}]{[" and \\ in strings',
+        "final_validated_clinical_report": {
+            "chief_complaints": [{"finding": "cough \"}\"", "nested": [1, {"a": "]"}]}, {"finding": "fever"}],
+            "assessments": [],
+            "actionables": [{"description": "rest"}],
+        },
+    }
+    raw = json.dumps(doc)
+    for size in (1, 2, 5, len(raw)):
+        streamer = JsonArrayItemStreamer(["chief_complaints", "assessments", "actionables"])
+        emitted = []
+        for i, chunk in enumerate(_chunks(raw, size)):
+            emitted += [(i, field, item) for field, item in streamer.feed(chunk)]
+        report = doc["final_validated_clinical_report"]
+        assert [(f, item) for _, f, item in emitted] == [
+            ("chief_complaints", report["chief_complaints"][0]), ("chief_complaints", report["chief_complaints"][1]),
+            ("actionables", report["actionables"][0]),
+        ]
+        # Emitted on the chunk that closes the element, not at the end of the document
+        assert emitted[0][0] * size < raw.index('{"finding": "fever"}') + 1
+
+class StreamingLLM:
+    async def parse_completion(self, messages, response_format, max_tokens=0, usage=None):
+        return ClinicalExtractionThoughtProcess(
+            negation_check="None.",
+            attribution_check="Patient.",
+            final_validated_clinical_report=ClinicalReport(chief_complaints=[], assessments=[], actionables=[])
+        )
+
+    async def stream_completion(self, messages, response_format, max_tokens=0, usage=None):
+        summary = PatientSummary(layman_explanation="You have a mild cough.", actionables=[])
+        for chunk in _chunks(summary.model_dump_json(), 5):
+            yield "delta", chunk
+        yield "parsed", summary
+
+@pytest.mark.asyncio
+async def test_stream_consultation_event_order():
+    pipeline = ZeroHallucinationPipeline(llm=StreamingLLM())
+    events = [e async for e in pipeline.stream_consultation("I have a mild cough.", metadata_context={})]
+
+    kinds = [k for k, _ in events]
+    assert kinds[0] == "clinical_draft"
+    assert kinds[-1] == "patient_summary"
+    assert "".join(d for k, d in events if k == "summary_delta") == "You have a mild cough."
+    assert events[-1][1]["layman_explanation"] == "You have a mild cough."
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("schema", ["full", "lean"])
+async def test_progressive_extraction_emits_validated_items_before_the_draft(monkeypatch, schema):
+    monkeypatch.setattr(Config, "STREAM_CLINICAL_ITEMS", True)
+    with open(CORPUS[0]) as f:
+        transcript = json.load(f)["transcript"]
+    pipeline = ZeroHallucinationPipeline(llm=FakeLLMClient(latency=LatencyModel(kind="fixed", seconds=0.0)), extraction_schema=schema)
+
+    events = [e async for e in pipeline.stream_consultation(transcript, metadata_context={})]
+
+    kinds = [k for k, _ in events]
+    draft = events[kinds.index("clinical_draft")][1]
+    items = [payload for kind, payload in events if kind == "clinical_item"]
+    assert items and kinds.index("clinical_draft") > max(i for i, k in enumerate(kinds) if k == "clinical_item")
+    assert not draft["truncated"]
+    for section in ("chief_complaints", "assessments", "actionables"):
+        assert [i["item"] for i in items if i["section"] == section] == draft["clinical_draft_json"][section]
+
+class TruncatedExtractionLLM(StreamingLLM):
+    """Streams a report whose second item is a hallucination and is cut off inside the third."""
+    def __init__(self):
+        complaint = lambda finding, quote: DiagnosticResult(
+            finding=finding, condition_status="CONFIRMED", subject="PATIENT", exact_quote=quote, contextual_quote=quote
+        )
+        self.report = ClinicalExtractionThoughtProcess(
+            negation_check="None.", attribution_check="Patient.",
+            final_validated_clinical_report=ClinicalReport(
+                chief_complaints=[complaint("cough", "mild cough"), complaint("rash", "itchy rash on both arms"), complaint("fever", "no fever")],
+                assessments=[], actionables=[]
+            )
+        )
+
+    async def stream_completion(self, messages, response_format, max_tokens=0, usage=None):
+        if response_format is not ClinicalExtractionThoughtProcess:
+            async for event in super().stream_completion(messages, response_format, max_tokens, usage):
+                yield event
+            return
+        raw = self.report.model_dump_json()
+        for chunk in _chunks(raw[:raw.index("no fever")], 9):
+            yield "delta", chunk
+        raise LengthFinishReasonError(completion=ChatCompletion(
+            id="stub", object="chat.completion", created=0, model="stub",
+            usage=CompletionUsage(prompt_tokens=10, completion_tokens=max_tokens, total_tokens=10 + max_tokens),
+            choices=[Choice(index=0, finish_reason="length", message=ChatCompletionMessage(role="assistant", content=""))]
+        ))
+
+@pytest.mark.asyncio
+async def test_truncated_extraction_keeps_finished_items(monkeypatch):
+    monkeypatch.setattr(Config, "STREAM_CLINICAL_ITEMS", True)
+    monkeypatch.setattr(Config, "GUARDRAIL_REPAIR_ENABLED", False)
+    transcript = "Patient: I have a mild cough since Sunday, no fever."
+    pipeline = ZeroHallucinationPipeline(llm=TruncatedExtractionLLM())
+
+    events = [e async for e in pipeline.stream_consultation(transcript, metadata_context={})]
+
+    assert [p["item"]["finding"] for k, p in events if k == "clinical_item"] == ["cough"]
+    draft = next(p for k, p in events if k == "clinical_draft")
+    assert draft["truncated"] and [c["finding"] for c in draft["clinical_draft_json"]["chief_complaints"]] == ["cough"]
+    assert events[-1][0] == "patient_summary"
+
+@pytest.mark.asyncio
+async def test_stream_endpoint_loads_db_context_off_the_event_loop(monkeypatch):
+    from app import main
+    loaded_on = []
+
+    class Orchestrator:
+        @staticmethod
+        def load_encounter_context(db, patient_id, doctor_id, encounter_date):
+            loaded_on.append(threading.current_thread())
+            return {"patient_id": patient_id}
+
+        async def stream_draft(self, audio_file_path, full_metadata, language, fallback_transcript):
+            yield "metadata", full_metadata
+
+    async def normalized(audio_bytes, patient_id):
+        return "/tmp/none.wav"
+
+    monkeypatch.setattr(main.state, "orchestrator", Orchestrator())
+    monkeypatch.setattr(main, "_normalize_uploaded_audio", normalized)
+    response = await main.generate_draft_stream(
+        patient_id="P-1", doctor_id="D-1", encounter_date="2026-02-28", language="en",
+        transcript=None, audio=UploadFile(io.BytesIO(b"audio")), db=None
+    )
+
+    assert loaded_on and loaded_on[0] is not threading.main_thread()
+    body = [chunk async for chunk in response.body_iterator]
+    assert "metadata" in body[0] and "done" in body[-1]
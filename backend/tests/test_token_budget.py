@@ -0,0 +1,54 @@
+import pytest
+from openai import LengthFinishReasonError
+from openai.types.chat import ChatCompletion
+from app.core.config import Config
+from app.core.tokens import AdaptiveTokenBudget, UsageRecord, count_message_tokens
+from app.services.pipeline import ZeroHallucinationPipeline
+from app.models.llm_schemas import ClinicalExtractionThoughtProcess, ClinicalReport
+
+def test_budget_uses_cap_until_warm_then_scales_with_input(monkeypatch):
+    monkeypatch.setattr(Config, "ADAPTIVE_MAX_TOKENS_MIN_SAMPLES", 3)
+    monkeypatch.setattr(Config, "ADAPTIVE_MAX_TOKENS_MIN", 100)
+    monkeypatch.setattr(Config, "ADAPTIVE_MAX_TOKENS_HEADROOM", 1.5)
+    budget = AdaptiveTokenBudget("clinical_extraction", cap=16384)
+
+    assert budget.max_tokens_for(1000) == 16384
+    for _ in range(3):
+        budget.observe(1000, UsageRecord(completion_tokens=400, finish_reason="stop"))
+    budget.observe(1000, UsageRecord(completion_tokens=9000, finish_reason="length"))  # ignored
+
+    assert budget.max_tokens_for(1000) == 600
+    assert budget.max_tokens_for(2000) == 1200
+    assert budget.max_tokens_for(10) == 100
+    assert budget.max_tokens_for(10**6) == 16384
+
+def test_message_token_estimate_grows_with_content():
+    short = count_message_tokens([{"role": "user", "content": "hi"}])
+    long = count_message_tokens([{"role": "user", "content": "hi " * 500}])
+    assert 0 < short < long
+
+class TruncatingLLM:
+    """Truncates whenever max_tokens is below 5000, like a deployment hitting the completion limit."""
+    def __init__(self):
+        self.granted = []
+
+    async def parse_completion(self, messages, response_format, max_tokens=0, usage=None):
+        self.granted.append(max_tokens)
+        if max_tokens < 5000:
+            usage.finish_reason = "length"
+            raise LengthFinishReasonError(completion=ChatCompletion(id="x", choices=[], created=0, model="m", object="chat.completion"))
+        usage.completion_tokens, usage.finish_reason = 50, "stop"
+        return ClinicalExtractionThoughtProcess(
+            negation_check="None.", attribution_check="Patient.",
+            final_validated_clinical_report=ClinicalReport(chief_complaints=[], assessments=[], actionables=[])
+        )
+
+@pytest.mark.asyncio
+async def test_truncated_adaptive_budget_retries_at_cap(monkeypatch):
+    monkeypatch.setattr(Config, "ADAPTIVE_MAX_TOKENS_MIN_SAMPLES", 1)
+    llm = TruncatingLLM()
+    pipeline = ZeroHallucinationPipeline(llm=llm)
+    pipeline.budgets["clinical_extraction"].observe(100, UsageRecord(completion_tokens=10, finish_reason="stop"))
+
+    await pipeline.generate_clinical_report("short transcript", "{}")
+    assert llm.granted == [Config.ADAPTIVE_MAX_TOKENS_MIN, Config.MAX_TOKENS_CLINICAL_EXTRACTION]
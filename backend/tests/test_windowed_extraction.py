@@ -0,0 +1,110 @@
+import asyncio
+import re
+import pytest
+from app.core.config import Config
+from app.services.chunking import TranscriptWindow, split_into_windows
+from app.services.guardrail import GuardrailResult
+from app.services.pipeline import ZeroHallucinationPipeline
+from app.models.llm_schemas import ClinicalExtractionThoughtProcess, ClinicalReport, DiagnosticResult
+
+def _long_transcript(turns: int) -> str:
+    lines = []
+    for i in range(turns):
+        speaker = "Doctor" if i % 2 == 0 else "Patient"
+        symptom = f"symptom{i % 7}"
+        lines.append(f"{speaker}: Turn {i} mentions {symptom} and some filler words to pad the line out.")
+    return "\n\n".join(lines)
+
+def test_windows_are_bounded_overlapping_turn_aligned_slices():
+    transcript = _long_transcript(60)
+    windows = split_into_windows(transcript, window_chars=800, overlap_chars=200)
+
+    assert len(windows) > 1
+    assert windows[0].start == 0 and windows[-1].end == len(transcript)
+    for prev, cur in zip(windows, windows[1:]):
+        assert cur.start < prev.end  # overlap
+        assert cur.start > prev.start  # progress
+    for w in windows:
+        assert transcript[w.start:w.end] == w.text
+        assert len(w.text) <= 800
+        assert w.text.startswith(("Doctor:", "Patient:"))
+
+class PerWindowLLM:
+    """Extracts one finding per turn in the window (quoting that turn); tracks peak concurrency."""
+    def __init__(self):
+        self.in_flight = 0
+        self.peak = 0
+        self.calls = 0
+
+    async def parse_completion(self, messages, response_format, max_tokens=0, usage=None):
+        self.calls += 1
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.05)
+        self.in_flight -= 1
+        window = messages[-1]["content"]
+        items = [
+            DiagnosticResult(finding=m.group(1), condition_status="CONFIRMED", subject="PATIENT", exact_quote=m.group(0), contextual_quote=m.group(0))
+            for m in re.finditer(r"Turn \d+ mentions (symptom\d)", window)
+        ]
+        items.append(DiagnosticResult(finding="invented", condition_status="CONFIRMED", subject="PATIENT",
+                                      exact_quote="not in transcript", contextual_quote="not in transcript"))
+        return ClinicalExtractionThoughtProcess(
+            negation_check="None.",
+            attribution_check="Patient.",
+            final_validated_clinical_report=ClinicalReport(chief_complaints=items, assessments=[], actionables=[])
+        )
+
+@pytest.mark.asyncio
+async def test_windowed_extraction_merges_and_bounds_fanout(monkeypatch):
+    monkeypatch.setattr(Config, "EXTRACTION_WINDOWING_THRESHOLD_CHARS", 1000)
+    monkeypatch.setattr(Config, "EXTRACTION_WINDOW_CHARS", 800)
+    monkeypatch.setattr(Config, "EXTRACTION_WINDOW_OVERLAP_CHARS", 200)
+    monkeypatch.setattr(Config, "EXTRACTION_MAX_CONCURRENCY", 2)
+
+    llm = PerWindowLLM()
+    pipeline = ZeroHallucinationPipeline(llm=llm)
+    validated = await pipeline.extract_and_validate(_long_transcript(60), system_context="{}")
+
+    # Turns re-read in an overlap appear once; repeated symptoms in later turns are separate mentions
+    quotes = [c["exact_quote"] for c in validated["chief_complaints"]]
+    assert quotes == [f"Turn {i} mentions symptom{i % 7}" for i in range(60)]  # transcript order, hallucination stripped
+    assert llm.calls > 2
+    assert llm.peak <= 2
+
+def _window_result(section_items: list[tuple[str, str, tuple[int, int]]]) -> GuardrailResult:
+    items = [{"finding": finding, "condition_status": "CONFIRMED", "subject": "PATIENT", "exact_quote": quote, "contextual_quote": quote}
+             for finding, quote, _ in section_items]
+    spans = [{"exact_quote": span, "contextual_quote": span} for _, _, span in section_items]
+    return GuardrailResult(
+        report={"chief_complaints": items, "assessments": [], "actionables": []},
+        spans={"chief_complaints": spans, "assessments": [], "actionables": []}
+    )
+
+def test_window_merge_dedupes_by_quote_span_not_wording():
+    transcript = "P: I have a cough. D: Any fever? P: Chest pain and cough today. D: Okay. P: The cough is worse at night."
+    first = TranscriptWindow(index=0, start=0, end=65, text=transcript[:65])
+    second = TranscriptWindow(index=1, start=32, end=len(transcript), text=transcript[32:])
+
+    def at(window: TranscriptWindow, quote: str, occurrence: int = 0) -> tuple[int, int]:
+        start = -1
+        for _ in range(occurrence + 1):
+            start = window.text.index(quote, start + 1)
+        return start, start + len(quote)
+
+    merged = ZeroHallucinationPipeline.merge_window_reports([
+        (first, _window_result([
+            ("cough", "cough", at(first, "cough")),
+            ("chest pain", "Chest pain and cough", at(first, "Chest pain and cough")),
+            ("cough", "Chest pain and cough", at(first, "Chest pain and cough")),
+        ])),
+        (second, _window_result([
+            ("cough", "Chest pain and cough", at(second, "Chest pain and cough")),  # same finding, re-read in the overlap
+            ("thoracic pain", "Chest pain", at(second, "Chest pain")),  # paraphrased re-read
+            ("cough", "cough is worse at night", at(second, "cough is worse at night")),  # repeated outside the overlap
+        ])),
+    ])
+
+    assert [(c["finding"], c["exact_quote"]) for c in merged["chief_complaints"]] == [
+        ("cough", "cough"), ("chest pain", "Chest pain and cough"), ("cough", "Chest pain and cough"), ("cough", "cough is worse at night")
+    ]